@@ -95,6 +95,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
+    "recipes.middleware.QueryBudgetMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -109,12 +110,14 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "recipes.context_processors.unread_notifications",
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = "config.wsgi.application"
+ASGI_APPLICATION = "config.asgi.application"
 
 
 # Database configuration
@@ -134,6 +137,55 @@ else:
         }
     }
 
+# Cache configuration
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    # Production: shared between workers, so invalidation reaches all of them
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "recipes",
+            "TIMEOUT": 300,
+        }
+    }
+else:
+    # Local development: per-process memory cache
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "recipes",
+        }
+    }
+
+# Channel layer for live comment updates (see recipes/live.py)
+if REDIS_URL:
+    # Production: pushes reach the pages open on every worker
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {"hosts": [REDIS_URL]},
+        }
+    }
+else:
+    # Local development and tests: a single process
+    CHANNEL_LAYERS = {
+        "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+    }
+
+# Seconds an anonymous page stays cached (see recipes/pagecache.py); the
+# featured recipes on the home page rotate at most this often
+PAGE_CACHE_TIMEOUT = int(os.environ.get("PAGE_CACHE_TIMEOUT", 60))
+# Seconds a rendered recipe fragment is kept; fragments are keyed on the
+# recipe's updated_at, so this only bounds memory, not staleness
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+# Part of every fragment key besides the template's own source; bump it
+# when fragments change through included templates or filters
+FRAGMENT_VERSION = os.environ.get("FRAGMENT_VERSION", "1")
+# Seconds the sync API lags behind the clock, so that a change committed
+# by a slower transaction is not skipped by a cursor already past it
+SYNC_SETTLE_SECONDS = 2
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -199,6 +251,38 @@ MEDIA_URL = "/media/"
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Featured recipes on the home page
+FEATURED_RECIPES_COUNT = 4
+# Seconds a featured selection stays on the home page before rotating
+# (0 draws a fresh random sample on every request)
+FEATURED_RECIPES_ROTATION = int(
+    os.environ.get("FEATURED_RECIPES_ROTATION", 0)
+)
+
+# SQL budgets per URL name, enforced by recipes/tests.py and logged by
+# recipes.middleware.QueryBudgetMiddleware when it is enabled
+QUERY_BUDGET_WARNINGS = DEBUG or "QUERY_BUDGET_WARNINGS" in os.environ
+QUERY_BUDGETS = {
+    # Logged-in requests add two queries (session and user), plus the
+    # unread notification count while it is not cached
+    "home": {"queries": 7, "time_ms": 100},
+    "recipes_home": {"queries": 5, "time_ms": 200},
+    "recipes_list": {"queries": 5, "time_ms": 200},
+    "categories_list": {"queries": 3, "time_ms": 100},
+    # A page of comments is two queries: top-level comments, then all of
+    # their replies
+    "recipe_detail": {"queries": 8, "time_ms": 100},
+    "recipe_comments": {"queries": 2, "time_ms": 100},
+    "comment_replies": {"queries": 1, "time_ms": 100},
+    "notification_inbox": {"queries": 4, "time_ms": 100},
+    "api_recipe_list": {"queries": 1, "time_ms": 100},
+    "api_recipe_detail": {"queries": 3, "time_ms": 100},
+    "api_recipe_sync": {"queries": 3, "time_ms": 100},
+    "api_recipe_batch": {"queries": 2, "time_ms": 100},
+    "admin:recipes_recipe_changelist": {"queries": 8, "time_ms": 200},
+    "admin:recipes_comment_changelist": {"queries": 6, "time_ms": 200},
+}
+
 # Crispy Forms Configuration
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
@@ -1,5 +1,9 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
 from .models import Recipe, Comment
+from . import counters, live, notifications, pagecache
 
 
 @admin.register(Recipe)
@@ -30,6 +34,7 @@ class RecipeAdmin(admin.ModelAdmin):
         "recipe_tags",
         "author__username",
     ]
+    list_select_related = ["author"]
     ordering = ["-created_at"]
     readonly_fields = ["created_at", "updated_at"]
 
@@ -81,6 +86,8 @@ class CommentAdmin(admin.ModelAdmin):
         "approved",
     ]
     list_filter = ["approved", "created_on", "recipe"]
+    list_select_related = ["recipe", "author"]
+    raw_id_fields = ["parent"]
     search_fields = [
         "body",
         "author__username",
@@ -88,6 +95,14 @@ class CommentAdmin(admin.ModelAdmin):
     ]
     actions = ["approve_comments"]
 
+    def get_readonly_fields(self, request, obj=None):
+        # A comment's thread, depth and path are derived from its parent
+        # when it is created, so it cannot move afterwards
+        readonly = super().get_readonly_fields(request, obj)
+        if obj is not None:
+            readonly = [*readonly, "parent"]
+        return readonly
+
     def body_preview(self, obj):
         """Show first 50 characters of comment body"""
         return obj.body[:50] + "..." if len(obj.body) > 50 else obj.body
@@ -96,6 +111,38 @@ class CommentAdmin(admin.ModelAdmin):
 
     def approve_comments(self, request, queryset):
         """Bulk approve comments"""
-        queryset.update(approved=True)
+        # queryset.update() skips signals, so adjust the counters, notify
+        # the recipe authors and push the comments to open pages here
+        with transaction.atomic():
+            pending = queryset.filter(approved=False)
+            per_recipe = dict(
+                pending.order_by()
+                .values_list("recipe_id")
+                .annotate(total=Count("id"))
+            )
+            notifications.notify_approved_comments(
+                pending.order_by()
+                .values(*notifications.COMMENT_FIELDS)
+                .iterator(chunk_size=2000)
+            )
+            # One live update per recipe for the whole batch
+            live.push_comments(pending.values_list("id", flat=True))
+            threads = list(
+                pending.exclude(thread=None)
+                .order_by()
+                .values_list("thread_id", flat=True)
+                .distinct()
+            )
+            pending.update(approved=True, updated_on=timezone.now())
+            counters.increment(
+                {
+                    counters.comments_counter(recipe_id): total
+                    for recipe_id, total in per_recipe.items()
+                }
+            )
+            if threads:
+                counters.recount_replies(threads)
+        for recipe_id in per_recipe:
+            pagecache.invalidate_recipe(recipe_id)
 
     approve_comments.short_description = "Approve selected comments"
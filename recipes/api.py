@@ -0,0 +1,474 @@
+"""
+Read-only JSON API for recipes.
+
+Both endpoints take sparse fieldsets (``?fields=title,prep_time``) and read
+only the columns those fields need, as values() rows rather than model
+instances. The list endpoint accepts the same filters and sorts as
+RecipeListView and pages by cursor (or by ``?page=`` for the relevance
+and coverage sorts, which have no stored sort key).
+
+Responses carry an ETag (and, for a recipe, a Last-Modified) derived from
+updated_at and the recipe's latest approved comment. A request whose
+validators still match gets a 304 before anything is serialized; for a
+recipe the validators come from one aggregate query and the full row is
+not read at all.
+
+The sync endpoint returns what changed since a client's last sync: recipes
+by (updated_at, id) and deletions by RecipeTombstone (deleted_at, id), both
+read in index order from the position stored in an opaque cursor.
+
+The batch endpoint returns many recipes by id in one request, with one
+query for the recipes and one for their comment counters; concurrent
+identical batches in a process share a single fetch.
+"""
+
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, Q
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from . import counters
+from .filters import RecipeFilter, parse_int
+from .models import Comment, Recipe, RecipeTombstone
+from .pagecache import canonical_query
+from .pagination import (
+    AFTER,
+    CursorPaginator,
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+)
+from .singleflight import SingleFlight
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_BATCH_IDS = 100
+
+
+def image_url(row):
+    image = row["image"]
+    if not image or str(image) == "placeholder":
+        return None
+    return image.url
+
+
+def tag_list(row):
+    tags = row["recipe_tags"] or ""
+    return [tag.strip() for tag in tags.split(",") if tag.strip()]
+
+
+# API field: (columns it reads, function of the values() row)
+FIELDS = {
+    "id": (["id"], lambda row: row["id"]),
+    "url": (
+        ["id"],
+        lambda row: reverse("api_recipe_detail", args=[row["id"]]),
+    ),
+    "title": (["title"], lambda row: row["title"]),
+    "summary": (["summary"], lambda row: row["summary"]),
+    "description": (["description"], lambda row: row["description"]),
+    "image": (["image"], image_url),
+    "meal_type": (["meal_type"], lambda row: row["meal_type"]),
+    "tags": (["recipe_tags"], tag_list),
+    "ingredients": (["ingredients_list"], lambda row: row["ingredients_list"]),
+    "instructions": (
+        ["instruction_steps"],
+        lambda row: row["instruction_steps"],
+    ),
+    "prep_time": (["prep_time"], lambda row: row["prep_time"]),
+    "cook_time": (["cook_time"], lambda row: row["cook_time"]),
+    "total_time": (
+        ["prep_time", "cook_time"],
+        lambda row: row["prep_time"] + row["cook_time"],
+    ),
+    "servings": (["servings"], lambda row: row["servings"]),
+    "author": (["author__username"], lambda row: row["author__username"]),
+    "created_at": (["created_at"], lambda row: row["created_at"]),
+    "updated_at": (["updated_at"], lambda row: row["updated_at"]),
+}
+# Only on a single recipe: its approved comments in thread order (each
+# thread oldest first, replies under their parent)
+DETAIL_ONLY_FIELDS = ["comments"]
+# Only in batches: the number of approved comments, from the site counters
+BATCH_FIELDS = [*FIELDS, "comment_count"]
+
+LIST_FIELDS = [
+    "id",
+    "url",
+    "title",
+    "summary",
+    "image",
+    "meal_type",
+    "tags",
+    "total_time",
+    "servings",
+    "author",
+    "created_at",
+]
+DETAIL_FIELDS = [name for name in FIELDS]
+
+
+class InvalidRequest(Exception):
+    pass
+
+
+def error_response(message, status=400):
+    return JsonResponse({"error": message}, status=status)
+
+
+def parse_fields(params, default, allowed):
+    """The requested field names, in request order, or the default set"""
+    names = []
+    for value in params.getlist("fields"):
+        names.extend(name.strip() for name in value.split(",") if name)
+    if not names:
+        return list(default)
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise InvalidRequest(f"Unknown fields: {', '.join(unknown)}.")
+    return list(dict.fromkeys(names))
+
+
+def columns_for(fields, *extra):
+    """values() columns needed to serialize the given fields"""
+    columns = dict.fromkeys(extra)
+    for name in fields:
+        if name in FIELDS:
+            columns.update(dict.fromkeys(FIELDS[name][0]))
+    return list(columns)
+
+
+def serialize(row, fields):
+    return {
+        name: FIELDS[name][1](row) for name in fields if name in FIELDS
+    }
+
+
+def make_etag(*parts):
+    text = "|".join(str(part) for part in parts)
+    digest = hashlib.md5(text.encode(), usedforsecurity=False).hexdigest()
+    return quote_etag(digest)
+
+
+def with_validators(response, etag, last_modified=None):
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+@require_safe
+def recipe_list(request):
+    """Filtered, sorted and paginated recipes"""
+    try:
+        fields = parse_fields(request.GET, LIST_FIELDS, FIELDS)
+    except InvalidRequest as error:
+        return error_response(str(error))
+    limit = parse_int(request.GET.get("limit")) or DEFAULT_LIMIT
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    recipe_filter = RecipeFilter(request.GET)
+    ordering = recipe_filter.get_keyset_ordering()
+    keys = [name.lstrip("-") for name in ordering or []]
+    rows = recipe_filter.get_queryset().values(
+        *columns_for(fields, "id", "updated_at", *keys)
+    )
+
+    params = request.GET.copy()
+    params.pop("cursor", None)
+    params.pop("page", None)
+    next_params = previous_params = None
+    if ordering:
+        paginator = CursorPaginator(rows, ordering, limit)
+        try:
+            page = paginator.page(request.GET.get("cursor"))
+        except InvalidCursor:
+            return error_response("Invalid cursor.")
+        rows = page.object_list
+        if page.next_cursor:
+            next_params = {"cursor": page.next_cursor}
+        if page.previous_cursor:
+            previous_params = {"cursor": page.previous_cursor}
+    else:
+        number = max(parse_int(request.GET.get("page")) or 1, 1)
+        offset = (number - 1) * limit
+        rows = list(rows[offset:offset + limit + 1])
+        if len(rows) > limit:
+            next_params = {"page": number + 1}
+        if number > 1:
+            previous_params = {"page": number - 1}
+        rows = rows[:limit]
+
+    # The page changes whenever one of its rows, or which rows are on it,
+    # does; a removed recipe cannot move Last-Modified, so there is none
+    etag = make_etag(
+        canonical_query(request.GET),
+        *((row["id"], row["updated_at"].isoformat()) for row in rows),
+        bool(next_params),
+        bool(previous_params),
+    )
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        return with_validators(response, etag)
+
+    def link(extra):
+        if extra is None:
+            return None
+        query = params.copy()
+        query.update(extra)
+        return f"{request.path}?{query.urlencode()}"
+
+    data = {
+        "results": [serialize(row, fields) for row in rows],
+        "next": link(next_params),
+        "previous": link(previous_params),
+    }
+    return with_validators(JsonResponse(data), etag)
+
+
+@require_safe
+def recipe_detail(request, recipe_id):
+    """One recipe, optionally with its approved comments"""
+    try:
+        fields = parse_fields(
+            request.GET, DETAIL_FIELDS, [*FIELDS, *DETAIL_ONLY_FIELDS]
+        )
+    except InvalidRequest as error:
+        return error_response(str(error))
+
+    approved = Q(comments__approved=True)
+    validators = Recipe.objects.filter(pk=recipe_id).aggregate(
+        updated_at=Max("updated_at"),
+        # Edits and approvals move updated_on; removals change the count
+        last_comment=Max("comments__updated_on", filter=approved),
+        comment_count=Count("comments", filter=approved),
+    )
+    if validators["updated_at"] is None:
+        return error_response("Recipe not found.", status=404)
+
+    last_modified = validators["updated_at"]
+    if validators["last_comment"]:
+        last_modified = max(last_modified, validators["last_comment"])
+    last_modified = int(last_modified.timestamp())
+    etag = make_etag(
+        recipe_id,
+        validators["updated_at"].isoformat(),
+        validators["last_comment"],
+        validators["comment_count"],
+        ",".join(fields),
+    )
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        return with_validators(response, etag, last_modified)
+
+    row = (
+        Recipe.objects.filter(pk=recipe_id)
+        .values(*columns_for(fields, "id"))
+        .first()
+    )
+    if row is None:
+        return error_response("Recipe not found.", status=404)
+    data = serialize(row, fields)
+    if "comments" in fields:
+        data["comments"] = list(
+            Comment.objects.filter(recipe_id=recipe_id, approved=True)
+            .order_by("path")
+            .values(
+                "id",
+                "parent_id",
+                "depth",
+                "thread_id",
+                "reply_count",
+                "author__username",
+                "body",
+                "created_on",
+            )
+        )
+        for comment in data["comments"]:
+            comment["author"] = comment.pop("author__username")
+    return with_validators(JsonResponse(data), etag, last_modified)
+
+
+def keyset_after(key, time_field):
+    """Rows after a (timestamp, id) key, in (timestamp, id) order"""
+    if key is None:
+        return Q()
+    timestamp, pk = key
+    return Q(**{f"{time_field}__gt": timestamp}) | Q(
+        **{time_field: timestamp, "id__gt": pk}
+    )
+
+
+def parse_sync_cursor(cursor):
+    """The (recipes key, tombstones key) positions stored in a cursor"""
+    direction, values = decode_cursor(cursor)
+    if direction != AFTER or len(values) != 4:
+        raise InvalidCursor(cursor)
+    field = Recipe._meta.get_field("updated_at")
+    keys = []
+    for timestamp, pk in (values[:2], values[2:]):
+        if timestamp is None and pk is None:
+            keys.append(None)
+            continue
+        try:
+            keys.append((field.to_python(timestamp), int(pk)))
+        except (ValidationError, TypeError, ValueError):
+            raise InvalidCursor(cursor)
+    return keys
+
+
+def sync_start(params, settled):
+    """
+    Starting positions without a cursor: ?since= a timestamp, or the whole
+    catalog (but no older deletions, which a new client cannot hold)
+    """
+    since = params.get("since")
+    if since:
+        timestamp = parse_datetime(since)
+        if timestamp is None:
+            raise InvalidRequest("Invalid since timestamp.")
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp)
+        return (timestamp, 0), (timestamp, 0)
+    latest = (
+        RecipeTombstone.objects.filter(deleted_at__lte=settled)
+        .order_by("-deleted_at", "-id")
+        .values_list("deleted_at", "id")
+        .first()
+    )
+    return None, latest
+
+
+@require_safe
+def recipe_sync(request):
+    """
+    Recipes created, updated or deleted since the position in ?cursor= (or
+    ?since=). Keep calling with the returned cursor while has_more is true;
+    store the last cursor for the next sync.
+    """
+    try:
+        fields = parse_fields(request.GET, DETAIL_FIELDS, FIELDS)
+    except InvalidRequest as error:
+        return error_response(str(error))
+    limit = parse_int(request.GET.get("limit")) or DEFAULT_LIMIT
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    # Rows younger than this may belong to transactions that have not
+    # committed yet, so a cursor never moves past them
+    settled = timezone.now() - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    try:
+        if request.GET.get("cursor"):
+            recipes_key, deleted_key = parse_sync_cursor(
+                request.GET["cursor"]
+            )
+        else:
+            recipes_key, deleted_key = sync_start(request.GET, settled)
+    except InvalidCursor:
+        return error_response("Invalid cursor.")
+    except InvalidRequest as error:
+        return error_response(str(error))
+
+    rows = list(
+        Recipe.objects.filter(updated_at__lte=settled)
+        .filter(keyset_after(recipes_key, "updated_at"))
+        .order_by("updated_at", "id")
+        .values(*columns_for(fields, "id", "updated_at"))[: limit + 1]
+    )
+    tombstones = list(
+        RecipeTombstone.objects.filter(deleted_at__lte=settled)
+        .filter(keyset_after(deleted_key, "deleted_at"))
+        .order_by("deleted_at", "id")
+        .values_list("deleted_at", "id", "recipe_id")[: limit + 1]
+    )
+    has_more = len(rows) > limit or len(tombstones) > limit
+    rows, tombstones = rows[:limit], tombstones[:limit]
+    if rows:
+        recipes_key = (rows[-1]["updated_at"], rows[-1]["id"])
+    if tombstones:
+        deleted_key = tombstones[-1][:2]
+
+    position = [*(recipes_key or [None, None]), *(deleted_key or [None, None])]
+    return JsonResponse(
+        {
+            "updated": [serialize(row, fields) for row in rows],
+            "deleted": [recipe_id for _, _, recipe_id in tombstones],
+            "cursor": encode_cursor(AFTER, position),
+            "has_more": has_more,
+        }
+    )
+
+
+batch_fetches = SingleFlight()
+
+
+def parse_ids(params):
+    """Unique recipe ids from ?ids=1,2,3 (or repeated ids=), in order"""
+    ids = []
+    for value in params.getlist("ids"):
+        for part in value.split(","):
+            if part.strip():
+                pk = parse_int(part)
+                if pk is None:
+                    raise InvalidRequest(f"Invalid id: {part.strip()}.")
+                ids.append(pk)
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise InvalidRequest("Pass the recipe ids as ?ids=1,2,3.")
+    if len(ids) > MAX_BATCH_IDS:
+        raise InvalidRequest(f"At most {MAX_BATCH_IDS} ids per request.")
+    return ids
+
+
+def fetch_batch(ids, columns, with_comment_counts):
+    """{id: values() row} for the given recipes, with comment counts"""
+    rows = {
+        row["id"]: row
+        for row in Recipe.objects.filter(id__in=ids).values(*columns)
+    }
+    if with_comment_counts and rows:
+        names = {pk: counters.comments_counter(pk) for pk in rows}
+        counts = counters.get_counts(*names.values())
+        for pk, row in rows.items():
+            row["comment_count"] = counts[names[pk]]
+    return rows
+
+
+@require_safe
+def recipe_batch(request):
+    """Up to MAX_BATCH_IDS recipes by id, in the requested order"""
+    try:
+        ids = parse_ids(request.GET)
+        fields = parse_fields(
+            request.GET, [*LIST_FIELDS, "comment_count"], BATCH_FIELDS
+        )
+    except InvalidRequest as error:
+        return error_response(str(error))
+
+    columns = tuple(columns_for(fields, "id"))
+    with_comment_counts = "comment_count" in fields
+    # Rows are shared between coalesced requests, so they are only read
+    rows = batch_fetches.do(
+        (tuple(sorted(ids)), columns, with_comment_counts),
+        lambda: fetch_batch(ids, columns, with_comment_counts),
+    )
+
+    results = []
+    for pk in ids:
+        if pk in rows:
+            data = serialize(rows[pk], fields)
+            if with_comment_counts:
+                data["comment_count"] = rows[pk]["comment_count"]
+            results.append(data)
+    missing = [pk for pk in ids if pk not in rows]
+    return JsonResponse({"results": results, "missing": missing})
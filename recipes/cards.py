@@ -0,0 +1,70 @@
+"""
+Lightweight recipe rows for card-based list pages.
+
+Card pages only need a handful of columns, so instead of full Recipe
+instances (with the large ingredients/instructions text and a lazy author
+lookup per card) they read a values() projection joined to the author's
+username and wrap each row in a slotted RecipeCard.
+"""
+
+CARD_FIELDS = (
+    "id",
+    "title",
+    "summary",
+    "image",
+    "prep_time",
+    "cook_time",
+    "servings",
+    "created_at",
+    "updated_at",
+    "author__username",
+)
+
+
+class RecipeCard:
+    """The subset of a recipe shown on a recipe card"""
+
+    __slots__ = (
+        "id",
+        "title",
+        "summary",
+        "image",
+        "prep_time",
+        "cook_time",
+        "servings",
+        "created_at",
+        "updated_at",
+        "author_username",
+    )
+
+    def __init__(self, row):
+        self.id = row["id"]
+        self.title = row["title"]
+        self.summary = row["summary"]
+        self.image = row["image"]
+        self.prep_time = row["prep_time"]
+        self.cook_time = row["cook_time"]
+        self.servings = row["servings"]
+        self.created_at = row["created_at"]
+        self.updated_at = row["updated_at"]
+        self.author_username = row["author__username"]
+
+    def __repr__(self):
+        return f"<RecipeCard {self.id}: {self.title}>"
+
+    @property
+    def pk(self):
+        return self.id
+
+    def get_total_time(self):
+        return self.prep_time + self.cook_time
+
+
+def card_queryset(queryset):
+    """Project a Recipe queryset onto the card columns (values() dicts)"""
+    return queryset.values(*CARD_FIELDS)
+
+
+def to_cards(rows):
+    """Wrap card_queryset() rows in RecipeCard objects"""
+    return [RecipeCard(row) for row in rows]
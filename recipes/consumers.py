@@ -0,0 +1,39 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .live import comments_group
+from .models import Recipe
+
+# WebSocket close code (application range) for an unknown recipe
+NO_SUCH_RECIPE = 4404
+
+
+class CommentConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Pushes a recipe's comment changes (see recipes.live) to its open
+    detail pages; the client only listens
+    """
+
+    async def connect(self):
+        recipe_id = self.scope["url_route"]["kwargs"]["recipe_id"]
+        await self.accept()
+        if not await Recipe.objects.filter(id=recipe_id).aexists():
+            # Accepted first so the client sees why and stops retrying
+            await self.close(code=NO_SUCH_RECIPE)
+            return
+        self.group = comments_group(recipe_id)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+
+    async def disconnect(self, code):
+        if hasattr(self, "group"):
+            await self.channel_layer.group_discard(
+                self.group, self.channel_name
+            )
+
+    async def comments_changed(self, event):
+        await self.send_json(
+            {
+                "comments": event["comments"],
+                "removed": event["removed"],
+                "count": event["count"],
+            }
+        )
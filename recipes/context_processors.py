@@ -0,0 +1,16 @@
+from . import notifications
+
+
+def unread_notifications(request):
+    """
+    The navbar's unread notification count, as a callable so pages that
+    don't show it (or anonymous visitors) never look it up
+    """
+
+    def count():
+        user = request.user
+        if not user.is_authenticated:
+            return 0
+        return notifications.unread_count(user.pk)
+
+    return {"unread_notifications": count}
@@ -0,0 +1,185 @@
+"""
+Site-wide counters materialized in the SiteCounter table.
+
+Counters are adjusted with F() expressions by the signal handlers in
+``recipes.signals`` (and by bulk operations such as the admin
+``approve_comments`` action), so reading them never needs a COUNT(*).
+``recount()`` rebuilds every counter from the source tables.
+
+The reply counts of comment threads live on the Comment rows themselves
+(Comment.reply_count); ``recount_replies()`` rebuilds them.
+"""
+
+from collections import Counter
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import Exact
+
+TOTAL_RECIPES = "recipes"
+TOTAL_USERS = "users"
+
+
+def meal_type_counter(meal_type):
+    return f"meal_type:{meal_type}"
+
+
+def tag_counter(tag):
+    return f"tag:{tag}"
+
+
+def comments_counter(recipe_id):
+    """Number of approved comments on a recipe"""
+    return f"recipe:{recipe_id}:comments"
+
+
+def recipe_counters(state):
+    """Counter contributions of a recipe with the given counted state"""
+    from .models import Recipe
+
+    meal_type, tag_bits = state
+    counts = Counter({TOTAL_RECIPES: 1, meal_type_counter(meal_type): 1})
+    for tag in Recipe.bits_to_tags(tag_bits):
+        counts[tag_counter(tag)] += 1
+    return counts
+
+
+def recipe_delta(old_state, new_state):
+    """Counter changes when a recipe goes from old_state to new_state"""
+    delta = Counter()
+    if new_state is not None:
+        delta.update(recipe_counters(new_state))
+    if old_state is not None:
+        delta.subtract(recipe_counters(old_state))
+    return delta
+
+
+def increment(deltas):
+    """
+    Apply a {counter name: delta} mapping atomically.
+
+    Missing counters are created for positive deltas; negative deltas on
+    missing counters are ignored (the row was already removed or never
+    counted, and recount() will reconcile it).
+    """
+    from .models import SiteCounter
+
+    with transaction.atomic():
+        for name, delta in deltas.items():
+            if not delta:
+                continue
+            updated = SiteCounter.objects.filter(name=name).update(
+                value=F("value") + delta
+            )
+            if not updated and delta > 0:
+                counter, created = SiteCounter.objects.get_or_create(
+                    name=name, defaults={"value": delta}
+                )
+                if not created:
+                    SiteCounter.objects.filter(name=name).update(
+                        value=F("value") + delta
+                    )
+
+
+def get_counts(*names):
+    """Return {name: value} for the given counters in a single query"""
+    from .models import SiteCounter
+
+    values = dict(
+        SiteCounter.objects.filter(name__in=names).values_list("name", "value")
+    )
+    return {name: values.get(name, 0) for name in names}
+
+
+async def aget_counts(*names):
+    """Async get_counts() for async views"""
+    from .models import SiteCounter
+
+    rows = SiteCounter.objects.filter(name__in=names).values_list(
+        "name", "value"
+    )
+    values = {name: value async for name, value in rows}
+    return {name: values.get(name, 0) for name in names}
+
+
+def delete_counters(*names):
+    from .models import SiteCounter
+
+    SiteCounter.objects.filter(name__in=names).delete()
+
+
+def recount(apps=global_apps):
+    """
+    Rebuild every counter from the source tables.
+
+    Accepts an app registry so data migrations can pass historical models.
+    """
+    from .models import Recipe as CurrentRecipe
+
+    Recipe = apps.get_model("recipes", "Recipe")
+    Comment = apps.get_model("recipes", "Comment")
+    SiteCounter = apps.get_model("recipes", "SiteCounter")
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+
+    counts = {
+        TOTAL_RECIPES: Recipe.objects.count(),
+        TOTAL_USERS: User.objects.count(),
+    }
+    for meal_type, name in CurrentRecipe.MEAL_TYPE_CHOICES:
+        counts[meal_type_counter(meal_type)] = 0
+    meal_types = Recipe.objects.values_list("meal_type").annotate(
+        total=Count("id")
+    )
+    for meal_type, total in meal_types.order_by():
+        counts[meal_type_counter(meal_type)] = total
+
+    # All tag counts in one aggregate query over the bitsets
+    tag_totals = Recipe.objects.order_by().aggregate(
+        **{
+            tag: Count("id", filter=Exact(F("tag_bits").bitand(bit), bit))
+            for tag, bit in CurrentRecipe.TAG_BITS.items()
+        }
+    )
+    for tag, total in tag_totals.items():
+        counts[tag_counter(tag)] = total
+
+    comments = (
+        Comment.objects.filter(approved=True)
+        .values_list("recipe_id")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    for recipe_id, total in comments.iterator(chunk_size=2000):
+        counts[comments_counter(recipe_id)] = total
+
+    with transaction.atomic():
+        SiteCounter.objects.all().delete()
+        SiteCounter.objects.bulk_create(
+            [SiteCounter(name=name, value=value)
+             for name, value in counts.items()],
+            batch_size=500,
+        )
+    return counts
+
+
+def recount_replies(thread_ids=None):
+    """
+    Set the reply count of the given threads (all of them by default)
+    from their approved replies, in one UPDATE
+    """
+    from .models import Comment
+
+    replies = (
+        Comment.objects.filter(thread=OuterRef("pk"), approved=True)
+        .order_by()
+        .values("thread")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    threads = Comment.objects.filter(depth=0)
+    if thread_ids is not None:
+        threads = threads.filter(pk__in=thread_ids)
+    return threads.update(reply_count=Coalesce(Subquery(replies), 0))
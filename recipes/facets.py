@@ -0,0 +1,103 @@
+"""
+Facet counts (recipes per meal type and per tag) for a filtered result set.
+
+Filtered counts come from a single aggregate query using filtered COUNTs,
+and results are cached per normalized filter set. The cache is invalidated
+by bumping a version number whenever a recipe is saved or deleted. The
+unfiltered catalogue is read straight from the materialized site counters.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.db.models.lookups import Exact
+
+from .models import Recipe
+from . import counters
+
+FACET_VERSION_KEY = "recipes:facets:version"
+FACET_CACHE_TIMEOUT = getattr(settings, "FACET_CACHE_TIMEOUT", 300)
+
+
+def compute_facets(queryset):
+    """Count the recipes in queryset per meal type and per tag in one query"""
+    aggregates = {"total": Count("id")}
+    for meal_type, name in Recipe.MEAL_TYPE_CHOICES:
+        aggregates[f"meal_type__{meal_type}"] = Count(
+            "id", filter=Q(meal_type=meal_type)
+        )
+    for tag, bit in Recipe.TAG_BITS.items():
+        aggregates[f"tag__{tag}"] = Count(
+            "id", filter=Exact(F("tag_bits").bitand(bit), bit)
+        )
+
+    # Ordering is irrelevant to the counts and only slows the query down
+    row = queryset.order_by().aggregate(**aggregates)
+    return {
+        "total": row["total"],
+        "meal_types": {
+            meal_type: row[f"meal_type__{meal_type}"]
+            for meal_type, name in Recipe.MEAL_TYPE_CHOICES
+        },
+        "tags": {tag: row[f"tag__{tag}"] for tag in Recipe.TAG_BITS},
+    }
+
+
+def invalidate_facets():
+    """Drop every cached facet result"""
+    try:
+        cache.incr(FACET_VERSION_KEY)
+    except ValueError:
+        cache.set(FACET_VERSION_KEY, 1, None)
+
+
+def counter_facets():
+    """Facets of the unfiltered catalogue, read from the site counters"""
+    names = [counters.TOTAL_RECIPES]
+    names += [
+        counters.meal_type_counter(meal_type)
+        for meal_type, name in Recipe.MEAL_TYPE_CHOICES
+    ]
+    names += [counters.tag_counter(tag) for tag in Recipe.TAG_BITS]
+    values = counters.get_counts(*names)
+    return {
+        "total": values[counters.TOTAL_RECIPES],
+        "meal_types": {
+            meal_type: values[counters.meal_type_counter(meal_type)]
+            for meal_type, name in Recipe.MEAL_TYPE_CHOICES
+        },
+        "tags": {
+            tag: values[counters.tag_counter(tag)] for tag in Recipe.TAG_BITS
+        },
+    }
+
+
+def get_facets(recipe_filter):
+    """Return (cached) facet counts for a RecipeFilter's result set"""
+    if not recipe_filter.has_filters:
+        return counter_facets()
+
+    version = cache.get_or_set(FACET_VERSION_KEY, 1, None)
+    digest = hashlib.md5(
+        repr(recipe_filter.normalized()).encode(), usedforsecurity=False
+    ).hexdigest()
+    key = f"recipes:facets:{version}:{digest}"
+
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(recipe_filter.filter())
+        cache.set(key, facets, FACET_CACHE_TIMEOUT)
+    return facets
+
+
+def facet_choices(choices, counts):
+    """
+    Pair (key, name) choices with their counts as (key, name, count)
+
+    The count is None for every choice when counts is None (not computed).
+    """
+    if counts is None:
+        return [(key, name, None) for key, name in choices]
+    return [(key, name, counts.get(key, 0)) for key, name in choices]
@@ -0,0 +1,91 @@
+"""
+Random featured recipes for the home page without ORDER BY RANDOM().
+
+Recipes are sampled by drawing random ids from the (cached) id range and
+fetching whichever of them exist, retrying a few times to cover gaps left
+by deleted recipes. That is O(k) index lookups instead of sorting the whole
+table on every request.
+
+With ``FEATURED_RECIPES_ROTATION`` set, the sample is seeded by the current
+rotation period and cached, so every worker shows the same featured set
+until the next rotation.
+"""
+
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Min
+
+from .cards import card_queryset, to_cards
+from .models import Recipe
+
+ID_RANGE_KEY = "recipes:featured:id_range"
+ID_RANGE_TIMEOUT = 300
+MAX_ATTEMPTS = 5
+
+
+def get_id_range():
+    """Return the cached (min id, max id) of recipes, or None if empty"""
+    id_range = cache.get(ID_RANGE_KEY)
+    if id_range is None:
+        bounds = Recipe.objects.aggregate(low=Min("id"), high=Max("id"))
+        id_range = (bounds["low"], bounds["high"])
+        cache.set(ID_RANGE_KEY, id_range, ID_RANGE_TIMEOUT)
+    if id_range[0] is None:
+        return None
+    return id_range
+
+
+def sample_recipes(count, rng=random):
+    """Pick up to ``count`` random recipe cards using id sampling"""
+    id_range = get_id_range()
+    if id_range is None:
+        return []
+    low, high = id_range
+
+    found = {}
+    for attempt in range(MAX_ATTEMPTS):
+        needed = count - len(found)
+        if needed <= 0:
+            break
+        # Over-sample to make up for ids that no longer exist
+        candidates = {rng.randint(low, high) for i in range(needed * 2)}
+        candidates -= found.keys()
+        recipes = Recipe.objects.filter(id__in=candidates)
+        for recipe in to_cards(card_queryset(recipes)[:needed]):
+            found[recipe.id] = recipe
+
+    # A very sparse id range can still come up short: top up with the
+    # newest recipes rather than returning fewer cards
+    needed = count - len(found)
+    if needed > 0:
+        recipes = Recipe.objects.exclude(id__in=found.keys())
+        for recipe in to_cards(card_queryset(recipes)[:needed]):
+            found[recipe.id] = recipe
+
+    recipes = list(found.values())
+    rng.shuffle(recipes)
+    return recipes
+
+
+def get_featured_recipes(count=None):
+    """Return the featured recipes for the home page"""
+    count = count or getattr(settings, "FEATURED_RECIPES_COUNT", 4)
+    rotation = getattr(settings, "FEATURED_RECIPES_ROTATION", 0)
+    if not rotation:
+        return sample_recipes(count)
+
+    # Same seed (and cache key) for everyone within a rotation period
+    period = int(time.time() // rotation)
+    key = f"recipes:featured:{period}:{count}"
+    ids = cache.get(key)
+    if ids is None:
+        recipes = sample_recipes(count, random.Random(period))
+        cache.set(key, [recipe.id for recipe in recipes], rotation)
+        return recipes
+
+    rows = card_queryset(Recipe.objects.filter(id__in=ids))
+    recipes = {recipe.id: recipe for recipe in to_cards(rows)}
+    return [recipes[pk] for pk in ids if pk in recipes]
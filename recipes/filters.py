@@ -0,0 +1,155 @@
+from .ingredients import normalize_pantry
+from .models import Recipe
+from .search import search_recipes
+
+
+def parse_tag_list(params, name):
+    """
+    Read a list of tag keys from a query parameter.
+
+    Accepts comma-separated values (?tags=vegan,quick) as well as
+    repeated parameters (?tags=vegan&tags=quick).
+    """
+    tags = []
+    for value in params.getlist(name):
+        tags.extend(tag.strip() for tag in value.split(",") if tag.strip())
+    return tags
+
+
+def parse_int(value):
+    """Return value as an int, or None if it is empty or invalid"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RecipeFilter:
+    """
+    Search, filter and sort parameters for recipe listings
+
+    Shared by every view that lists recipes so they all accept the same
+    query string as RecipeListView.
+    """
+
+    SORT_ORDERS = {
+        "newest": ["-created_at"],
+        "alphabetical": ["title"],
+        "prep_time": ["prep_time"],
+        "cook_time": ["cook_time"],
+    }
+
+    # Keyset orderings for cursor pagination; each ends in the unique id
+    KEYSET_ORDERS = {
+        "newest": ["-created_at", "id"],
+        "alphabetical": ["title", "id"],
+        "prep_time": ["prep_time", "id"],
+        "cook_time": ["cook_time", "id"],
+    }
+
+    def __init__(self, params):
+        self.query = params.get("q", "").strip()
+        self.category = params.get("category", "").strip()
+        if self.category == "all":
+            self.category = ""
+        self.tags = parse_tag_list(params, "tags")
+        self.any_tags = parse_tag_list(params, "any_tags")
+        self.exclude_tags = parse_tag_list(params, "exclude_tags")
+        self.max_prep_time = parse_int(params.get("max_prep_time", ""))
+        self.max_cook_time = parse_int(params.get("max_cook_time", ""))
+        # "Cook with what I have": ingredients on hand, comma-separated
+        self.pantry = parse_tag_list(params, "pantry")
+        default_sort = "coverage" if self.pantry else "newest"
+        self.sort = params.get("sort", "").strip() or default_sort
+
+    @property
+    def has_filters(self):
+        return any(
+            [
+                self.query,
+                self.category,
+                self.tags,
+                self.any_tags,
+                self.exclude_tags,
+                self.max_prep_time is not None,
+                self.max_cook_time is not None,
+                self.pantry,
+            ]
+        )
+
+    def filter(self, queryset=None):
+        """Apply search and filtering (but no ordering) to a queryset"""
+        if queryset is None:
+            queryset = Recipe.objects.all()
+
+        # Apply full-text search (annotates matches with search_rank)
+        if self.query:
+            queryset = search_recipes(queryset, self.query)
+
+        # Apply meal type filter
+        if self.category:
+            queryset = queryset.filter(meal_type=self.category)
+
+        # Apply tag filters as bitwise predicates on tag_bits
+        queryset = queryset.with_all_tags(self.tags)
+        queryset = queryset.with_any_tags(self.any_tags)
+        queryset = queryset.without_tags(self.exclude_tags)
+
+        # Apply time filters
+        if self.max_prep_time is not None:
+            queryset = queryset.filter(prep_time__lte=self.max_prep_time)
+        if self.max_cook_time is not None:
+            queryset = queryset.filter(cook_time__lte=self.max_cook_time)
+
+        # Only recipes using a pantry item, annotated with their coverage
+        if self.pantry:
+            queryset = queryset.with_pantry_coverage(self.pantry)
+
+        return queryset
+
+    def get_ordering(self):
+        """Return the order_by() fields for the requested sort"""
+        if self.sort == "relevance" and self.query:
+            return ["-search_rank", "-created_at"]
+        if self.sort == "coverage" and self.pantry:
+            return ["-pantry_coverage", "-pantry_matches", "-created_at"]
+        return self.SORT_ORDERS.get(self.sort, self.SORT_ORDERS["newest"])
+
+    def get_keyset_ordering(self):
+        """
+        Ordering for cursor pagination, or None for sorts (relevance,
+        coverage) that have no stored sort key
+        """
+        if self.sort == "relevance" and self.query:
+            return None
+        if self.sort == "coverage" and self.pantry:
+            return None
+        return self.KEYSET_ORDERS.get(self.sort, self.KEYSET_ORDERS["newest"])
+
+    def get_queryset(self, queryset=None):
+        """Filtered and sorted queryset"""
+        return self.filter(queryset).order_by(*self.get_ordering())
+
+    def normalized(self):
+        """
+        Canonical form of the filters, independent of parameter order and
+        duplicate tags. Unknown required or any-of tags make a filter
+        match nothing, so only unknown excluded tags are dropped.
+        """
+
+        def unique(tags):
+            return ",".join(sorted(set(tags)))
+
+        def known(tags):
+            return ",".join(sorted(set(Recipe.TAG_BITS) & set(tags)))
+
+        return (
+            ("q", " ".join(self.query.lower().split())),
+            ("category", self.category),
+            ("tags", unique(self.tags)),
+            ("any_tags", unique(self.any_tags)),
+            ("exclude_tags", known(self.exclude_tags)),
+            ("max_prep_time", self.max_prep_time),
+            ("max_cook_time", self.max_cook_time),
+            ("pantry", ",".join(normalize_pantry(self.pantry))),
+        )
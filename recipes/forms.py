@@ -236,6 +236,31 @@ class CommentForm(forms.ModelForm):
         return body
 
 
+class ReplyForm(CommentForm):
+    """Comment form that can also reply to an approved comment"""
+
+    class Meta(CommentForm.Meta):
+        fields = ["body", "parent"]
+        widgets = {
+            **CommentForm.Meta.widgets,
+            "parent": forms.HiddenInput(),
+        }
+
+    def __init__(self, *args, recipe_id, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["parent"].required = False
+        self.fields["parent"].queryset = Comment.objects.filter(
+            recipe_id=recipe_id, approved=True
+        ).select_related("parent")
+
+    def clean_parent(self):
+        """Reply next to comments already at the deepest level"""
+        parent = self.cleaned_data.get("parent")
+        if parent and parent.depth >= Comment.MAX_DEPTH:
+            parent = parent.parent
+        return parent
+
+
 class RecipeSearchForm(forms.Form):
     """Advanced search form for recipes"""
 
@@ -0,0 +1,100 @@
+"""
+Template fragment cache for per-recipe blocks (cards, ingredients, etc.).
+
+Fragments are keyed on (name, recipe id, recipe updated_at), so an edited
+recipe simply stops matching its old entries and no invalidation is needed.
+Keys also carry a hash of the template source the fragment comes from and
+settings.FRAGMENT_VERSION, so a deploy that changes the markup does not
+keep serving the old one; bump the setting when a fragment's output
+changes through something else (an included template, a filter).
+Keys do not depend on the page or the user, so the same card is shared by
+every listing and every visitor.
+
+Hits and misses are counted in process and flushed to the cache in
+batches, so monitoring sees totals across workers without an extra cache
+round trip per fragment.
+"""
+
+import hashlib
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+FRAGMENT_CACHE_TIMEOUT = getattr(settings, "FRAGMENT_CACHE_TIMEOUT", 86400)
+STATS_FLUSH_EVERY = 100
+HIT = "hits"
+MISS = "misses"
+
+_pending = Counter()
+_lock = threading.Lock()
+
+
+def source_version(source):
+    """Short hash of a template's source"""
+    digest = hashlib.md5(source.encode(), usedforsecurity=False)
+    return digest.hexdigest()[:12]
+
+
+def fragment_key(name, recipe, version=""):
+    stamp = recipe.updated_at.timestamp() if recipe.updated_at else 0
+    release = getattr(settings, "FRAGMENT_VERSION", "1")
+    return (
+        f"recipes:fragment:{release}.{version}:"
+        f"{name}:{recipe.pk}:{stamp}"
+    )
+
+
+def stats_key(outcome):
+    return f"recipes:fragment:stats:{outcome}"
+
+
+def record(outcome):
+    """Count a hit or miss, flushing to the cache every few events"""
+    with _lock:
+        _pending[outcome] += 1
+        if sum(_pending.values()) < STATS_FLUSH_EVERY:
+            return
+    flush_stats()
+
+
+def flush_stats():
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+    for outcome, count in pending.items():
+        try:
+            cache.incr(stats_key(outcome), count)
+        except ValueError:
+            cache.set(stats_key(outcome), count, None)
+
+
+def get_stats():
+    """Hit and miss totals (including this process's unflushed counts)"""
+    flush_stats()
+    values = cache.get_many([stats_key(HIT), stats_key(MISS)])
+    hits = values.get(stats_key(HIT), 0)
+    misses = values.get(stats_key(MISS), 0)
+    lookups = hits + misses
+    return {
+        HIT: hits,
+        MISS: misses,
+        "hit_rate": hits / lookups if lookups else None,
+    }
+
+
+def get_fragment(name, recipe, render, version=""):
+    """
+    Cached output of render() for a recipe fragment; ``version`` tells
+    apart the outputs of different template sources
+    """
+    key = fragment_key(name, recipe, version)
+    content = cache.get(key)
+    if content is not None:
+        record(HIT)
+        return content
+    record(MISS)
+    content = render()
+    cache.set(key, content, FRAGMENT_CACHE_TIMEOUT)
+    return content
@@ -0,0 +1,272 @@
+"""
+Bulk import of recipes from NDJSON, JSON or CSV.
+
+Rows are streamed from the input (a JSON array is decoded one element at a
+time, never loaded whole), validated with RecipeForm and written with
+bulk_create() in batches, one transaction per batch. Authors are looked up
+by username (or by pk, for loaddata-style fixture records) once per batch.
+
+bulk_create() sends no signals, so ``import_batch`` does by hand what the
+handlers in ``recipes.signals`` would have done per recipe: derived fields,
+parsed ingredients, search documents, site counters and the facet and page
+caches. Similar recipes are left to ``manage.py build_similarity
+--incremental``, which picks up the new rows.
+"""
+
+import copy
+import csv
+import json
+import os
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+
+from . import counters, pagecache, search
+from .facets import invalidate_facets
+from .forms import RecipeForm
+from .models import Recipe, RecipeIngredient
+
+FORMATS = ["ndjson", "json", "csv"]
+EXTENSIONS = {
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".json": "json",
+    ".csv": "csv",
+}
+DEFAULT_BATCH_SIZE = 500
+READ_SIZE = 64 * 1024
+# Authors remembered between batches before the lookup cache is reset
+MAX_CACHED_AUTHORS = 10000
+
+
+class InvalidImportFile(Exception):
+    """The input cannot be read at all (as opposed to one bad row)"""
+
+
+def guess_format(path):
+    """Input format from a file name, or None"""
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+
+def read_ndjson(stream):
+    """Yield one object per non-blank line"""
+    for number, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                message = f"Line {number}: {error}"
+                raise InvalidImportFile(message) from error
+
+
+def read_json(stream, read_size=READ_SIZE):
+    """Yield the elements of a top-level JSON array one at a time"""
+    decoder = json.JSONDecoder()
+    buffer = stream.read(read_size).lstrip()
+    if not buffer.startswith("["):
+        raise InvalidImportFile("Expected a JSON array of recipes.")
+    position = 1
+    eof = False
+    while True:
+        # Skip separators, reading more input when the buffer runs out
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            buffer, position = stream.read(read_size), 0
+            eof = not buffer
+        if position >= len(buffer):
+            raise InvalidImportFile("Unexpected end of the JSON array.")
+        if buffer[position] == "]":
+            return
+        try:
+            element, end = decoder.raw_decode(buffer, position)
+        except ValueError as error:
+            if eof:
+                raise InvalidImportFile(f"Invalid JSON: {error}") from error
+            more = stream.read(read_size)
+            eof = not more
+            buffer = buffer[position:] + more
+            position = 0
+            continue
+        yield element
+        position = end
+
+
+def read_csv(stream):
+    """Yield one dict per CSV row, keyed on the header row"""
+    csv.field_size_limit(1024 * 1024)
+    yield from csv.DictReader(stream)
+
+
+READERS = {"ndjson": read_ndjson, "json": read_json, "csv": read_csv}
+
+
+def read_rows(stream, format):
+    """
+    Yield recipe dicts from the input, unwrapping loaddata fixture records
+    ({"model": ..., "fields": {...}}) and skipping other models
+    """
+    for row in READERS[format](stream):
+        if not isinstance(row, dict):
+            raise InvalidImportFile("Every recipe must be an object.")
+        if "fields" in row:
+            if row.get("model", "recipes.recipe") != "recipes.recipe":
+                continue
+            row = row["fields"]
+        yield row
+
+
+def form_data(row):
+    """RecipeForm data for an input row, with model defaults for gaps"""
+    data = {}
+    for name in RecipeForm.Meta.fields:
+        if name in ("image", "recipe_tags"):
+            continue
+        value = row.get(name)
+        if value is None or value == "":
+            field = Recipe._meta.get_field(name)
+            value = field.get_default() if field.has_default() else ""
+        data[name] = value
+    tags = row.get("recipe_tags") or []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    data["recipe_tags"] = [tag.strip() for tag in tags if tag.strip()]
+    return data
+
+
+def bind_form(template, data):
+    """
+    A bound copy of an unbound RecipeForm that shares its fields. Building
+    each form from scratch deep-copies every field and its choices, which
+    was half of the import time; validation never modifies the fields.
+    """
+    form = copy.copy(template)
+    form.data = data
+    form.is_bound = True
+    form.instance = Recipe()
+    form._errors = None
+    form._bound_fields_cache = {}
+    return form
+
+
+def form_errors(form):
+    return "; ".join(
+        f"{field}: {' '.join(messages)}" if field != "__all__"
+        else " ".join(messages)
+        for field, messages in form.errors.items()
+    )
+
+
+class RecipeImporter:
+    """
+    Validate and write recipes a batch at a time. Running totals are kept
+    in ``imported`` and ``skipped``; ``errors`` holds the (row number,
+    message) pairs of the rows skipped in the last batch.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.form = RecipeForm()
+        self.authors = {}
+        self.imported = 0
+        self.skipped = 0
+        self.errors = []
+
+    def run(self, rows, progress=None):
+        """Import an iterable of row dicts, calling progress() per batch"""
+        numbered = enumerate(rows, 1)
+        while True:
+            batch = list(islice(numbered, self.batch_size))
+            if not batch:
+                break
+            self.import_batch(batch)
+            if progress:
+                progress(self)
+        if self.imported and not self.dry_run:
+            invalidate_facets()
+            pagecache.invalidate_all()
+        return self.imported
+
+    def skip(self, number, message):
+        self.skipped += 1
+        self.errors.append((number, message))
+
+    def import_batch(self, batch):
+        """Validate a list of (row number, row) pairs and save the valid"""
+        self.errors = []
+        valid = []
+        for number, row in batch:
+            form = bind_form(self.form, form_data(row))
+            if not form.is_valid():
+                self.skip(number, form_errors(form))
+                continue
+            recipe = form.save(commit=False)
+            if row.get("image"):
+                recipe.image = row["image"]
+            valid.append((number, row.get("author"), recipe))
+
+        self.resolve_authors(author for number, author, recipe in valid)
+        recipes = []
+        for number, author, recipe in valid:
+            user_id = self.authors.get(self.author_key(author))
+            if user_id is None:
+                self.skip(number, f"author: Unknown user {author!r}.")
+                continue
+            recipe.author_id = user_id
+            recipe.refresh_derived_fields()
+            recipes.append(recipe)
+
+        if recipes and not self.dry_run:
+            self.save(recipes)
+        self.imported += len(recipes)
+
+    def author_key(self, author):
+        """Usernames are looked up by name, fixture integers by pk"""
+        if isinstance(author, int):
+            return ("pk", author)
+        return ("username", str(author or "").strip())
+
+    def resolve_authors(self, authors):
+        """Fetch the users of a batch that are not cached yet"""
+        keys = {self.author_key(author) for author in authors}
+        missing = keys - set(self.authors)
+        if not missing:
+            return
+        if len(self.authors) + len(missing) > MAX_CACHED_AUTHORS:
+            # Start over, refetching the batch's cached authors too
+            self.authors = {}
+            missing = keys
+        pks = [value for kind, value in missing if kind == "pk"]
+        names = [value for kind, value in missing if kind == "username"]
+        users = User.objects.filter(
+            Q(pk__in=pks) | Q(username__in=names)
+        ).values_list("pk", "username")
+        for pk, username in users:
+            self.authors[("pk", pk)] = pk
+            self.authors[("username", username)] = pk
+
+    def save(self, recipes):
+        """Write a batch and do the work of the post_save handlers"""
+        with transaction.atomic():
+            Recipe.objects.bulk_create(recipes)
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, position=position, **row._asdict()
+                )
+                for recipe in recipes
+                for position, row in enumerate(recipe._parsed_ingredients)
+            )
+            search.index_recipes(recipes)
+            delta = Counter()
+            for recipe in recipes:
+                recipe._counted_state = recipe.get_counted_state()
+                delta.update(
+                    counters.recipe_delta(None, recipe._counted_state)
+                )
+            counters.increment(delta)
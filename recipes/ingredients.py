@@ -0,0 +1,255 @@
+"""
+Parse free-text ingredient lines into quantity, unit and ingredient name.
+
+"1 1/2 cups plain flour, sifted" becomes quantity 1.5, unit "cup" and name
+"plain flour" with keyword "flour". Names are normalized (lower case,
+preparation notes and descriptors dropped, simple plurals singularized) so
+that pantry items like "Eggs" or "flour" can be matched with indexed
+equality lookups instead of LIKE scans over the recipe text.
+"""
+
+import re
+from collections import namedtuple
+from fractions import Fraction
+
+ParsedIngredient = namedtuple(
+    "ParsedIngredient", ["text", "quantity", "unit", "name", "keyword"]
+)
+
+UNICODE_FRACTIONS = {
+    "½": "1/2",
+    "⅓": "1/3",
+    "⅔": "2/3",
+    "¼": "1/4",
+    "¾": "3/4",
+    "⅛": "1/8",
+}
+
+# Canonical unit for each spelling
+UNITS = {
+    "g": "g",
+    "gram": "g",
+    "grams": "g",
+    "kg": "kg",
+    "kilogram": "kg",
+    "kilograms": "kg",
+    "mg": "mg",
+    "ml": "ml",
+    "millilitre": "ml",
+    "milliliter": "ml",
+    "millilitres": "ml",
+    "milliliters": "ml",
+    "l": "l",
+    "litre": "l",
+    "liter": "l",
+    "litres": "l",
+    "liters": "l",
+    "tsp": "tsp",
+    "teaspoon": "tsp",
+    "teaspoons": "tsp",
+    "tbsp": "tbsp",
+    "tablespoon": "tbsp",
+    "tablespoons": "tbsp",
+    "cup": "cup",
+    "cups": "cup",
+    "oz": "oz",
+    "ounce": "oz",
+    "ounces": "oz",
+    "lb": "lb",
+    "lbs": "lb",
+    "pound": "lb",
+    "pounds": "lb",
+    "pinch": "pinch",
+    "pinches": "pinch",
+    "dash": "dash",
+    "clove": "clove",
+    "cloves": "clove",
+    "can": "can",
+    "cans": "can",
+    "tin": "can",
+    "tins": "can",
+    "slice": "slice",
+    "slices": "slice",
+    "bunch": "bunch",
+    "handful": "handful",
+    "sprig": "sprig",
+    "sprigs": "sprig",
+    "stick": "stick",
+    "sticks": "stick",
+    "piece": "piece",
+    "pieces": "piece",
+    "packet": "packet",
+    "pack": "packet",
+}
+
+# Words describing preparation or size rather than the ingredient itself
+DESCRIPTORS = {
+    "fresh",
+    "freshly",
+    "frozen",
+    "dried",
+    "canned",
+    "large",
+    "medium",
+    "small",
+    "chopped",
+    "finely",
+    "roughly",
+    "diced",
+    "minced",
+    "sliced",
+    "grated",
+    "crushed",
+    "ground",
+    "peeled",
+    "softened",
+    "melted",
+    "beaten",
+    "whole",
+    "boneless",
+    "skinless",
+    "ripe",
+    "cooked",
+    "uncooked",
+    "raw",
+    "thawed",
+    "drained",
+    "optional",
+    "to",
+    "taste",
+    "about",
+    "of",
+    "a",
+    "an",
+}
+
+# Parts of an ingredient: "chicken breast" is found under "chicken"
+PART_WORDS = {
+    "breast",
+    "thigh",
+    "drumstick",
+    "fillet",
+    "leaf",
+    "heart",
+    "juice",
+    "zest",
+    "stock",
+    "powder",
+    "flake",
+    "seed",
+    "sprig",
+    "clove",
+    "floret",
+    "wedge",
+}
+
+# Plurals that the suffix rules below would get wrong
+IRREGULAR_PLURALS = {
+    "leaves": "leaf",
+    "loaves": "loaf",
+    "halves": "half",
+    "knives": "knife",
+}
+INVARIANT_WORDS = {"asparagus", "couscous", "hummus", "molasses", "swiss"}
+
+NUMBER = r"\d+\s+\d+/\d+|\d+/\d+|\d+(?:[.,]\d+)?"
+QUANTITY = re.compile(
+    rf"^\s*(?P<qty>{NUMBER})(?:\s*(?:-|–|to)\s*(?:{NUMBER}))?\s*"
+)
+UNIT_WORD = re.compile(r"^(?P<unit>[a-z]+)\.?(?:\s+|$)")
+PARENTHESES = re.compile(r"\([^)]*\)")
+WORD = re.compile(r"[a-z]+(?:-[a-z]+)*")
+
+MAX_NAME_LENGTH = 100
+MAX_KEYWORD_LENGTH = 50
+
+
+def parse_quantity(text):
+    """Return a numeric quantity for "2", "1.5", "1/2" or "1 1/2"""
+    total = Fraction(0)
+    for part in text.replace(",", ".").split():
+        total += Fraction(part)
+    return float(total)
+
+
+def singularize(word):
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if word in INVARIANT_WORDS or len(word) <= 3 or word.endswith("ss"):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize_name(text):
+    """
+    Canonical ingredient name: lower case, no notes in parentheses or after
+    a comma, no descriptors, singular words
+    """
+    text = PARENTHESES.sub(" ", text.lower()).split(",")[0]
+    words = [
+        singularize(word)
+        for word in WORD.findall(text)
+        if word not in DESCRIPTORS
+    ]
+    return " ".join(words)[:MAX_NAME_LENGTH]
+
+
+def name_keyword(name):
+    """The word of a name that pantry items are most likely to use"""
+    words = name.split()
+    if len(words) > 1 and words[-1] in PART_WORDS:
+        return words[-2][:MAX_KEYWORD_LENGTH]
+    return words[-1][:MAX_KEYWORD_LENGTH]
+
+
+def parse_ingredient(line):
+    """Parse one ingredient line, or return None for blanks and headings"""
+    text = line.strip()
+    if not text or text.endswith(":"):
+        return None
+
+    for char, fraction in UNICODE_FRACTIONS.items():
+        text = text.replace(char, f" {fraction}")
+    rest = PARENTHESES.sub(" ", text.lower())
+
+    quantity = None
+    match = QUANTITY.match(rest)
+    if match:
+        quantity = parse_quantity(match.group("qty"))
+        rest = rest[match.end():]
+
+    unit = ""
+    match = UNIT_WORD.match(rest)
+    if match and match.group("unit") in UNITS:
+        unit = UNITS[match.group("unit")]
+        rest = rest[match.end():]
+
+    name = normalize_name(rest)
+    if not name:
+        return None
+    return ParsedIngredient(
+        text=line.strip()[:300],
+        quantity=quantity,
+        unit=unit,
+        name=name,
+        keyword=name_keyword(name),
+    )
+
+
+def parse_ingredients(text):
+    """Parse a recipe's ingredients text, one ingredient per line"""
+    parsed = (parse_ingredient(line) for line in (text or "").split("\n"))
+    return [ingredient for ingredient in parsed if ingredient]
+
+
+def normalize_pantry(items):
+    """Normalized names for a list of pantry items"""
+    names = {normalize_name(item) for item in items}
+    names.discard("")
+    return sorted(names)
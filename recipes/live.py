@@ -0,0 +1,94 @@
+"""
+Live comment updates for open recipe detail pages.
+
+Each recipe has a channel group that its detail pages join over a
+WebSocket (recipes.consumers). Approved comments, edits and removals are
+pushed to the group once the transaction that made them commits, one
+message per recipe per batch: the admin's bulk approval of thousands of
+comments sends a single message to each affected page, carrying the
+newest comments (rendered the way the page renders them) and the new
+approved count.
+
+The channel layer comes from settings.CHANNEL_LAYERS: in-process memory
+for a single server, Redis when pages are served by several processes.
+"""
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import Count
+from django.template.loader import render_to_string
+
+# Comments pushed per recipe per batch; pages reload to see the rest
+MAX_PUSHED_COMMENTS = 20
+
+
+def comments_group(recipe_id):
+    return f"recipe.{recipe_id}.comments"
+
+
+def render_comment(comment):
+    return render_to_string(
+        "recipes/includes/comment.html", {"comment": comment}
+    )
+
+
+def push_comments(comment_ids, removed=()):
+    """
+    Push the current state of some comments to their recipes' pages once
+    the current transaction commits
+
+    ``removed`` is (recipe id, comment id) pairs of comments that are gone
+    or no longer approved.
+    """
+    comment_ids, removed = list(comment_ids), list(removed)
+    if comment_ids or removed:
+        transaction.on_commit(lambda: send_comments(comment_ids, removed))
+
+
+def send_comments(comment_ids, removed=()):
+    """Send one message per recipe with its changed comments"""
+    from .models import Comment
+
+    layer = get_channel_layer()
+    if layer is None:
+        return
+
+    changes = {}
+    for recipe_id, comment_id in removed:
+        changes.setdefault(recipe_id, {"comments": [], "removed": []})
+        changes[recipe_id]["removed"].append(comment_id)
+
+    comments = (
+        Comment.objects.filter(id__in=comment_ids, approved=True)
+        .select_related("author")
+        .order_by("-created_on", "-id")
+    )
+    for comment in comments.iterator():
+        change = changes.setdefault(
+            comment.recipe_id, {"comments": [], "removed": []}
+        )
+        if len(change["comments"]) < MAX_PUSHED_COMMENTS:
+            change["comments"].append(
+                {"id": comment.id, "html": render_comment(comment)}
+            )
+
+    # Counted from the comments rather than the SiteCounter rows, which
+    # post_save receivers may not have adjusted yet outside a transaction
+    counts = dict(
+        Comment.objects.filter(recipe_id__in=changes, approved=True)
+        .order_by()
+        .values_list("recipe_id")
+        .annotate(total=Count("id"))
+    )
+    group_send = async_to_sync(layer.group_send)
+    for recipe_id, change in changes.items():
+        group_send(
+            comments_group(recipe_id),
+            {
+                "type": "comments.changed",
+                "comments": change["comments"],
+                "removed": change["removed"],
+                "count": counts.get(recipe_id, 0),
+            },
+        )
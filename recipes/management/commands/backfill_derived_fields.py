@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes import counters, pagecache, search
+from recipes.facets import invalidate_facets
+from recipes.models import Recipe, Comment
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the stored display fields of recipes (summary, tags, "
+        "ingredient and step lists, parsed ingredients) and comments "
+        "(body_html)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Rows updated per query (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        # bulk_update() skips save(), so updated_at is left alone, and so are
+        # the signal handlers: the search documents and detail pages of
+        # changed rows are refreshed per batch, and the counters, facets and
+        # list pages once at the end
+        recipes = self.backfill(
+            Recipe.objects.all(),
+            Recipe.refresh_derived_fields,
+            Recipe.DERIVED_FIELDS,
+            batch_size,
+        )
+        comments = self.backfill(
+            Comment.objects.all(),
+            Comment.refresh_derived_fields,
+            ["body_html"],
+            batch_size,
+        )
+        counters.recount()
+        invalidate_facets()
+        pagecache.invalidate_all()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Updated {recipes} recipes and {comments} comments."
+            )
+        )
+
+    def backfill(self, queryset, refresh, fields, batch_size):
+        model = queryset.model
+        batch = []
+        changed = []
+        total = 0
+        for obj in queryset.order_by("pk").iterator(chunk_size=batch_size):
+            before = [getattr(obj, field) for field in fields]
+            refresh(obj)
+            batch.append(obj)
+            if [getattr(obj, field) for field in fields] != before:
+                changed.append(obj)
+            if len(batch) >= batch_size:
+                total += self.update(model, batch, fields, changed)
+                batch = []
+                changed = []
+        if batch:
+            total += self.update(model, batch, fields, changed)
+        return total
+
+    def update(self, model, batch, fields, changed):
+        with transaction.atomic():
+            model.objects.bulk_update(batch, fields)
+            if model is Recipe:
+                for recipe in batch:
+                    recipe.save_parsed_ingredients()
+                search.index_recipes(changed)
+                recipe_ids = {recipe.pk for recipe in changed}
+            else:
+                recipe_ids = {comment.recipe_id for comment in changed}
+        for recipe_id in recipe_ids:
+            pagecache.invalidate_recipe(recipe_id)
+        return len(batch)
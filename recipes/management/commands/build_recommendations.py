@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from recipes.recommendations import (
+    DEFAULT_FEED_SIZE,
+    DEFAULT_NEIGHBOURS,
+    build_recommendations,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute co-commented recipes and personalized home page feeds "
+        "from approved comments"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--neighbours",
+            type=int,
+            default=DEFAULT_NEIGHBOURS,
+            help=f"Co-commented recipes kept per recipe "
+            f"(default: {DEFAULT_NEIGHBOURS})",
+        )
+        parser.add_argument(
+            "--feed-size",
+            type=int,
+            default=DEFAULT_FEED_SIZE,
+            help=f"Recommendations kept per user "
+            f"(default: {DEFAULT_FEED_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        recipes, users = build_recommendations(
+            options["neighbours"], options["feed_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stored co-commented recipes for {recipes} recipes and "
+                f"feeds for {users} users."
+            )
+        )
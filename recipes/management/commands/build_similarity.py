@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import DEFAULT_NEIGHBOURS, build_similarity
+
+
+class Command(BaseCommand):
+    help = "Compute the similar recipes shown on recipe detail pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only update lists affected by changes since the last build",
+        )
+        parser.add_argument(
+            "-k",
+            "--neighbours",
+            type=int,
+            default=DEFAULT_NEIGHBOURS,
+            help=f"Similar recipes kept per recipe "
+            f"(default: {DEFAULT_NEIGHBOURS})",
+        )
+
+    def handle(self, *args, **options):
+        updated = build_similarity(
+            options["neighbours"], incremental=options["incremental"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Updated similar recipes for {updated} recipes."
+            )
+        )
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+
+from recipes.exporter import DEFAULT_CHUNK_SIZE, FORMATS, export_lines
+from recipes.filters import RecipeFilter
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream recipes with their authors, tags and approved comments as "
+        "NDJSON or CSV"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=FORMATS, default="ndjson", help="Output format"
+        )
+        parser.add_argument(
+            "-o",
+            "--output",
+            default="-",
+            help="File to write (default: standard output)",
+        )
+        parser.add_argument(
+            "--filter",
+            default="",
+            help="Recipe list query string, e.g. 'category=dinner&tags=vegan'",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f"Rows fetched per database round trip "
+            f"(default: {DEFAULT_CHUNK_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        format = options["format"]
+        recipes = RecipeFilter(QueryDict(options["filter"])).filter()
+        lines = export_lines(recipes, format, options["chunk_size"])
+        if options["output"] == "-":
+            count = self.write(
+                lines, lambda line: self.stdout.write(line, ending="")
+            )
+        else:
+            newline = "" if format == "csv" else None
+            try:
+                with open(
+                    options["output"], "w", encoding="utf-8", newline=newline
+                ) as stream:
+                    count = self.write(lines, stream.write)
+            except OSError as error:
+                raise CommandError(error)
+        if format == "csv":
+            count -= 1  # the header
+        self.stderr.write(f"Exported {count} recipes.")
+
+    def write(self, lines, write):
+        count = 0
+        for line in lines:
+            write(line)
+            count += 1
+        return count
@@ -0,0 +1,89 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.importer import (
+    DEFAULT_BATCH_SIZE,
+    FORMATS,
+    InvalidImportFile,
+    RecipeImporter,
+    guess_format,
+    read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream recipes from an NDJSON, JSON or CSV file, validate them like "
+        "the recipe form and insert them in batches"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", help="File to import, or - to read standard input"
+        )
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Input format (default: from the file extension)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Rows inserted per transaction "
+            f"(default: {DEFAULT_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate the input without writing anything",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or (path != "-" and guess_format(path))
+        if not format:
+            raise CommandError("Cannot tell the format; pass --format.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        importer = RecipeImporter(options["batch_size"], options["dry_run"])
+        self.verbosity = options["verbosity"]
+        self.started = time.monotonic()
+        try:
+            if path == "-":
+                importer.run(read_rows(sys.stdin, format), self.progress)
+            else:
+                newline = "" if format == "csv" else None
+                with open(path, encoding="utf-8", newline=newline) as stream:
+                    importer.run(read_rows(stream, format), self.progress)
+        except OSError as error:
+            raise CommandError(error)
+        except InvalidImportFile as error:
+            raise CommandError(
+                f"{error} ({importer.imported} recipes were imported.)"
+            )
+
+        verb = "Validated" if options["dry_run"] else "Imported"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {importer.imported} recipes, skipped "
+                f"{importer.skipped} ({self.rate(importer)})."
+            )
+        )
+
+    def rate(self, importer):
+        elapsed = time.monotonic() - self.started
+        rows = importer.imported + importer.skipped
+        return f"{rows / max(elapsed, 1e-6):.0f} rows/s"
+
+    def progress(self, importer):
+        for number, message in importer.errors:
+            self.stderr.write(f"Row {number}: {message}")
+        if self.verbosity >= 2:
+            self.stdout.write(
+                f"{importer.imported} imported, {importer.skipped} skipped "
+                f"({self.rate(importer)})"
+            )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from recipes import search
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search documents for every recipe"
+
+    def handle(self, *args, **options):
+        backend = search.get_search_backend()
+        with transaction.atomic(), connection.cursor() as cursor:
+            backend.drop_schema(cursor)
+            backend.create_schema(cursor)
+            count = search.rebuild_index(Recipe.objects.all())
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {count} recipes.")
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipes.counters import recount, recount_replies
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the materialized site counters and comment reply counts "
+        "from scratch"
+    )
+
+    def handle(self, *args, **options):
+        counts = recount()
+        threads = recount_replies()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {len(counts)} counters and the reply counts of "
+                f"{threads} comments."
+            )
+        )
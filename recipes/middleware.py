@@ -0,0 +1,117 @@
+import logging
+import time
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+def get_query_budget(view_name):
+    """
+    Return the {"queries": n, "time_ms": ms} budget declared for a URL name
+    in settings.QUERY_BUDGETS, or None if it has no budget
+    """
+    return getattr(settings, "QUERY_BUDGETS", {}).get(view_name)
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper counting queries and their total time
+
+    Usage::
+
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            ...
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+    @property
+    def duration_ms(self):
+        return self.duration * 1000
+
+    def exceeds(self, budget):
+        """Return a list of the ways this recording exceeds a budget"""
+        problems = []
+        if "queries" in budget and self.count > budget["queries"]:
+            problems.append(f"{self.count} queries > {budget['queries']}")
+        if "time_ms" in budget and self.duration_ms > budget["time_ms"]:
+            problems.append(
+                f"{self.duration_ms:.1f}ms of SQL > {budget['time_ms']}ms"
+            )
+        return problems
+
+
+class QueryBudgetMiddleware:
+    """
+    Development middleware warning about requests over their query budget
+
+    Enabled when settings.QUERY_BUDGET_WARNINGS is true (defaults to DEBUG).
+    Budgets are declared per URL name in settings.QUERY_BUDGETS.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "QUERY_BUDGET_WARNINGS", settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        self.check_budget(request, recorder)
+        return response
+
+    async def __acall__(self, request):
+        # Async views run their queries on the request's thread-sensitive
+        # sync thread, so the recorder goes on that thread's connection
+        recorder = QueryRecorder()
+        await sync_to_async(
+            lambda: connection.execute_wrappers.append(recorder)
+        )()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(
+                lambda: connection.execute_wrappers.remove(recorder)
+            )()
+        self.check_budget(request, recorder)
+        return response
+
+    def check_budget(self, request, recorder):
+        match = request.resolver_match
+        budget = get_query_budget(match.view_name) if match else None
+        if budget:
+            problems = recorder.exceeds(budget)
+            if problems:
+                logger.warning(
+                    "Query budget exceeded for %s (%s): %s",
+                    match.view_name,
+                    request.get_full_path(),
+                    ", ".join(problems),
+                )
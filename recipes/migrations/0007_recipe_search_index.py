@@ -0,0 +1,176 @@
+from django.db import migrations
+
+
+# The search side table and documents as they were when this migration was
+# written; later changes to recipes.search must not alter this backfill
+SEARCH_TABLE = "recipes_recipe_search"
+RECIPE_TABLE = "recipes_recipe"
+
+# Recipe.RECIPE_TAG_CHOICES when this migration was written
+TAG_LABELS = {
+    "italian": "Italian",
+    "mexican": "Mexican",
+    "asian": "Asian",
+    "chinese": "Chinese",
+    "indian": "Indian",
+    "american": "American",
+    "mediterranean": "Mediterranean",
+    "french": "French",
+    "thai": "Thai",
+    "japanese": "Japanese",
+    "vegetarian": "Vegetarian",
+    "vegan": "Vegan",
+    "gluten_free": "Gluten-Free",
+    "dairy_free": "Dairy-Free",
+    "keto": "Keto/Low-Carb",
+    "paleo": "Paleo",
+    "healthy": "Healthy & Light",
+    "low_sodium": "Low Sodium",
+    "grilled": "Grilled",
+    "baked": "Baked",
+    "fried": "Fried",
+    "steamed": "Steamed",
+    "slow_cooked": "Slow Cooked",
+    "no_cook": "No Cooking Required",
+    "soup": "Soup",
+    "salad": "Salad",
+    "pasta": "Pasta",
+    "pizza": "Pizza",
+    "burger": "Burger",
+    "sandwich": "Sandwich",
+    "casserole": "Casserole",
+    "stir_fry": "Stir Fry",
+    "chicken": "Chicken",
+    "beef": "Beef",
+    "pork": "Pork",
+    "seafood": "Seafood",
+    "fish": "Fish",
+    "lamb": "Lamb",
+    "turkey": "Turkey",
+    "quick": "Quick (Under 30 min)",
+    "easy": "Easy to Make",
+    "budget_friendly": "Budget-Friendly",
+    "one_pot": "One Pot/Pan",
+    "meal_prep": "Meal Prep Friendly",
+    "comfort_food": "Comfort Food",
+    "spicy": "Spicy",
+    "kid_friendly": "Kid-Friendly",
+}
+
+
+def build_document(recipe):
+    tags = [
+        tag.strip() for tag in (recipe.recipe_tags or "").split(",")
+        if tag.strip()
+    ]
+    tag_text = " ".join(
+        f"{tag.replace('_', ' ')} {TAG_LABELS.get(tag, '')}" for tag in tags
+    )
+    return {
+        "title": recipe.title or "",
+        "tags": tag_text,
+        "description": recipe.description or "",
+        "ingredients": recipe.ingredients or "",
+        "instructions": recipe.instructions or "",
+    }
+
+
+def create_sqlite_index(cursor, recipes):
+    # bm25 weights are applied at query time, in column order
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "title, tags, description, ingredients, instructions, "
+        "tokenize='porter unicode61')"
+    )
+    for recipe in recipes:
+        document = build_document(recipe)
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [recipe.pk]
+        )
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, tags, description, "
+            "ingredients, instructions) VALUES (%s, %s, %s, %s, %s, %s)",
+            [
+                recipe.pk,
+                document["title"],
+                document["tags"],
+                document["description"],
+                document["ingredients"],
+                document["instructions"],
+            ],
+        )
+
+
+def create_postgres_index(cursor, recipes):
+    # Weighted title (A) > tags (B) > description/ingredients (C) >
+    # instructions (D)
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+        "recipe_id bigint PRIMARY KEY "
+        f"REFERENCES {RECIPE_TABLE} (id) ON DELETE CASCADE "
+        "DEFERRABLE INITIALLY DEFERRED, "
+        "document tsvector NOT NULL)"
+    )
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_gin "
+        f"ON {SEARCH_TABLE} USING gin (document)"
+    )
+    for recipe in recipes:
+        document = build_document(recipe)
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (recipe_id, document) VALUES (%s, "
+            "setweight(to_tsvector(%s, %s), 'A') || "
+            "setweight(to_tsvector(%s, %s), 'B') || "
+            "setweight(to_tsvector(%s, %s), 'C') || "
+            "setweight(to_tsvector(%s, %s), 'D')) "
+            "ON CONFLICT (recipe_id) DO UPDATE SET document = "
+            "EXCLUDED.document",
+            [
+                recipe.pk,
+                "english",
+                document["title"],
+                "english",
+                document["tags"],
+                "english",
+                f"{document['description']} {document['ingredients']}",
+                "english",
+                document["instructions"],
+            ],
+        )
+
+
+INDEXERS = {
+    "sqlite": create_sqlite_index,
+    "postgresql": create_postgres_index,
+}
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    # Other databases search with an unindexed icontains scan
+    if connection.vendor not in INDEXERS:
+        return
+    Recipe = apps.get_model("recipes", "Recipe")
+    recipes = Recipe.objects.all().iterator(chunk_size=500)
+    with connection.cursor() as cursor:
+        INDEXERS[connection.vendor](cursor, recipes)
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor not in INDEXERS:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes",
+         "0006_alter_recipe_cook_time_alter_recipe_meal_type_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:19
+
+from django.db import migrations, models
+
+
+# Recipe.RECIPE_TAG_CHOICES keys in order when this migration was written;
+# a tag's bit is 1 << its position
+TAG_KEYS = [
+    "italian", "mexican", "asian", "chinese", "indian", "american",
+    "mediterranean", "french", "thai", "japanese", "vegetarian", "vegan",
+    "gluten_free", "dairy_free", "keto", "paleo", "healthy", "low_sodium",
+    "grilled", "baked", "fried", "steamed", "slow_cooked", "no_cook",
+    "soup", "salad", "pasta", "pizza", "burger", "sandwich", "casserole",
+    "stir_fry", "chicken", "beef", "pork", "seafood", "fish", "lamb",
+    "turkey", "quick", "easy", "budget_friendly", "one_pot", "meal_prep",
+    "comfort_food", "spicy", "kid_friendly",
+]
+TAG_BITS = {tag: 1 << position for position, tag in enumerate(TAG_KEYS)}
+
+
+def populate_tag_bits(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    recipes = Recipe.objects.exclude(recipe_tags="")
+    for recipe in recipes.only("id", "recipe_tags").iterator():
+        bits = 0
+        for tag in recipe.recipe_tags.split(","):
+            bits |= TAG_BITS.get(tag.strip(), 0)
+        Recipe.objects.filter(pk=recipe.pk).update(tag_bits=bits)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_recipe_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="tag_bits",
+            field=models.BigIntegerField(
+                db_index=True, default=0, editable=False
+            ),
+        ),
+        migrations.AlterField(
+            model_name="recipe",
+            name="meal_type",
+            field=models.CharField(
+                choices=[
+                    ("breakfast", "Breakfast"),
+                    ("lunch", "Lunch"),
+                    ("dinner", "Dinner"),
+                    ("snacks", "Snacks & Appetizers"),
+                    ("dessert", "Desserts"),
+                    ("beverages", "Beverages"),
+                ],
+                default="dinner",
+                help_text="Select the primary meal type for this recipe",
+                max_length=50,
+            ),
+        ),
+        migrations.RunPython(populate_tag_bits, migrations.RunPython.noop),
+    ]
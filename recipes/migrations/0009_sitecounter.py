@@ -0,0 +1,94 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:22
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F
+from django.db.models.lookups import Exact
+
+
+# Recipe.MEAL_TYPE_CHOICES keys when this migration was written
+MEAL_TYPES = ["breakfast", "lunch", "dinner", "snacks", "dessert", "beverages"]
+
+# Recipe.RECIPE_TAG_CHOICES keys in order when this migration was written;
+# a tag's bit is 1 << its position
+TAG_KEYS = [
+    "italian", "mexican", "asian", "chinese", "indian", "american",
+    "mediterranean", "french", "thai", "japanese", "vegetarian", "vegan",
+    "gluten_free", "dairy_free", "keto", "paleo", "healthy", "low_sodium",
+    "grilled", "baked", "fried", "steamed", "slow_cooked", "no_cook",
+    "soup", "salad", "pasta", "pizza", "burger", "sandwich", "casserole",
+    "stir_fry", "chicken", "beef", "pork", "seafood", "fish", "lamb",
+    "turkey", "quick", "easy", "budget_friendly", "one_pot", "meal_prep",
+    "comfort_food", "spicy", "kid_friendly",
+]
+TAG_BITS = {tag: 1 << position for position, tag in enumerate(TAG_KEYS)}
+
+
+def populate_counters(apps, schema_editor):
+    """recipes.counters.recount() as it was when this was written"""
+    Recipe = apps.get_model("recipes", "Recipe")
+    Comment = apps.get_model("recipes", "Comment")
+    SiteCounter = apps.get_model("recipes", "SiteCounter")
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+
+    counts = {
+        "recipes": Recipe.objects.count(),
+        "users": User.objects.count(),
+    }
+    for meal_type in MEAL_TYPES:
+        counts[f"meal_type:{meal_type}"] = 0
+    meal_types = Recipe.objects.values_list("meal_type").annotate(
+        total=Count("id")
+    )
+    for meal_type, total in meal_types.order_by():
+        counts[f"meal_type:{meal_type}"] = total
+
+    tag_totals = Recipe.objects.order_by().aggregate(
+        **{
+            tag: Count("id", filter=Exact(F("tag_bits").bitand(bit), bit))
+            for tag, bit in TAG_BITS.items()
+        }
+    )
+    for tag, total in tag_totals.items():
+        counts[f"tag:{tag}"] = total
+
+    comments = (
+        Comment.objects.filter(approved=True)
+        .values_list("recipe_id")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    for recipe_id, total in comments.iterator(chunk_size=2000):
+        counts[f"recipe:{recipe_id}:comments"] = total
+
+    SiteCounter.objects.all().delete()
+    SiteCounter.objects.bulk_create(
+        [
+            SiteCounter(name=name, value=value)
+            for name, value in counts.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0008_recipe_tag_bits"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SiteCounter",
+            fields=[
+                (
+                    "name",
+                    models.CharField(
+                        max_length=100, primary_key=True, serialize=False
+                    ),
+                ),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
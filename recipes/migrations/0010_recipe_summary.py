@@ -0,0 +1,40 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:24
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+# Recipe.SUMMARY_WORDS when this migration was written
+SUMMARY_WORDS = 12
+
+
+def make_summary(description):
+    summary = Truncator(description or "").words(SUMMARY_WORDS)
+    return Truncator(summary).chars(300)
+
+
+def populate_summary(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    recipes = Recipe.objects.exclude(description="")
+    for recipe in recipes.only("id", "description").iterator():
+        Recipe.objects.filter(pk=recipe.pk).update(
+            summary=make_summary(recipe.description)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0009_sitecounter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="summary",
+            field=models.CharField(
+                blank=True, editable=False, max_length=300
+            ),
+        ),
+        migrations.RunPython(populate_summary, migrations.RunPython.noop),
+    ]
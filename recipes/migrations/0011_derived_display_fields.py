@@ -0,0 +1,134 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:32
+
+import re
+
+from django.db import migrations, models
+from django.utils.html import linebreaks
+
+
+# Step numbering typed by authors ("1. ", "10. ")
+STEP_NUMBER = re.compile(r"^\s*\d+\.\s*")
+
+# Recipe.RECIPE_TAG_CHOICES when this migration was written
+TAG_LABELS = {
+    "italian": "Italian",
+    "mexican": "Mexican",
+    "asian": "Asian",
+    "chinese": "Chinese",
+    "indian": "Indian",
+    "american": "American",
+    "mediterranean": "Mediterranean",
+    "french": "French",
+    "thai": "Thai",
+    "japanese": "Japanese",
+    "vegetarian": "Vegetarian",
+    "vegan": "Vegan",
+    "gluten_free": "Gluten-Free",
+    "dairy_free": "Dairy-Free",
+    "keto": "Keto/Low-Carb",
+    "paleo": "Paleo",
+    "healthy": "Healthy & Light",
+    "low_sodium": "Low Sodium",
+    "grilled": "Grilled",
+    "baked": "Baked",
+    "fried": "Fried",
+    "steamed": "Steamed",
+    "slow_cooked": "Slow Cooked",
+    "no_cook": "No Cooking Required",
+    "soup": "Soup",
+    "salad": "Salad",
+    "pasta": "Pasta",
+    "pizza": "Pizza",
+    "burger": "Burger",
+    "sandwich": "Sandwich",
+    "casserole": "Casserole",
+    "stir_fry": "Stir Fry",
+    "chicken": "Chicken",
+    "beef": "Beef",
+    "pork": "Pork",
+    "seafood": "Seafood",
+    "fish": "Fish",
+    "lamb": "Lamb",
+    "turkey": "Turkey",
+    "quick": "Quick (Under 30 min)",
+    "easy": "Easy to Make",
+    "budget_friendly": "Budget-Friendly",
+    "one_pot": "One Pot/Pan",
+    "meal_prep": "Meal Prep Friendly",
+    "comfort_food": "Comfort Food",
+    "spicy": "Spicy",
+    "kid_friendly": "Kid-Friendly",
+}
+
+
+def make_ingredients_list(ingredients):
+    lines = (ingredients or "").split("\n")
+    return [line.strip() for line in lines if line.strip()]
+
+
+def make_instruction_steps(instructions):
+    steps = []
+    for line in (instructions or "").split("\n"):
+        step = STEP_NUMBER.sub("", line.strip())
+        if step:
+            steps.append(step)
+    return steps
+
+
+def make_tag_labels(tag_list):
+    return [
+        [tag, TAG_LABELS.get(tag, tag.replace("_", " ").title())]
+        for tag in tag_list
+        if tag
+    ]
+
+
+def populate_display_fields(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    fields = ["ingredients", "instructions", "recipe_tags"]
+    for recipe in Recipe.objects.only("id", *fields).iterator():
+        tags = [t.strip() for t in recipe.recipe_tags.split(",") if t.strip()]
+        Recipe.objects.filter(pk=recipe.pk).update(
+            ingredients_list=make_ingredients_list(recipe.ingredients),
+            instruction_steps=make_instruction_steps(recipe.instructions),
+            tag_labels=make_tag_labels(tags),
+        )
+
+    Comment = apps.get_model("recipes", "Comment")
+    for comment in Comment.objects.only("id", "body").iterator():
+        Comment.objects.filter(pk=comment.pk).update(
+            body_html=linebreaks(comment.body or "", autoescape=True)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0010_recipe_summary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="body_html",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="ingredients_list",
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="instruction_steps",
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="tag_labels",
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.RunPython(
+            populate_display_fields, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,311 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:34
+
+import re
+from collections import namedtuple
+from fractions import Fraction
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# recipes.ingredients as it was when this migration was written, so later
+# parser changes don't alter this backfill
+ParsedIngredient = namedtuple(
+    "ParsedIngredient", ["text", "quantity", "unit", "name", "keyword"]
+)
+
+UNICODE_FRACTIONS = {
+    "½": "1/2",
+    "⅓": "1/3",
+    "⅔": "2/3",
+    "¼": "1/4",
+    "¾": "3/4",
+    "⅛": "1/8",
+}
+
+# Canonical unit for each spelling
+UNITS = {
+    "g": "g",
+    "gram": "g",
+    "grams": "g",
+    "kg": "kg",
+    "kilogram": "kg",
+    "kilograms": "kg",
+    "mg": "mg",
+    "ml": "ml",
+    "millilitre": "ml",
+    "milliliter": "ml",
+    "millilitres": "ml",
+    "milliliters": "ml",
+    "l": "l",
+    "litre": "l",
+    "liter": "l",
+    "litres": "l",
+    "liters": "l",
+    "tsp": "tsp",
+    "teaspoon": "tsp",
+    "teaspoons": "tsp",
+    "tbsp": "tbsp",
+    "tablespoon": "tbsp",
+    "tablespoons": "tbsp",
+    "cup": "cup",
+    "cups": "cup",
+    "oz": "oz",
+    "ounce": "oz",
+    "ounces": "oz",
+    "lb": "lb",
+    "lbs": "lb",
+    "pound": "lb",
+    "pounds": "lb",
+    "pinch": "pinch",
+    "pinches": "pinch",
+    "dash": "dash",
+    "clove": "clove",
+    "cloves": "clove",
+    "can": "can",
+    "cans": "can",
+    "tin": "can",
+    "tins": "can",
+    "slice": "slice",
+    "slices": "slice",
+    "bunch": "bunch",
+    "handful": "handful",
+    "sprig": "sprig",
+    "sprigs": "sprig",
+    "stick": "stick",
+    "sticks": "stick",
+    "piece": "piece",
+    "pieces": "piece",
+    "packet": "packet",
+    "pack": "packet",
+}
+
+# Words describing preparation or size rather than the ingredient itself
+DESCRIPTORS = {
+    "fresh",
+    "freshly",
+    "frozen",
+    "dried",
+    "canned",
+    "large",
+    "medium",
+    "small",
+    "chopped",
+    "finely",
+    "roughly",
+    "diced",
+    "minced",
+    "sliced",
+    "grated",
+    "crushed",
+    "ground",
+    "peeled",
+    "softened",
+    "melted",
+    "beaten",
+    "whole",
+    "boneless",
+    "skinless",
+    "ripe",
+    "cooked",
+    "uncooked",
+    "raw",
+    "thawed",
+    "drained",
+    "optional",
+    "to",
+    "taste",
+    "about",
+    "of",
+    "a",
+    "an",
+}
+
+# Parts of an ingredient: "chicken breast" is found under "chicken"
+PART_WORDS = {
+    "breast",
+    "thigh",
+    "drumstick",
+    "fillet",
+    "leaf",
+    "heart",
+    "juice",
+    "zest",
+    "stock",
+    "powder",
+    "flake",
+    "seed",
+    "sprig",
+    "clove",
+    "floret",
+    "wedge",
+}
+
+# Plurals that the suffix rules below would get wrong
+IRREGULAR_PLURALS = {
+    "leaves": "leaf",
+    "loaves": "loaf",
+    "halves": "half",
+    "knives": "knife",
+}
+INVARIANT_WORDS = {"asparagus", "couscous", "hummus", "molasses", "swiss"}
+
+NUMBER = r"\d+\s+\d+/\d+|\d+/\d+|\d+(?:[.,]\d+)?"
+QUANTITY = re.compile(
+    rf"^\s*(?P<qty>{NUMBER})(?:\s*(?:-|–|to)\s*(?:{NUMBER}))?\s*"
+)
+UNIT_WORD = re.compile(r"^(?P<unit>[a-z]+)\.?(?:\s+|$)")
+PARENTHESES = re.compile(r"\([^)]*\)")
+WORD = re.compile(r"[a-z]+(?:-[a-z]+)*")
+
+MAX_NAME_LENGTH = 100
+MAX_KEYWORD_LENGTH = 50
+
+
+def parse_quantity(text):
+    """Return a numeric quantity for "2", "1.5", "1/2" or "1 1/2"""
+    total = Fraction(0)
+    for part in text.replace(",", ".").split():
+        total += Fraction(part)
+    return float(total)
+
+
+def singularize(word):
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if word in INVARIANT_WORDS or len(word) <= 3 or word.endswith("ss"):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize_name(text):
+    """
+    Canonical ingredient name: lower case, no notes in parentheses or after
+    a comma, no descriptors, singular words
+    """
+    text = PARENTHESES.sub(" ", text.lower()).split(",")[0]
+    words = [
+        singularize(word)
+        for word in WORD.findall(text)
+        if word not in DESCRIPTORS
+    ]
+    return " ".join(words)[:MAX_NAME_LENGTH]
+
+
+def name_keyword(name):
+    """The word of a name that pantry items are most likely to use"""
+    words = name.split()
+    if len(words) > 1 and words[-1] in PART_WORDS:
+        return words[-2][:MAX_KEYWORD_LENGTH]
+    return words[-1][:MAX_KEYWORD_LENGTH]
+
+
+def parse_ingredient(line):
+    """Parse one ingredient line, or return None for blanks and headings"""
+    text = line.strip()
+    if not text or text.endswith(":"):
+        return None
+
+    for char, fraction in UNICODE_FRACTIONS.items():
+        text = text.replace(char, f" {fraction}")
+    rest = PARENTHESES.sub(" ", text.lower())
+
+    quantity = None
+    match = QUANTITY.match(rest)
+    if match:
+        quantity = parse_quantity(match.group("qty"))
+        rest = rest[match.end():]
+
+    unit = ""
+    match = UNIT_WORD.match(rest)
+    if match and match.group("unit") in UNITS:
+        unit = UNITS[match.group("unit")]
+        rest = rest[match.end():]
+
+    name = normalize_name(rest)
+    if not name:
+        return None
+    return ParsedIngredient(
+        text=line.strip()[:300],
+        quantity=quantity,
+        unit=unit,
+        name=name,
+        keyword=name_keyword(name),
+    )
+
+
+def parse_ingredients(text):
+    """Parse a recipe's ingredients text, one ingredient per line"""
+    parsed = (parse_ingredient(line) for line in (text or "").split("\n"))
+    return [ingredient for ingredient in parsed if ingredient]
+
+
+def populate_ingredients(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    RecipeIngredient = apps.get_model("recipes", "RecipeIngredient")
+    for recipe in Recipe.objects.only("id", "ingredients").iterator():
+        parsed = parse_ingredients(recipe.ingredients)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe_id=recipe.pk, position=position, **row._asdict()
+            )
+            for position, row in enumerate(parsed)
+        )
+        Recipe.objects.filter(pk=recipe.pk).update(
+            ingredient_count=len(parsed)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0011_derived_display_fields"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="ingredient_count",
+            field=models.PositiveSmallIntegerField(
+                default=0, editable=False
+            ),
+        ),
+        migrations.CreateModel(
+            name="RecipeIngredient",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("position", models.PositiveSmallIntegerField()),
+                ("text", models.CharField(max_length=300)),
+                ("quantity", models.FloatField(blank=True, null=True)),
+                ("unit", models.CharField(blank=True, max_length=20)),
+                ("name", models.CharField(db_index=True, max_length=100)),
+                ("keyword", models.CharField(db_index=True, max_length=50)),
+                (
+                    "recipe",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="parsed_ingredients",
+                        to="recipes.recipe",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["recipe", "position"],
+            },
+        ),
+        migrations.RunPython(populate_ingredients, migrations.RunPython.noop),
+    ]
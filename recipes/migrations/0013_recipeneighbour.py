@@ -0,0 +1,76 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0012_recipeingredient"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeNeighbour",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("content", "Similar title, tags and ingredients")
+                        ],
+                        default="content",
+                        max_length=20,
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField()),
+                ("score", models.FloatField()),
+                (
+                    "computed_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "neighbour",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="neighbour_of",
+                        to="recipes.recipe",
+                    ),
+                ),
+                (
+                    "recipe",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="neighbours",
+                        to="recipes.recipe",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["recipe", "kind", "rank"],
+                "indexes": [
+                    models.Index(
+                        fields=["recipe", "kind", "rank"],
+                        name="recipes_rec_recipe__5e1cc4_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("recipe", "kind", "neighbour"),
+                        name="unique_recipe_neighbour",
+                    )
+                ],
+            },
+        ),
+    ]
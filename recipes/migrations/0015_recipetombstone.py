@@ -0,0 +1,52 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:51
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0014_userrecommendation"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeTombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("recipe_id", models.BigIntegerField()),
+                (
+                    "deleted_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+            options={
+                "ordering": ["deleted_at", "id"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["updated_at", "id"],
+                name="recipes_rec_updated_dbd0bb_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipetombstone",
+            index=models.Index(
+                fields=["deleted_at", "id"],
+                name="recipes_rec_deleted_f6bf2e_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.1.2 on 2026-10-18 17:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0016_notification"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["recipe", "approved", "created_on"],
+                name="recipes_com_recipe__9a5e30_idx",
+            ),
+        ),
+    ]
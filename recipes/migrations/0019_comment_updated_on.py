@@ -0,0 +1,28 @@
+# Generated by Django 6.1.2 on 2026-10-18 17:37
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def populate_updated_on(apps, schema_editor):
+    """Existing comments were last changed, as far as we know, on creation"""
+    Comment = apps.get_model("recipes", "Comment")
+    Comment.objects.update(updated_on=F("created_on"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0018_comment_threads"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="updated_on",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(
+            populate_updated_on, migrations.RunPython.noop
+        ),
+    ]
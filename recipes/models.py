@@ -1,7 +1,87 @@
+import re
+
 from django.db import models
+from django.db.models import Count, F, FloatField, OuterRef, Q, Subquery
+from django.db.models.functions import Cast, NullIf
+from django.db.models.lookups import Exact, GreaterThan
 from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
 from cloudinary.models import CloudinaryField
 
+from .ingredients import normalize_pantry, parse_ingredients
+
+# Step numbering typed by authors ("1. ", "10. "), shown as an <ol> instead
+STEP_NUMBER = re.compile(r"^\s*\d+\.\s*")
+
+
+class RecipeQuerySet(models.QuerySet):
+    """Tag filters on Recipe.tag_bits and pantry matching on ingredients"""
+
+    def with_all_tags(self, tags):
+        """
+        Recipes carrying every one of the given tags; none if one of them
+        is not a known tag
+        """
+        tags = [tag.strip() for tag in tags or [] if tag.strip()]
+        if not tags:
+            return self
+        if any(tag not in Recipe.TAG_BITS for tag in tags):
+            return self.none()
+        mask = Recipe.tags_to_bits(tags)
+        return self.filter(Exact(F("tag_bits").bitand(mask), mask))
+
+    def with_any_tags(self, tags):
+        """
+        Recipes carrying at least one of the given tags; none if none of
+        them is a known tag
+        """
+        tags = [tag.strip() for tag in tags or [] if tag.strip()]
+        if not tags:
+            return self
+        mask = Recipe.tags_to_bits(tags)
+        if not mask:
+            return self.none()
+        return self.filter(GreaterThan(F("tag_bits").bitand(mask), 0))
+
+    def without_tags(self, tags):
+        """Recipes carrying none of the given tags (unknown ones ignored)"""
+        mask = Recipe.tags_to_bits(tags)
+        if not mask:
+            return self
+        return self.filter(Exact(F("tag_bits").bitand(mask), 0))
+
+    def with_pantry_coverage(self, items):
+        """
+        Recipes using at least one of the pantry items, annotated with
+        pantry_matches (ingredients covered) and pantry_coverage (share of
+        the recipe's ingredients covered, 0 to 1)
+        """
+        names = normalize_pantry(items)
+        if not names:
+            return self
+        matching = RecipeIngredient.objects.filter(
+            Q(name__in=names) | Q(keyword__in=names)
+        )
+        matches = (
+            matching.filter(recipe=OuterRef("pk"))
+            .order_by()
+            .values("recipe")
+            .annotate(total=Count("id"))
+            .values("total")
+        )
+        return self.filter(
+            # Candidates come from the name/keyword indexes, not a scan
+            id__in=matching.values("recipe_id")
+        ).annotate(
+            pantry_matches=Subquery(matches),
+            pantry_coverage=(
+                Cast("pantry_matches", FloatField())
+                / NullIf("ingredient_count", 0)
+            ),
+        )
+
 
 class Recipe(models.Model):
     # Primary meal type choices
@@ -71,8 +151,30 @@ class Recipe(models.Model):
         ("kid_friendly", "Kid-Friendly"),
     ]
 
+    # Bit assigned to each tag in tag_bits. New tags must only ever be
+    # appended to RECIPE_TAG_CHOICES so stored bitsets keep their meaning.
+    TAG_BITS = {
+        tag_key: 1 << position
+        for position, (tag_key, tag_name) in enumerate(RECIPE_TAG_CHOICES)
+    }
+
+    # Words of the description kept in the precomputed card summary
+    SUMMARY_WORDS = 12
+
+    # Fields computed from other fields by refresh_derived_fields()
+    DERIVED_FIELDS = [
+        "summary",
+        "tag_bits",
+        "ingredients_list",
+        "instruction_steps",
+        "tag_labels",
+        "ingredient_count",
+    ]
+
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
+    # Short description for recipe cards, derived on save
+    summary = models.CharField(max_length=300, blank=True, editable=False)
     image = CloudinaryField("image", default="placeholder")
     ingredients = models.TextField(help_text="List ingredients, one per line")
     instructions = models.TextField(
@@ -102,6 +204,18 @@ class Recipe(models.Model):
         ),
     )
 
+    # Indexed bitset mirror of recipe_tags used for tag filtering
+    tag_bits = models.BigIntegerField(default=0, db_index=True, editable=False)
+
+    # Display forms of the text fields, derived on save for the detail page
+    ingredients_list = models.JSONField(default=list, editable=False)
+    instruction_steps = models.JSONField(default=list, editable=False)
+    tag_labels = models.JSONField(default=list, editable=False)
+    # Number of parsed RecipeIngredient rows, for pantry coverage
+    ingredient_count = models.PositiveSmallIntegerField(
+        default=0, editable=False
+    )
+
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -110,12 +224,29 @@ class Recipe(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created_at"]
+        # Keyset scans of changed recipes for the sync API
+        indexes = [models.Index(fields=["updated_at", "id"])]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the counted state so counter signals can apply deltas
+        instance._counted_state = instance.get_counted_state()
+        return instance
+
+    def get_counted_state(self):
+        """The fields that site counters are derived from"""
+        if {"meal_type", "tag_bits"} & self.get_deferred_fields():
+            return None
+        return (self.meal_type, self.tag_bits)
+
     def get_total_time(self):
         return self.prep_time + self.cook_time
 
@@ -141,6 +272,77 @@ class Recipe(models.Model):
             self.recipe_tags = ",".join(tag_list)
         else:
             self.recipe_tags = ""
+        self.tag_bits = self.tags_to_bits(tag_list)
+
+    def refresh_derived_fields(self):
+        """Recompute DERIVED_FIELDS from the fields they mirror"""
+        tags = self.get_recipe_tags_list()
+        self.tag_bits = self.tags_to_bits(tags)
+        self.summary = self.make_summary(self.description)
+        self.ingredients_list = self.make_ingredients_list(self.ingredients)
+        self.instruction_steps = self.make_instruction_steps(
+            self.instructions
+        )
+        self.tag_labels = self.make_tag_labels(tags)
+        # Kept for the post_save handler that stores the parsed rows
+        self._parsed_ingredients = parse_ingredients(self.ingredients)
+        self.ingredient_count = len(self._parsed_ingredients)
+
+    def save_parsed_ingredients(self):
+        """Replace the recipe's RecipeIngredient rows with a fresh parse"""
+        parsed = getattr(self, "_parsed_ingredients", None)
+        if parsed is None:
+            parsed = parse_ingredients(self.ingredients)
+        self.parsed_ingredients.all().delete()
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=self, position=position, **row._asdict())
+            for position, row in enumerate(parsed)
+        )
+
+    @classmethod
+    def make_ingredients_list(cls, ingredients):
+        """Non-blank ingredient lines"""
+        lines = (ingredients or "").split("\n")
+        return [line.strip() for line in lines if line.strip()]
+
+    @classmethod
+    def make_instruction_steps(cls, instructions):
+        """Non-blank instruction lines without the authors' numbering"""
+        steps = []
+        for line in (instructions or "").split("\n"):
+            step = STEP_NUMBER.sub("", line.strip())
+            if step:
+                steps.append(step)
+        return steps
+
+    @classmethod
+    def make_tag_labels(cls, tag_list):
+        """(key, label) pairs for a list of tag keys"""
+        labels = dict(cls.RECIPE_TAG_CHOICES)
+        return [
+            [tag, labels.get(tag, tag.replace("_", " ").title())]
+            for tag in tag_list
+            if tag
+        ]
+
+    @classmethod
+    def make_summary(cls, description):
+        """Truncated description shown on recipe cards"""
+        summary = Truncator(description or "").words(cls.SUMMARY_WORDS)
+        return Truncator(summary).chars(300)
+
+    @classmethod
+    def tags_to_bits(cls, tag_list):
+        """Encode a list of tag keys as a bitset, ignoring unknown keys"""
+        bits = 0
+        for tag in tag_list or []:
+            bits |= cls.TAG_BITS.get(tag.strip(), 0)
+        return bits
+
+    @classmethod
+    def bits_to_tags(cls, bits):
+        """Decode a bitset back into its list of tag keys"""
+        return [tag for tag, bit in cls.TAG_BITS.items() if bits & bit]
 
     @classmethod
     def get_tags_by_type(cls):
@@ -208,8 +410,130 @@ class Recipe(models.Model):
         }
 
 
+class RecipeIngredient(models.Model):
+    """One parsed line of a recipe's ingredients, maintained on save"""
+
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name="parsed_ingredients"
+    )
+    position = models.PositiveSmallIntegerField()
+    text = models.CharField(max_length=300)
+    quantity = models.FloatField(null=True, blank=True)
+    unit = models.CharField(max_length=20, blank=True)
+    # Normalized ingredient name ("plain flour") and its key word ("flour")
+    name = models.CharField(max_length=100, db_index=True)
+    keyword = models.CharField(max_length=50, db_index=True)
+
+    class Meta:
+        ordering = ["recipe", "position"]
+
+    def __str__(self):
+        return self.text
+
+
+class RecipeNeighbour(models.Model):
+    """
+    Precomputed similar recipe, rebuilt by ``manage.py build_similarity``
+    (content) and ``manage.py build_recommendations`` (co_commented)
+
+    ``rank`` orders a recipe's neighbours from most to least similar.
+    """
+
+    CONTENT = "content"
+    CO_COMMENTED = "co_commented"
+    KIND_CHOICES = [
+        (CONTENT, "Similar title, tags and ingredients"),
+        (CO_COMMENTED, "Commented on by the same people"),
+    ]
+
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name="neighbours"
+    )
+    neighbour = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name="neighbour_of"
+    )
+    kind = models.CharField(
+        max_length=20, choices=KIND_CHOICES, default=CONTENT
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    # When the data this row was computed from was read
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["recipe", "kind", "rank"]
+        indexes = [models.Index(fields=["recipe", "kind", "rank"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipe", "kind", "neighbour"],
+                name="unique_recipe_neighbour",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.recipe_id} -> {self.neighbour_id} ({self.score:.2f})"
+
+
+class UserRecommendation(models.Model):
+    """
+    Personalized home page recipe, rebuilt by
+    ``manage.py build_recommendations``
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="recommendations"
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name="recommended_to"
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["user", "rank"]
+        indexes = [models.Index(fields=["user", "rank"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"], name="unique_user_recommendation"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.recipe_id} ({self.score:.2f})"
+
+
+class RecipeTombstone(models.Model):
+    """
+    A deleted recipe, kept so sync clients can learn about the deletion
+
+    ``recipe_id`` is a plain integer since the recipe row is gone.
+    """
+
+    recipe_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["deleted_at", "id"]
+        indexes = [models.Index(fields=["deleted_at", "id"])]
+
+    def __str__(self):
+        return f"{self.recipe_id} deleted at {self.deleted_at}"
+
+
 class Comment(models.Model):
-    """Comment model for recipe reviews and feedback"""
+    """
+    Comment model for recipe reviews and feedback
+
+    Replies form threads stored as materialized paths: ``path`` is the
+    zero-padded ids of the comment's ancestors and itself, so sorting a
+    thread's comments by path lists them as a tree, and ``thread`` points
+    at the thread's top-level comment, so a page's replies are one query.
+    """
+
+    # Deepest reply; replies to a comment this deep go next to it instead
+    MAX_DEPTH = 3
+    PATH_DIGITS = 10
 
     recipe = models.ForeignKey(
         Recipe, on_delete=models.CASCADE, related_name="comments"
@@ -218,11 +542,115 @@ class Comment(models.Model):
     body = models.TextField(
         max_length=1000, help_text="Share your thoughts about this recipe"
     )
+    # Rendered body (escaped, with paragraphs), derived on save
+    body_html = models.TextField(blank=True, editable=False)
     created_on = models.DateTimeField(auto_now_add=True)
+    # Moves on edits and approvals, so API validators see them
+    updated_on = models.DateTimeField(auto_now=True)
     approved = models.BooleanField(default=False)
+    parent = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="replies",
+    )
+    # Derived from the parent on creation; thread is None on top-level
+    # comments
+    thread = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="+",
+        editable=False,
+    )
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    path = models.CharField(
+        max_length=(MAX_DEPTH + 1) * (PATH_DIGITS + 1),
+        blank=True,
+        editable=False,
+    )
+    # Approved replies in the thread of a top-level comment, maintained by
+    # the signal handlers (and recount)
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ["-created_on"]
+        indexes = [
+            # A recipe's approved top-level comments, paged by keyset on
+            # created_on
+            models.Index(fields=["recipe", "approved", "depth", "created_on"]),
+            # Threads in tree order
+            models.Index(fields=["thread", "path"]),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author.username} on {self.recipe.title}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the approval state so counter signals can apply deltas
+        if "approved" not in instance.get_deferred_fields():
+            instance._counted_approved = instance.approved
+        return instance
+
+    def refresh_derived_fields(self):
+        self.body_html = self.make_body_html(self.body)
+        if self._state.adding and self.parent_id:
+            self.depth = self.parent.depth + 1
+            self.thread_id = self.parent.thread_id or self.parent_id
+
+    def save_path(self):
+        """Store the materialized path, which needs the comment's id"""
+        parent_path = self.parent.path if self.parent_id else ""
+        self.path = self.make_path(parent_path, self.pk)
+        Comment.objects.filter(pk=self.pk).update(path=self.path)
+
+    @classmethod
+    def make_path(cls, parent_path, pk):
+        return f"{parent_path}{pk:0{cls.PATH_DIGITS}d}/"
+
+    @classmethod
+    def make_body_html(cls, body):
+        return linebreaks(body or "", autoescape=True)
+
+
+class SiteCounter(models.Model):
+    """
+    Materialized count maintained incrementally by recipes.counters
+
+    Rebuild all counters from scratch with ``manage.py recount``.
+    """
+
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class Notification(models.Model):
+    """
+    A message for one user, shown in their inbox
+
+    Created in bulk by recipes.notifications; the navbar's unread count is
+    cached there too.
+    """
+
+    recipient = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="notifications"
+    )
+    message = models.TextField()
+    link = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    read = models.BooleanField(default=False)
+
+    class Meta:
+        # Newest first; the inbox pages by keyset on id
+        ordering = ["-id"]
+        indexes = [models.Index(fields=["recipient", "id"])]
+
+    def __str__(self):
+        return f"To {self.recipient_id}: {self.message}"
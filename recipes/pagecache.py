@@ -0,0 +1,154 @@
+"""
+Whole-page cache for anonymous GET requests.
+
+Keys are built from the path, the canonical query string and a version
+number, so invalidation is a single cache increment: changing any recipe
+bumps the global version (home and list pages), and changing a recipe or
+its comments bumps that recipe's version (its detail page).
+
+Responses are only cached when they are safe to share: anonymous user, no
+pending flash messages, no CSRF token rendered and no cookies set.
+
+The decorator works on sync and async views alike.
+"""
+
+import functools
+import hashlib
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.utils.http import urlencode
+
+GLOBAL_VERSION_KEY = "recipes:pages:version"
+PAGE_CACHE_TIMEOUT = getattr(settings, "PAGE_CACHE_TIMEOUT", 60)
+
+
+def recipe_version_key(recipe_id):
+    return f"recipes:pages:recipe:{recipe_id}:version"
+
+
+def get_version(key):
+    return cache.get_or_set(key, 1, None)
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def invalidate_recipe(recipe_id):
+    """Drop the cached detail page of one recipe"""
+    bump_version(recipe_version_key(recipe_id))
+
+
+def invalidate_all():
+    """Drop every cached page that lists recipes"""
+    bump_version(GLOBAL_VERSION_KEY)
+
+
+def canonical_query(params):
+    """
+    Query string with sorted parameters and empty values dropped, so that
+    equivalent filter form submissions share a cache entry
+    """
+    pairs = [
+        (key, value)
+        for key, values in params.lists()
+        for value in values
+        if value.strip()
+    ]
+    return urlencode(sorted(pairs))
+
+
+def get_cache_key(request, recipe_id=None):
+    if recipe_id is None:
+        version = get_version(GLOBAL_VERSION_KEY)
+    else:
+        version = get_version(recipe_version_key(recipe_id))
+    url = f"{request.path}?{canonical_query(request.GET)}"
+    digest = hashlib.md5(url.encode(), usedforsecurity=False).hexdigest()
+    scope = "all" if recipe_id is None else recipe_id
+    return f"recipes:page:{scope}:{version}:{digest}"
+
+
+def is_cacheable_request(request):
+    return (
+        request.method in ("GET", "HEAD")
+        and not request.user.is_authenticated
+        # Flash messages are rendered into (and consumed by) the page
+        and not len(messages.get_messages(request))
+    )
+
+
+def is_cacheable_response(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        # A rendered CSRF token is specific to this visitor
+        and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+    )
+
+
+def cached_page(request, recipe_kwarg, kwargs):
+    """
+    Cache key and cached response of a request, or (None, None) when the
+    request must not be served from (or stored in) the cache
+    """
+    if not is_cacheable_request(request):
+        return None, None
+    recipe_id = kwargs.get(recipe_kwarg) if recipe_kwarg else None
+    key = get_cache_key(request, recipe_id)
+    return key, cache.get(key)
+
+
+def store_page(request, key, response):
+    if hasattr(response, "render") and not response.is_rendered:
+        response.render()
+    if is_cacheable_response(request, response):
+        cache.set(key, response, PAGE_CACHE_TIMEOUT)
+    return response
+
+
+def cache_anonymous_page(recipe_kwarg=None):
+    """
+    View decorator caching the page for anonymous visitors
+
+    ``recipe_kwarg`` names the URL argument holding the recipe id for
+    detail pages, which are versioned per recipe.
+    """
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+
+            @functools.wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                key, response = await sync_to_async(cached_page)(
+                    request, recipe_kwarg, kwargs
+                )
+                if response is not None:
+                    return response
+                response = await view_func(request, *args, **kwargs)
+                if key is None:
+                    return response
+                return await sync_to_async(store_page)(request, key, response)
+
+            return async_wrapper
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            key, response = cached_page(request, recipe_kwarg, kwargs)
+            if response is not None:
+                return response
+            response = view_func(request, *args, **kwargs)
+            if key is None:
+                return response
+            return store_page(request, key, response)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,168 @@
+"""
+Keyset (cursor) pagination.
+
+Instead of OFFSET, each page is fetched with a WHERE clause that continues
+from the sort key of the last row seen, so deep pages cost the same as the
+first one and no COUNT query is needed. Cursors are opaque url-safe
+strings encoding the boundary row's sort key and the direction.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+AFTER = "a"
+BEFORE = "b"
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder drops microseconds, which would make rows that
+        # share a millisecond compare as equal
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(direction, values):
+    payload = json.dumps([direction, values], cls=CursorEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (direction, values) from a cursor string"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursor(cursor)
+    if direction not in (AFTER, BEFORE) or not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return direction, values
+
+
+class CursorPage:
+    """One page of results with cursors to its neighbours"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class CursorPaginator:
+    """
+    Paginate a queryset by keyset on ``ordering``
+
+    ``ordering`` is a list of field names as passed to order_by() and must
+    end in a unique field (normally "id") so every row has a distinct key.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.per_page = per_page
+        self.fields = [name.lstrip("-") for name in self.ordering]
+        model_fields = queryset.model._meta
+        self.model_fields = [model_fields.get_field(f) for f in self.fields]
+
+    def get_key(self, obj):
+        """Sort key of a row (model instance or values() dict)"""
+        if isinstance(obj, dict):
+            return [obj[field] for field in self.fields]
+        return [getattr(obj, field) for field in self.fields]
+
+    def parse_values(self, values):
+        if len(values) != len(self.fields):
+            raise InvalidCursor(values)
+        try:
+            return [
+                field.to_python(value)
+                for field, value in zip(self.model_fields, values)
+            ]
+        except ValidationError:
+            raise InvalidCursor(values)
+
+    def keyset_filter(self, values, direction):
+        """
+        Q object selecting rows strictly after (or before) ``values``
+
+        For ordering (a, b, c) "after" expands to:
+        a > va OR (a = va AND b > vb) OR (a = va AND b = vb AND c > vc)
+        with > flipped to < for descending fields.
+        """
+        condition = Q()
+        equal = Q()
+        for name, value in zip(self.ordering, values):
+            field = name.lstrip("-")
+            descending = name.startswith("-")
+            if direction == BEFORE:
+                descending = not descending
+            lookup = "lt" if descending else "gt"
+            condition |= equal & Q(**{f"{field}__{lookup}": value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def page(self, cursor=None):
+        """Return the CursorPage for a cursor (None for the first page)"""
+        direction, values = AFTER, None
+        if cursor:
+            direction, raw_values = decode_cursor(cursor)
+            values = self.parse_values(raw_values)
+
+        ordering = self.ordering
+        if direction == BEFORE:
+            # Walk backwards, then restore the natural order
+            ordering = [
+                name[1:] if name.startswith("-") else f"-{name}"
+                for name in ordering
+            ]
+
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.keyset_filter(values, direction))
+
+        # One extra row tells us whether there is another page
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if direction == BEFORE:
+            rows.reverse()
+
+        if not rows:
+            return CursorPage([], None, None)
+
+        first, last = self.get_key(rows[0]), self.get_key(rows[-1])
+        if direction == AFTER:
+            has_next, has_previous = has_more, values is not None
+        else:
+            has_next, has_previous = True, has_more
+
+        return CursorPage(
+            rows,
+            encode_cursor(AFTER, last) if has_next else None,
+            encode_cursor(BEFORE, first) if has_previous else None,
+        )
@@ -0,0 +1,200 @@
+"""
+Collaborative recommendations from comments ("people who commented on this
+also cooked...").
+
+Approved comments form a binary user x recipe matrix X. Item-item scores
+are co-occurrence counts (X.T @ X) normalized to cosine similarity; the
+top N per recipe are stored as co_commented RecipeNeighbour rows. A user's
+feed scores the recipes they have not commented on (or written) by summing
+the item-item scores of the recipes they did comment on (X @ S), and is
+stored in UserRecommendation.
+
+Comments are read with iterator() into compact integer arrays and both
+products are computed with SciPy sparse matrices a block of rows at a
+time, so memory grows with the number of (user, recipe) pairs rather than
+with users x recipes. Run ``manage.py build_recommendations`` periodically.
+"""
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+
+from .models import Comment, Recipe, RecipeNeighbour, UserRecommendation
+
+CHUNK_SIZE = 10000
+BLOCK_SIZE = 1024
+DEFAULT_NEIGHBOURS = 10
+DEFAULT_FEED_SIZE = 8
+
+
+def read_pairs(queryset, chunk_size=CHUNK_SIZE):
+    """Two-column int64 array of a values_list() queryset, read in chunks"""
+    chunks = []
+    buffer = []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        buffer.append(row)
+        if len(buffer) >= chunk_size:
+            chunks.append(np.array(buffer, dtype=np.int64))
+            buffer = []
+    if buffer:
+        chunks.append(np.array(buffer, dtype=np.int64))
+    if not chunks:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.concatenate(chunks)
+
+
+def interaction_matrix(pairs):
+    """
+    Binary CSR matrix of (user id, recipe id) pairs, with the user and
+    recipe ids of its rows and columns
+    """
+    user_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+    recipe_ids, columns = np.unique(pairs[:, 1], return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.float32), (rows, columns)),
+        shape=(len(user_ids), len(recipe_ids)),
+    )
+    # Several comments on one recipe still count as one interaction
+    matrix.data[:] = 1
+    return user_ids, recipe_ids, matrix
+
+
+def top_n(indices, scores, n):
+    """The n highest scores of a sparse row, best first"""
+    if len(scores) > n:
+        keep = np.argpartition(-scores, n - 1)[:n]
+        indices, scores = indices[keep], scores[keep]
+    order = np.argsort(-scores, kind="stable")
+    return indices[order], scores[order]
+
+
+def item_neighbours(matrix, n):
+    """Yield (column, neighbour columns, scores) for every recipe column"""
+    norms = np.sqrt(np.asarray(matrix.sum(axis=0)).ravel())
+    by_recipe = matrix.T.tocsr()
+    for start in range(0, matrix.shape[1], BLOCK_SIZE):
+        block = (by_recipe[start:start + BLOCK_SIZE] @ matrix).tocsr()
+        for i in range(block.shape[0]):
+            column = start + i
+            span = slice(block.indptr[i], block.indptr[i + 1])
+            indices, counts = block.indices[span], block.data[span]
+            other = indices != column
+            indices, counts = indices[other], counts[other]
+            if len(indices):
+                scores = counts / (norms[column] * norms[indices])
+                yield (column, *top_n(indices, scores, n))
+
+
+def user_feeds(matrix, similarity, authored, n):
+    """
+    Yield (row, recipe columns, scores) for every user row, skipping the
+    recipes the user commented on or wrote
+    """
+    for start in range(0, matrix.shape[0], BLOCK_SIZE):
+        seen = matrix[start:start + BLOCK_SIZE]
+        block = (seen @ similarity).tocsr()
+        for i in range(block.shape[0]):
+            row = start + i
+            span = slice(block.indptr[i], block.indptr[i + 1])
+            indices, scores = block.indices[span], block.data[span]
+            exclude = seen.indices[seen.indptr[i]:seen.indptr[i + 1]]
+            keep = ~np.isin(indices, exclude)
+            keep &= ~np.isin(indices, authored.get(row, ()))
+            if keep.any():
+                yield (row, *top_n(indices[keep], scores[keep], n))
+
+
+def bulk_create_batches(model, objects, batch_size=1000):
+    """bulk_create() a generator without holding all its objects at once"""
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+
+
+def build_recommendations(
+    neighbours=DEFAULT_NEIGHBOURS, feed_size=DEFAULT_FEED_SIZE
+):
+    """
+    Rebuild co_commented neighbours and user feeds; return the number of
+    recipes and users that got any
+    """
+    computed_at = timezone.now()
+    pairs = read_pairs(
+        Comment.objects.filter(approved=True)
+        .order_by()
+        .values_list("author_id", "recipe_id")
+        .distinct()
+    )
+    user_ids, recipe_ids, matrix = interaction_matrix(pairs)
+
+    # Columns of the recipes each user row wrote
+    user_rows = {int(pk): row for row, pk in enumerate(user_ids)}
+    recipe_columns = {int(pk): column for column, pk in enumerate(recipe_ids)}
+    authored = {}
+    written = Recipe.objects.order_by().values_list("author_id", "id")
+    for author_id, recipe_id in written.iterator(chunk_size=CHUNK_SIZE):
+        if author_id in user_rows and recipe_id in recipe_columns:
+            authored.setdefault(user_rows[author_id], []).append(
+                recipe_columns[recipe_id]
+            )
+
+    rows, columns, values = [], [], []
+    users_with_feeds = 0
+
+    def neighbour_rows():
+        for column, indices, scores in item_neighbours(matrix, neighbours):
+            rows.append(np.full(len(indices), column))
+            columns.append(indices)
+            values.append(scores)
+            for rank, (index, score) in enumerate(zip(indices, scores)):
+                yield RecipeNeighbour(
+                    recipe_id=int(recipe_ids[column]),
+                    neighbour_id=int(recipe_ids[index]),
+                    kind=RecipeNeighbour.CO_COMMENTED,
+                    rank=rank,
+                    score=float(score),
+                    computed_at=computed_at,
+                )
+
+    def feed_rows(similarity):
+        nonlocal users_with_feeds
+        feeds = user_feeds(matrix, similarity, authored, feed_size)
+        for row, indices, scores in feeds:
+            users_with_feeds += 1
+            for rank, (index, score) in enumerate(zip(indices, scores)):
+                yield UserRecommendation(
+                    user_id=int(user_ids[row]),
+                    recipe_id=int(recipe_ids[index]),
+                    rank=rank,
+                    score=float(score),
+                    computed_at=computed_at,
+                )
+
+    with transaction.atomic():
+        RecipeNeighbour.objects.filter(
+            kind=RecipeNeighbour.CO_COMMENTED
+        ).delete()
+        bulk_create_batches(RecipeNeighbour, neighbour_rows())
+
+        # The stored top-N lists, as a sparse recipe x recipe matrix
+        size = len(recipe_ids)
+        similarity = sparse.csr_matrix((size, size), dtype=np.float32)
+        if values:
+            similarity = sparse.csr_matrix(
+                (
+                    np.concatenate(values),
+                    (np.concatenate(rows), np.concatenate(columns)),
+                ),
+                shape=(size, size),
+            )
+
+        UserRecommendation.objects.all().delete()
+        bulk_create_batches(UserRecommendation, feed_rows(similarity))
+
+    return len(rows), users_with_feeds
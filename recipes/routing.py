@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import consumers
+
+websocket_urlpatterns = [
+    path(
+        "ws/recipes/<int:recipe_id>/comments/",
+        consumers.CommentConsumer.as_asgi(),
+    ),
+]
@@ -0,0 +1,265 @@
+"""
+Full-text search for recipes.
+
+Every recipe has a search document stored in a side table that is kept in
+sync by the signal handlers in ``recipes.signals``. The table layout depends
+on the database:
+
+* PostgreSQL: a ``tsvector`` column with a GIN index, weighted
+  title (A) > tags (B) > description/ingredients (C) > instructions (D)
+* SQLite: an FTS5 virtual table ranked with per-column ``bm25`` weights
+
+Any other database falls back to the old ``icontains`` scan.
+"""
+
+import re
+
+from django.db import connection as default_connection
+from django.db.models import Q, Value, FloatField
+
+SEARCH_TABLE = "recipes_recipe_search"
+RECIPE_TABLE = "recipes_recipe"
+
+# Only plain word characters ever reach the MATCH / tsquery expression
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_QUERY_TERMS = 10
+
+
+def tokenize_query(query):
+    """Split a user supplied query into safe lowercase search terms"""
+    return TOKEN_RE.findall((query or "").lower())[:MAX_QUERY_TERMS]
+
+
+def build_document(recipe):
+    """Return the weighted text fields that make up a recipe's document"""
+    from .models import Recipe
+
+    tag_labels = dict(Recipe.RECIPE_TAG_CHOICES)
+    tags = [
+        tag.strip() for tag in (recipe.recipe_tags or "").split(",")
+        if tag.strip()
+    ]
+    # Index both the key ("gluten_free") and the label ("Gluten-Free")
+    tag_text = " ".join(
+        f"{tag.replace('_', ' ')} {tag_labels.get(tag, '')}" for tag in tags
+    )
+    return {
+        "title": recipe.title or "",
+        "tags": tag_text,
+        "description": recipe.description or "",
+        "ingredients": recipe.ingredients or "",
+        "instructions": recipe.instructions or "",
+    }
+
+
+class SearchBackend:
+    """Base class for the full-text search backends"""
+
+    def create_schema(self, cursor):
+        pass
+
+    def drop_schema(self, cursor):
+        pass
+
+    def index(self, cursor, recipe):
+        pass
+
+    def remove(self, cursor, recipe_id):
+        pass
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def no_match(self, queryset):
+        """Queryset for a query with no searchable terms"""
+        return queryset.none().annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 virtual table keyed on the recipe id (rowid)"""
+
+    # bm25 weights in column order
+    WEIGHTS = "10.0, 5.0, 2.0, 2.0, 1.0"
+
+    def create_schema(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "title, tags, description, ingredients, instructions, "
+            "tokenize='porter unicode61')"
+        )
+
+    def drop_schema(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+    def index(self, cursor, recipe):
+        document = build_document(recipe)
+        self.remove(cursor, recipe.pk)
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, tags, description, "
+            "ingredients, instructions) VALUES (%s, %s, %s, %s, %s, %s)",
+            [
+                recipe.pk,
+                document["title"],
+                document["tags"],
+                document["description"],
+                document["ingredients"],
+                document["instructions"],
+            ],
+        )
+
+    def remove(self, cursor, recipe_id):
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [recipe_id]
+        )
+
+    def search(self, queryset, query):
+        terms = tokenize_query(query)
+        if not terms:
+            return self.no_match(queryset)
+        # Prefix match every term so results update as the user types
+        expression = " ".join(f'"{term}"*' for term in terms)
+        return queryset.extra(
+            select={"search_rank": f"-bm25({SEARCH_TABLE}, {self.WEIGHTS})"},
+            tables=[SEARCH_TABLE],
+            where=[
+                f"{SEARCH_TABLE}.rowid = {RECIPE_TABLE}.id",
+                f"{SEARCH_TABLE} MATCH %s",
+            ],
+            params=[expression],
+        )
+
+
+class PostgresSearchBackend(SearchBackend):
+    """tsvector side table with a GIN index"""
+
+    CONFIG = "english"
+
+    def create_schema(self, cursor):
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+            "recipe_id bigint PRIMARY KEY "
+            f"REFERENCES {RECIPE_TABLE} (id) ON DELETE CASCADE "
+            "DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_gin "
+            f"ON {SEARCH_TABLE} USING gin (document)"
+        )
+
+    def drop_schema(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+    def index(self, cursor, recipe):
+        document = build_document(recipe)
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (recipe_id, document) VALUES (%s, "
+            "setweight(to_tsvector(%s, %s), 'A') || "
+            "setweight(to_tsvector(%s, %s), 'B') || "
+            "setweight(to_tsvector(%s, %s), 'C') || "
+            "setweight(to_tsvector(%s, %s), 'D')) "
+            "ON CONFLICT (recipe_id) DO UPDATE SET document = "
+            "EXCLUDED.document",
+            [
+                recipe.pk,
+                self.CONFIG,
+                document["title"],
+                self.CONFIG,
+                document["tags"],
+                self.CONFIG,
+                f"{document['description']} {document['ingredients']}",
+                self.CONFIG,
+                document["instructions"],
+            ],
+        )
+
+    def remove(self, cursor, recipe_id):
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE recipe_id = %s", [recipe_id]
+        )
+
+    def search(self, queryset, query):
+        terms = tokenize_query(query)
+        if not terms:
+            return self.no_match(queryset)
+        expression = " & ".join(f"{term}:*" for term in terms)
+        tsquery = f"to_tsquery('{self.CONFIG}', %s)"
+        return queryset.extra(
+            select={
+                "search_rank": f"ts_rank({SEARCH_TABLE}.document, {tsquery})"
+            },
+            select_params=[expression],
+            tables=[SEARCH_TABLE],
+            where=[
+                f"{SEARCH_TABLE}.recipe_id = {RECIPE_TABLE}.id",
+                f"{SEARCH_TABLE}.document @@ {tsquery}",
+            ],
+            params=[expression],
+        )
+
+
+class FallbackSearchBackend(SearchBackend):
+    """Unindexed icontains scan for databases without a search backend"""
+
+    def search(self, queryset, query):
+        query = (query or "").strip()
+        if not query:
+            return self.no_match(queryset)
+        return queryset.filter(
+            Q(title__icontains=query)
+            | Q(description__icontains=query)
+            | Q(ingredients__icontains=query)
+            | Q(instructions__icontains=query)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+BACKENDS = {
+    "sqlite": SQLiteSearchBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+def get_search_backend(connection=None):
+    """Return the search backend for the given (or default) connection"""
+    connection = connection or default_connection
+    return BACKENDS.get(connection.vendor, FallbackSearchBackend)()
+
+
+def index_recipe(recipe):
+    """Create or refresh the search document for a recipe"""
+    with default_connection.cursor() as cursor:
+        get_search_backend().index(cursor, recipe)
+
+
+def remove_recipe(recipe_id):
+    """Drop the search document for a deleted recipe"""
+    with default_connection.cursor() as cursor:
+        get_search_backend().remove(cursor, recipe_id)
+
+
+def search_recipes(queryset, query):
+    """
+    Restrict a Recipe queryset to the matches for ``query``.
+
+    Matching rows are annotated with ``search_rank`` (higher is better).
+    """
+    return get_search_backend().search(queryset, query)
+
+
+def index_recipes(recipes, connection=None):
+    """Index an iterable of recipes on one cursor, returning the count"""
+    connection = connection or default_connection
+    backend = get_search_backend(connection)
+    count = 0
+    with connection.cursor() as cursor:
+        for recipe in recipes:
+            backend.index(cursor, recipe)
+            count += 1
+    return count
+
+
+def rebuild_index(recipes, connection=None):
+    """Index every recipe in ``recipes``, returning the number indexed"""
+    return index_recipes(recipes.iterator(chunk_size=500), connection)
@@ -0,0 +1,219 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.signals import (
+    pre_save,
+    post_save,
+    pre_delete,
+    post_delete,
+)
+from django.dispatch import receiver
+
+from .models import Recipe, RecipeTombstone, Comment
+from . import counters, live, notifications, pagecache, search
+from .facets import invalidate_facets
+
+
+@receiver(pre_save, sender=Recipe)
+def update_derived_fields(sender, instance, **kwargs):
+    """Keep derived fields in sync however the recipe was changed"""
+    instance.refresh_derived_fields()
+
+
+@receiver(post_save, sender=Recipe)
+def update_parsed_ingredients(sender, instance, **kwargs):
+    """Keep the RecipeIngredient rows in sync with the ingredients text"""
+    instance.save_parsed_ingredients()
+
+
+@receiver(pre_save, sender=Comment)
+def update_comment_derived_fields(sender, instance, **kwargs):
+    """Body HTML and, for new replies, their thread and depth"""
+    instance.refresh_derived_fields()
+
+
+@receiver(post_save, sender=Comment)
+def save_comment_path(sender, instance, created, **kwargs):
+    """
+    Materialized path of a new comment
+
+    Connected before the other Comment post_save receivers, since the live
+    updates render the comment with its path.
+    """
+    if created:
+        instance.save_path()
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_document(sender, instance, **kwargs):
+    """Keep the full-text search document in sync with the recipe"""
+    search.index_recipe(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_search_document(sender, instance, **kwargs):
+    """Remove the search document of a deleted recipe"""
+    search.remove_recipe(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def record_deletion(sender, instance, **kwargs):
+    """Leave a tombstone for the sync API"""
+    RecipeTombstone.objects.create(recipe_id=instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def invalidate_facet_cache(sender, **kwargs):
+    """Cached facet counts are stale once any recipe changes"""
+    invalidate_facets()
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def invalidate_recipe_pages(sender, instance, **kwargs):
+    """Recipe changes show on its detail page and on every listing"""
+    pagecache.invalidate_recipe(instance.pk)
+    pagecache.invalidate_all()
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    """Comments only show on their recipe's detail page"""
+    pagecache.invalidate_recipe(instance.recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+def count_saved_recipe(sender, instance, created, **kwargs):
+    """Adjust recipe, meal type and tag counters"""
+    new_state = instance.get_counted_state()
+    if created:
+        old_state = None
+    elif hasattr(instance, "_counted_state"):
+        old_state = instance._counted_state
+    else:
+        # Unknown previous state (e.g. loaddata): leave it to recount
+        return
+    counters.increment(counters.recipe_delta(old_state, new_state))
+    instance._counted_state = new_state
+
+
+@receiver(pre_delete, sender=Recipe)
+def load_counted_recipe_state(sender, instance, **kwargs):
+    """Read the counted fields of a deferred recipe while its row exists"""
+    if getattr(instance, "_counted_state", None) is None:
+        instance.refresh_from_db(fields=["meal_type", "tag_bits"])
+        instance._counted_state = instance.get_counted_state()
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_recipe(sender, instance, **kwargs):
+    state = instance._counted_state
+    counters.increment(counters.recipe_delta(state, None))
+    counters.delete_counters(counters.comments_counter(instance.pk))
+
+
+@receiver(post_save, sender=Comment)
+def notify_recipe_author(sender, instance, created, **kwargs):
+    """
+    Tell the recipe's author about a newly approved comment
+
+    Connected before count_saved_comment, which moves _counted_approved on.
+    """
+    was_approved = getattr(instance, "_counted_approved", False)
+    if not created and not hasattr(instance, "_counted_approved"):
+        return
+    if instance.approved and not was_approved:
+        notifications.notify_approved_comments(
+            Comment.objects.filter(pk=instance.pk).values(
+                *notifications.COMMENT_FIELDS
+            )
+        )
+
+
+@receiver(post_save, sender=Comment)
+def push_saved_comment(sender, instance, created, **kwargs):
+    """
+    Push approved (and edited) comments to open detail pages, and drop
+    unapproved ones from them
+
+    Connected before count_saved_comment, which moves _counted_approved on.
+    """
+    if instance.approved:
+        live.push_comments([instance.pk])
+    elif getattr(instance, "_counted_approved", False):
+        live.push_comments([], removed=[(instance.recipe_id, instance.pk)])
+
+
+@receiver(post_save, sender=Comment)
+def count_thread_reply(sender, instance, created, **kwargs):
+    """
+    Adjust the reply count of the reply's thread
+
+    Connected before count_saved_comment, which moves _counted_approved on.
+    """
+    if not instance.thread_id:
+        return
+    was_approved = getattr(instance, "_counted_approved", False)
+    if not created and not hasattr(instance, "_counted_approved"):
+        return
+    if instance.approved != was_approved:
+        Comment.objects.filter(pk=instance.thread_id).update(
+            reply_count=F("reply_count") + (1 if instance.approved else -1)
+        )
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    """Adjust the approved comment counter of the comment's recipe"""
+    was_approved = getattr(instance, "_counted_approved", False)
+    if not created and not hasattr(instance, "_counted_approved"):
+        return
+    if instance.approved != was_approved:
+        counters.increment(
+            {
+                counters.comments_counter(instance.recipe_id): (
+                    1 if instance.approved else -1
+                )
+            }
+        )
+    instance._counted_approved = instance.approved
+
+
+@receiver(post_delete, sender=Comment)
+def push_deleted_comment(sender, instance, **kwargs):
+    if instance.approved:
+        live.push_comments([], removed=[(instance.recipe_id, instance.pk)])
+
+
+@receiver(pre_delete, sender=Comment)
+def load_counted_comment_state(sender, instance, **kwargs):
+    """
+    Read the fields the post_delete receivers need of a deferred comment
+    while its row exists
+    """
+    deferred = instance.get_deferred_fields()
+    missing = {"approved", "recipe_id", "thread_id"} & deferred
+    if missing:
+        instance.refresh_from_db(fields=sorted(missing))
+    if not hasattr(instance, "_counted_approved"):
+        instance._counted_approved = instance.approved
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    if instance._counted_approved:
+        counters.increment({counters.comments_counter(instance.recipe_id): -1})
+        if instance.thread_id:
+            # A no-op when the whole thread is being deleted
+            Comment.objects.filter(pk=instance.thread_id).update(
+                reply_count=F("reply_count") - 1
+            )
+
+
+@receiver(post_save, sender=User)
+def count_saved_user(sender, instance, created, **kwargs):
+    if created:
+        counters.increment({counters.TOTAL_USERS: 1})
+
+
+@receiver(post_delete, sender=User)
+def count_deleted_user(sender, instance, **kwargs):
+    counters.increment({counters.TOTAL_USERS: -1})
@@ -0,0 +1,234 @@
+"""
+Content-based similar recipes.
+
+Every recipe becomes a TF-IDF vector over its title words, tags and parsed
+ingredient names, L2-normalized so that a dot product is the cosine
+similarity. The vectors are rows of a SciPy sparse matrix, and the top-k
+neighbours of each recipe come from sparse products of a block of rows
+with the whole matrix, so memory grows with the number of (recipe, term)
+pairs rather than with recipes x vocabulary. They are stored in
+RecipeNeighbour, so the detail page reads them with one indexed query
+instead of computing anything per request.
+
+``manage.py build_similarity`` rebuilds every list; with ``--incremental``
+it only recomputes the lists that recipe changes since the last build can
+have affected.
+"""
+
+import math
+from collections import Counter
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+from scipy import sparse
+
+from .ingredients import DESCRIPTORS, WORD, singularize
+from .models import Recipe, RecipeIngredient, RecipeNeighbour
+from .recommendations import top_n
+
+DEFAULT_NEIGHBOURS = 6
+BATCH_SIZE = 256
+
+TITLE_WEIGHT = 1.0
+TAG_WEIGHT = 1.5
+INGREDIENT_WEIGHT = 1.0
+KEYWORD_WEIGHT = 0.5
+
+STOPWORDS = {"and", "with", "the", "for", "style", "recipe", "easy"}
+
+
+def title_words(title):
+    words = (singularize(word) for word in WORD.findall(title.lower()))
+    return [
+        word
+        for word in words
+        if len(word) > 2 and word not in STOPWORDS | DESCRIPTORS
+    ]
+
+
+def recipe_documents():
+    """Map each recipe id to a Counter of weighted terms"""
+    documents = {}
+    recipes = Recipe.objects.values_list("id", "title", "recipe_tags")
+    for pk, title, tags in recipes.iterator():
+        terms = Counter()
+        for word in title_words(title):
+            terms[f"title:{word}"] += TITLE_WEIGHT
+        for tag in tags.split(","):
+            if tag.strip():
+                terms[f"tag:{tag.strip()}"] += TAG_WEIGHT
+        documents[pk] = terms
+
+    ingredients = RecipeIngredient.objects.values_list(
+        "recipe_id", "name", "keyword"
+    )
+    for recipe_id, name, keyword in ingredients.iterator():
+        terms = documents.get(recipe_id)
+        if terms is None:
+            continue
+        terms[f"ingredient:{name}"] += INGREDIENT_WEIGHT
+        if keyword != name:
+            terms[f"ingredient:{keyword}"] += KEYWORD_WEIGHT
+    return documents
+
+
+class TfidfIndex:
+    """Row-normalized sparse TF-IDF matrix of a set of documents"""
+
+    def __init__(self, documents):
+        self.ids = np.array(sorted(documents), dtype=np.int64)
+        self.rows = {int(pk): row for row, pk in enumerate(self.ids)}
+
+        # A term used by a single recipe cannot make two recipes similar,
+        # so leaving it out only saves memory
+        df = Counter(term for terms in documents.values() for term in terms)
+        vocabulary = sorted(term for term, count in df.items() if count > 1)
+        columns = {term: column for column, term in enumerate(vocabulary)}
+
+        total = len(self.ids)
+        rows, cols, values = [], [], []
+        for row, pk in enumerate(self.ids):
+            for term, weight in documents[int(pk)].items():
+                column = columns.get(term)
+                if column is not None:
+                    idf = math.log((1 + total) / (1 + df[term])) + 1
+                    rows.append(row)
+                    cols.append(column)
+                    values.append(weight * idf)
+        matrix = sparse.csr_matrix(
+            (np.array(values, dtype=np.float32), (rows, cols)),
+            shape=(total, len(columns)),
+        )
+
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)))
+        norms[norms == 0] = 1
+        scale = sparse.diags((1 / norms).ravel().astype(np.float32))
+        self.matrix = (scale @ matrix).tocsr()
+        self.transposed = self.matrix.T.tocsr()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def similarities(self, pks):
+        """
+        Sparse (len(pks) x len(self)) cosine similarities, without
+        self-matches; only recipes sharing a term are stored
+        """
+        rows = np.array([self.rows[pk] for pk in pks], dtype=np.int64)
+        scores = (self.matrix[rows] @ self.transposed).tocoo()
+        keep = scores.col != rows[scores.row]
+        return sparse.csr_matrix(
+            (scores.data[keep], (scores.row[keep], scores.col[keep])),
+            shape=scores.shape,
+        )
+
+    def neighbours(self, pks, k):
+        """Yield (recipe id, [(neighbour id, score), ...]) for each pk"""
+        k = min(k, len(self) - 1)
+        for start in range(0, len(pks), BATCH_SIZE):
+            batch = pks[start:start + BATCH_SIZE]
+            if k <= 0:
+                yield from ((pk, []) for pk in batch)
+                continue
+            scores = self.similarities(batch)
+            for i, pk in enumerate(batch):
+                span = slice(scores.indptr[i], scores.indptr[i + 1])
+                columns, values = top_n(
+                    scores.indices[span], scores.data[span], k
+                )
+                yield pk, [
+                    (int(self.ids[column]), float(score))
+                    for column, score in zip(columns, values)
+                    if score > 0
+                ]
+
+
+def store_neighbours(results, computed_at):
+    """Replace the stored neighbour lists of the given recipes"""
+    results = list(results)
+    with transaction.atomic():
+        RecipeNeighbour.objects.filter(
+            recipe_id__in=[pk for pk, neighbours in results],
+            kind=RecipeNeighbour.CONTENT,
+        ).delete()
+        RecipeNeighbour.objects.bulk_create(
+            RecipeNeighbour(
+                recipe_id=pk,
+                neighbour_id=neighbour_id,
+                kind=RecipeNeighbour.CONTENT,
+                rank=rank,
+                score=score,
+                computed_at=computed_at,
+            )
+            for pk, neighbours in results
+            for rank, (neighbour_id, score) in enumerate(neighbours)
+        )
+
+
+def stale_recipe_ids(index, k):
+    """
+    Recipes whose stored lists may be out of date since the last build:
+    recipes changed since, recipes listing one of them, recipes that a
+    changed recipe would now enter the top-k of, and short lists (never
+    built, or a neighbour was deleted)
+    """
+    stored = RecipeNeighbour.objects.filter(kind=RecipeNeighbour.CONTENT)
+    last_build = stored.aggregate(last=Max("computed_at"))["last"]
+    if last_build is None:
+        return [int(pk) for pk in index.ids]
+
+    changed = set(
+        Recipe.objects.filter(updated_at__gt=last_build).values_list(
+            "id", flat=True
+        )
+    )
+    stale = set(changed)
+    stale.update(
+        stored.filter(neighbour_id__in=changed).values_list(
+            "recipe_id", flat=True
+        )
+    )
+
+    lists = {
+        recipe_id: (count, lowest)
+        for recipe_id, count, lowest in stored.order_by()
+        .values_list("recipe_id")
+        .annotate(Count("id"), Min("score"))
+    }
+    expected = min(k, len(index) - 1)
+    stale.update(
+        pk for pk in index.rows if lists.get(pk, (0, 0))[0] < expected
+    )
+
+    changed = sorted(pk for pk in changed if pk in index.rows)
+    lowest = np.array(
+        [lists.get(int(pk), (0, 0))[1] for pk in index.ids], dtype=np.float32
+    )
+    for start in range(0, len(changed), BATCH_SIZE):
+        scores = index.similarities(changed[start:start + BATCH_SIZE])
+        best = scores.max(axis=0).toarray().ravel()
+        stale.update(int(pk) for pk in index.ids[best > lowest])
+
+    return sorted(pk for pk in stale if pk in index.rows)
+
+
+def build_similarity(k=DEFAULT_NEIGHBOURS, incremental=False):
+    """Compute and store neighbour lists; return how many were updated"""
+    computed_at = timezone.now()
+    index = TfidfIndex(recipe_documents())
+    if incremental:
+        pks = stale_recipe_ids(index, k)
+    else:
+        pks = [int(pk) for pk in index.ids]
+
+    results = []
+    for result in index.neighbours(pks, k):
+        results.append(result)
+        if len(results) >= BATCH_SIZE:
+            store_neighbours(results, computed_at)
+            results = []
+    if results:
+        store_neighbours(results, computed_at)
+    return len(pks)
@@ -0,0 +1,51 @@
+"""
+In-process request coalescing ("single flight").
+
+When several threads ask for the same key at once, only the first runs
+the fetch; the others wait for it and share its result (or its exception).
+Nothing is cached: once the fetch finishes, the next caller fetches again.
+"""
+
+import threading
+
+
+class Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # Callers waiting for this call's result besides the one running it
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fetch):
+        """Return fetch(), sharing one call among concurrent callers"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fetch()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result
@@ -0,0 +1,60 @@
+from django import template
+
+from recipes.fragments import get_fragment, source_version
+
+register = template.Library()
+
+
+class RecipeFragmentNode(template.Node):
+    def __init__(self, nodelist, name, recipe, version):
+        self.nodelist = nodelist
+        self.name = name
+        self.recipe = recipe
+        self.version = version
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        recipe = self.recipe.resolve(context)
+        return get_fragment(
+            name, recipe, lambda: self.nodelist.render(context), self.version
+        )
+
+
+def template_version(origin):
+    """Hash of the source of the template being parsed ("" if unknown)"""
+    if origin is None or origin.loader is None:
+        return ""
+    try:
+        return source_version(origin.loader.get_contents(origin))
+    except template.TemplateDoesNotExist:
+        return ""
+
+
+@register.tag
+def recipe_fragment(parser, token):
+    """
+    Cache a block of a recipe's markup until the recipe is next updated
+
+    Usage::
+
+        {% recipe_fragment "card" recipe %}
+            ...
+        {% endrecipe_fragment %}
+
+    The block must only depend on the recipe, not on the user or page.
+    Entries are also keyed on the template's source, so editing the
+    template renders the block again.
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' takes a fragment name and a recipe"
+        )
+    nodelist = parser.parse(("endrecipe_fragment",))
+    parser.delete_first_token()
+    return RecipeFragmentNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        template_version(parser.origin),
+    )
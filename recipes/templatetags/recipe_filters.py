@@ -1,6 +1,7 @@
-import re
 from django import template
 
+from recipes.models import Recipe
+
 # This creates a "library" where we'll store our custom filters
 register = template.Library()
 
@@ -14,21 +15,8 @@ def clean_instructions(value):
     if not value:
         return value
 
-    # Split the instructions into separate lines
-    lines = value.split("\n")
-    cleaned_lines = []
-
-    # Go through each line one by one
-    for line in lines:
-        # Remove numbers and dots at the start (like "1. ", "2. ", "10. ")
-        # The 're.sub' function finds patterns and replaces them
-        cleaned_line = re.sub(r"^\s*\d+\.\s*", "", line.strip())
-
-        # Only keep lines that have actual content
-        if cleaned_line:
-            cleaned_lines.append(cleaned_line)
-
-    return cleaned_lines
+    # Recipes store this as instruction_steps; kept for other templates
+    return Recipe.make_instruction_steps(value)
 
 
 @register.filter
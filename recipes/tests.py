@@ -1 +1,2109 @@
-# Removed unused import 'django.test.TestCase'
+import asyncio
+import csv
+import importlib
+import io
+import itertools
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import warnings
+from unittest import mock
+from urllib.parse import urlencode
+
+import cloudinary
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from django.apps import apps as django_apps
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Max
+from django.http import QueryDict
+from django.template import Context, Engine
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import counters, exporter, fragments, live, notifications, search, views
+from .forms import ReplyForm
+from .importer import read_json
+from .ingredients import parse_ingredient
+from .cards import RecipeCard, card_queryset, to_cards
+from .facets import get_facets
+from .featured import get_featured_recipes, sample_recipes
+from .filters import RecipeFilter
+from .middleware import QueryRecorder, get_query_budget
+from .pagination import CursorPaginator, InvalidCursor, encode_cursor
+from .models import (
+    Recipe,
+    RecipeTombstone,
+    Comment,
+    Notification,
+    SiteCounter,
+)
+from .recommendations import build_recommendations
+from .routing import websocket_urlpatterns
+from .search import search_recipes
+from .singleflight import SingleFlight
+from .similarity import build_similarity
+
+MEAL_TYPES = ["breakfast", "lunch", "dinner", "dessert"]
+TAG_SETS = [
+    ["italian", "pasta", "quick"],
+    ["vegan", "healthy", "easy"],
+    ["chicken", "spicy", "indian"],
+    ["fish", "grilled", "gluten_free"],
+    ["beef", "comfort_food", "slow_cooked"],
+    [],
+]
+
+# One value per filter parameter accepted by RecipeFilter
+LIST_FILTERS = [
+    {},
+    {"q": "chicken"},
+    {"q": "!!"},
+    {"category": "dinner"},
+    {"tags": "vegan,easy"},
+    {"any_tags": "fish,beef"},
+    {"exclude_tags": "spicy"},
+    {"max_prep_time": "20"},
+    {"max_cook_time": "30"},
+    {"pantry": "chicken,carrots"},
+    {"q": "recipe", "category": "lunch", "tags": "quick", "max_prep_time": 9},
+]
+LIST_SORTS = [
+    "newest",
+    "alphabetical",
+    "prep_time",
+    "cook_time",
+    "relevance",
+    "coverage",
+]
+LIST_PAGES = [
+    {},
+    {"pagination": "cursor"},
+    {"pagination": "cursor", "count": 1},
+]
+
+
+def setUpModule():
+    # Cloudinary builds image urls locally but needs a cloud name to do so
+    if not cloudinary.config().cloud_name:
+        cloudinary.config(cloud_name="test")
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Every named URL must stay within its settings.QUERY_BUDGETS entry, no
+    matter how many rows the page shows
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(f"cook{i}", password="password")
+            for i in range(5)
+        ]
+        cls.admin = User.objects.create_superuser("admin", password="admin")
+        cls.recipes = []
+        for i in range(40):
+            recipe = Recipe(
+                title=f"Test recipe {i}",
+                description=f"A chicken and vegetable recipe number {i}",
+                ingredients="1 chicken\n2 carrots\nsalt",
+                instructions="Chop.\nCook.\nServe.",
+                prep_time=5 + i % 6 * 10,
+                cook_time=10 + i % 4 * 15,
+                servings=2,
+                meal_type=MEAL_TYPES[i % len(MEAL_TYPES)],
+                author=cls.users[i % len(cls.users)],
+            )
+            recipe.set_recipe_tags(TAG_SETS[i % len(TAG_SETS)])
+            recipe.save()
+            cls.recipes.append(recipe)
+        cls.recipe = cls.recipes[0]
+        for i in range(12):
+            Comment.objects.create(
+                recipe=cls.recipe,
+                author=cls.users[i % len(cls.users)],
+                body=f"Comment {i}",
+                approved=i % 3 != 0,
+            )
+
+    def setUp(self):
+        # Budgets must hold with cold caches
+        cache.clear()
+
+    def assertWithinBudget(self, view_name, url, data=None):
+        budget = get_query_budget(view_name)
+        self.assertIsNotNone(budget, f"No query budget for {view_name}")
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(recorder.exceeds(budget), [], f"{url} {data}")
+        return response
+
+    def test_home(self):
+        self.assertWithinBudget("home", reverse("home"))
+
+    def test_home_logged_in(self):
+        self.client.force_login(self.users[0])
+        self.assertWithinBudget("home", reverse("home"))
+
+    def test_recipes_home(self):
+        self.assertWithinBudget("recipes_home", reverse("recipes_home"))
+
+    def test_recipes_list(self):
+        url = reverse("recipes_list")
+        combinations = itertools.product(LIST_FILTERS, LIST_SORTS, LIST_PAGES)
+        for filters, sort, page in combinations:
+            data = {**filters, **page, "sort": sort}
+            with self.subTest(**data):
+                cache.clear()
+                self.assertWithinBudget("recipes_list", url, data)
+
+    def test_recipes_list_later_pages(self):
+        url = reverse("recipes_list")
+        for sort in LIST_SORTS:
+            with self.subTest(sort=sort):
+                cache.clear()
+                self.assertWithinBudget(
+                    "recipes_list", url, {"q": "chicken", "sort": sort}
+                )
+                self.assertWithinBudget(
+                    "recipes_list", url, {"page": 3, "sort": sort}
+                )
+
+    def test_recipes_list_next_cursor(self):
+        url = reverse("recipes_list")
+        for sort in LIST_SORTS:
+            with self.subTest(sort=sort):
+                response = self.client.get(
+                    url, {"pagination": "cursor", "sort": sort}
+                )
+                cursor_page = response.context["cursor_page"]
+                if cursor_page is None:
+                    # Relevance has no keyset and falls back to pages
+                    continue
+                self.assertWithinBudget(
+                    "recipes_list",
+                    url,
+                    {"cursor": cursor_page.next_cursor, "sort": sort},
+                )
+
+    def test_categories_list(self):
+        self.assertWithinBudget("categories_list", reverse("categories_list"))
+
+    def test_notification_inbox(self):
+        Notification.objects.bulk_create(
+            Notification(recipient=self.users[0], message=f"Note {i}")
+            for i in range(30)
+        )
+        self.client.force_login(self.users[0])
+        self.assertWithinBudget(
+            "notification_inbox", reverse("notification_inbox")
+        )
+
+    def test_recipe_detail(self):
+        url = reverse("recipe_detail", args=[self.recipe.id])
+        self.assertWithinBudget("recipe_detail", url)
+        self.client.force_login(self.recipe.author)
+        response = self.assertWithinBudget("recipe_detail", url)
+        self.assertEqual(len(response.context["comments"]), 8)
+
+    def test_comment_replies(self):
+        root = Comment.objects.filter(approved=True).first()
+        for i in range(30):
+            Comment.objects.create(
+                recipe=self.recipe,
+                author=self.users[1],
+                body=f"Reply {i}",
+                parent=root,
+                approved=True,
+            )
+        url = reverse("comment_replies", args=[self.recipe.id, root.id])
+        response = self.assertWithinBudget("comment_replies", url)
+        self.assertWithinBudget(
+            "comment_replies", url, {"cursor": response.json()["next_cursor"]}
+        )
+
+    def test_recipe_comments(self):
+        Comment.objects.bulk_create(
+            Comment(
+                recipe=self.recipe,
+                author=self.users[1],
+                body=f"More {i}",
+                approved=True,
+            )
+            for i in range(40)
+        )
+        url = reverse("recipe_comments", args=[self.recipe.id])
+        response = self.assertWithinBudget("recipe_comments", url)
+        self.assertWithinBudget(
+            "recipe_comments", url, {"cursor": response.json()["next_cursor"]}
+        )
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.admin)
+        for model in ["recipe", "comment"]:
+            view_name = f"admin:recipes_{model}_changelist"
+            with self.subTest(model=model):
+                self.assertWithinBudget(view_name, reverse(view_name))
+
+
+@override_settings(
+    QUERY_BUDGET_WARNINGS=True, QUERY_BUDGETS={"home": {"queries": 0}}
+)
+class QueryBudgetMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_warns_over_budget(self):
+        with self.assertLogs("recipes.middleware", "WARNING") as logs:
+            self.client.get(reverse("home"))
+        self.assertIn("Query budget exceeded for home", logs.output[0])
+
+    def test_ignores_urls_without_budget(self):
+        with self.assertNoLogs("recipes.middleware", "WARNING"):
+            self.client.get(reverse("categories_list"))
+
+    async def test_warns_over_budget_under_asgi(self):
+        with self.assertLogs("recipes.middleware", "WARNING") as logs:
+            response = await self.async_client.get(reverse("home"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Query budget exceeded for home", logs.output[0])
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cook", password="password")
+        cls.recipe = Recipe.objects.create(
+            title="Soup",
+            ingredients="water",
+            instructions="Boil.",
+            prep_time=5,
+            cook_time=10,
+            author=cls.user,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def assertCached(self, url, data=None):
+        self.client.get(url, data)
+        with self.assertNumQueries(0):
+            self.client.get(url, data)
+
+    def test_anonymous_pages_are_cached(self):
+        self.assertCached(reverse("home"))
+        self.assertCached(reverse("recipes_list"), {"sort": "alphabetical"})
+        self.assertCached(reverse("recipe_detail", args=[self.recipe.id]))
+
+    async def test_async_views_under_asgi(self):
+        urls = [
+            reverse("home"),
+            reverse("recipes_list"),
+            reverse("recipe_detail", args=[self.recipe.id]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                self.assertContains(response, "Soup")
+                cached = await self.async_client.get(url)
+                self.assertEqual(cached.content, response.content)
+        response = await self.async_client.get(
+            reverse("recipe_detail", args=[self.recipe.id + 1])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_equivalent_query_strings_share_an_entry(self):
+        url = reverse("recipes_list")
+        self.client.get(url, {"sort": "newest", "q": "", "tags": "vegan"})
+        with self.assertNumQueries(0):
+            self.client.get(f"{url}?tags=vegan&category=&sort=newest")
+
+    def test_logged_in_pages_are_not_cached(self):
+        self.client.force_login(self.user)
+        url = reverse("recipe_detail", args=[self.recipe.id])
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertContains(response, "deleteRecipeModal")
+
+    def test_recipe_change_invalidates_listings(self):
+        url = reverse("recipes_list")
+        self.client.get(url)
+        self.recipe.title = "Stew"
+        self.recipe.save()
+        self.assertContains(self.client.get(url), "Stew")
+
+    def test_comment_change_invalidates_detail(self):
+        url = reverse("recipe_detail", args=[self.recipe.id])
+        self.client.get(url)
+        Comment.objects.create(
+            recipe=self.recipe, author=self.user, body="Tasty", approved=True
+        )
+        self.assertContains(self.client.get(url), "Tasty")
+
+
+class FragmentCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cook", password="password")
+        cls.staff = User.objects.create_user(
+            "staff", password="password", is_staff=True
+        )
+        cls.recipe = Recipe.objects.create(
+            title="Soup",
+            ingredients="water",
+            instructions="1. Boil.",
+            prep_time=5,
+            cook_time=10,
+            author=cls.user,
+        )
+
+    def setUp(self):
+        # Drop counts other tests left unflushed in this process
+        fragments.flush_stats()
+        cache.clear()
+        self.client.force_login(self.staff)
+
+    def get_stats(self):
+        return self.client.get(reverse("cache_stats")).json()["fragments"]
+
+    def test_cards_are_shared_between_pages(self):
+        self.client.get(reverse("recipes_list"))
+        self.client.get(reverse("recipes_list"), {"sort": "alphabetical"})
+        stats = self.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_updated_recipe_is_rendered_again(self):
+        url = reverse("recipe_detail", args=[self.recipe.id])
+        self.client.get(url)
+        self.recipe.instructions = "1. Simmer."
+        self.recipe.save()
+        response = self.client.get(url)
+        self.assertContains(response, "Simmer.")
+        self.assertNotContains(response, "Boil.")
+
+    def test_changed_templates_are_rendered_again(self):
+        def render(source):
+            engine = Engine(
+                loaders=[
+                    ("django.template.loaders.locmem.Loader", {"t": source})
+                ],
+                libraries={
+                    "recipe_cache": "recipes.templatetags.recipe_cache"
+                },
+            )
+            return engine.get_template("t").render(
+                Context({"recipe": self.recipe})
+            )
+
+        source = (
+            '{% load recipe_cache %}{% recipe_fragment "x" recipe %}'
+            "<b>{{ recipe.title }}</b>{% endrecipe_fragment %}"
+        )
+        self.assertEqual(render(source), "<b>Soup</b>")
+        source = source.replace("b>", "i>")
+        self.assertEqual(render(source), "<i>Soup</i>")
+
+        # Same template: the recipe's own stamp or the setting must move
+        Recipe.objects.filter(pk=self.recipe.pk).update(title="Stew")
+        self.recipe.title = "Stew"
+        self.assertEqual(render(source), "<i>Soup</i>")
+        with override_settings(FRAGMENT_VERSION="2"):
+            self.assertEqual(render(source), "<i>Stew</i>")
+
+    def test_stats_are_staff_only(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("cache_stats"))
+        self.assertEqual(response.status_code, 302)
+
+
+class IngredientTests(TestCase):
+    def test_parse_ingredient(self):
+        cases = {
+            "1 1/2 cups plain flour, sifted": (1.5, "cup", "plain flour"),
+            "½ tsp salt": (0.5, "tsp", "salt"),
+            "300g frozen spinach": (300, "g", "spinach"),
+            "1 (400g) tin chopped tomatoes": (1, "can", "tomato"),
+            "2-3 large eggs": (2, "", "egg"),
+            "Salt and pepper to taste": (None, "", "salt and pepper"),
+        }
+        for line, expected in cases.items():
+            with self.subTest(line=line):
+                parsed = parse_ingredient(line)
+                self.assertEqual(
+                    (parsed.quantity, parsed.unit, parsed.name), expected
+                )
+        self.assertIsNone(parse_ingredient("For the sauce:"))
+        parsed = parse_ingredient("2 chicken breasts")
+        self.assertEqual(parsed.keyword, "chicken")
+
+    def test_pantry_coverage_ranking(self):
+        user = User.objects.create_user("cook", password="password")
+        for title, ingredients in [
+            ("Omelette", "3 eggs\n1 tbsp butter"),
+            ("Cake", "3 eggs\n200g flour\n200g sugar\n200g butter"),
+            ("Salad", "1 lettuce"),
+        ]:
+            Recipe.objects.create(
+                title=title,
+                ingredients=ingredients,
+                instructions="Cook.",
+                prep_time=5,
+                cook_time=5,
+                author=user,
+            )
+        ranked = Recipe.objects.with_pantry_coverage(["Eggs", "butter"])
+        ranked = ranked.order_by("-pantry_coverage")
+        self.assertEqual(
+            [(r.title, r.pantry_matches) for r in ranked],
+            [("Omelette", 2), ("Cake", 2)],
+        )
+
+
+class SimilarityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user("cook", password="password")
+        recipes = {}
+        for title, tags, ingredients in [
+            ("Chicken curry", "indian,spicy", "chicken\nrice\ncurry paste"),
+            ("Chicken korma", "indian", "chicken\nrice\ncream"),
+            ("Lemon cake", "baked", "flour\nsugar\nlemon"),
+            ("Orange cake", "baked", "flour\nsugar\norange"),
+        ]:
+            recipes[title] = Recipe.objects.create(
+                title=title,
+                recipe_tags=tags,
+                ingredients=ingredients,
+                instructions="Cook.",
+                prep_time=5,
+                cook_time=5,
+                author=user,
+            )
+        cls.recipes = recipes
+
+    def neighbours(self, title):
+        recipe = self.recipes[title]
+        return [n.neighbour.title for n in recipe.neighbours.all()]
+
+    def test_build_and_show_neighbours(self):
+        self.assertEqual(build_similarity(k=1), 4)
+        self.assertEqual(self.neighbours("Chicken curry"), ["Chicken korma"])
+        self.assertEqual(self.neighbours("Lemon cake"), ["Orange cake"])
+
+        url = reverse("recipe_detail", args=[self.recipes["Lemon cake"].id])
+        response = self.client.get(url)
+        self.assertEqual(
+            [r.title for r in response.context["similar_recipes"]],
+            ["Orange cake"],
+        )
+
+    def test_incremental_build(self):
+        build_similarity(k=1)
+        self.assertEqual(build_similarity(k=1, incremental=True), 0)
+
+        recipe = self.recipes["Orange cake"]
+        recipe.title = "Chicken and rice bake"
+        recipe.ingredients = "chicken\nrice\ncream"
+        recipe.save()
+        self.assertGreater(build_similarity(k=1, incremental=True), 0)
+        incremental = {title: self.neighbours(title) for title in self.recipes}
+
+        # Same lists as a full rebuild
+        build_similarity(k=1)
+        full = {title: self.neighbours(title) for title in self.recipes}
+        self.assertEqual(incremental, full)
+        self.assertEqual(
+            self.neighbours("Lemon cake"), ["Chicken and rice bake"]
+        )
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(f"cook{i}", password="password")
+            for i in range(4)
+        ]
+        cls.recipes = [
+            Recipe.objects.create(
+                title=f"Recipe {i}",
+                ingredients="water",
+                instructions="Boil.",
+                prep_time=5,
+                cook_time=5,
+                author=cls.users[3],
+            )
+            for i in range(4)
+        ]
+        # cook0 and cook1 both like recipes 0 and 1; cook1 also likes 2
+        for user, recipe in [(0, 0), (0, 1), (1, 0), (1, 1), (1, 2), (2, 3)]:
+            Comment.objects.create(
+                recipe=cls.recipes[recipe],
+                author=cls.users[user],
+                body="Yum",
+                approved=True,
+            )
+        Comment.objects.create(
+            recipe=cls.recipes[3], author=cls.users[0], body="Meh"
+        )
+
+    def test_build_recommendations(self):
+        self.assertEqual(build_recommendations(), (3, 1))
+
+        recipe = self.recipes[0]
+        self.assertEqual(
+            [n.neighbour for n in recipe.neighbours.all()],
+            [self.recipes[1], self.recipes[2]],
+        )
+        # cook0 has not commented on recipe 2 yet; unapproved comments and
+        # the author's own recipes are ignored
+        feeds = {
+            user.username: [r.recipe for r in user.recommendations.all()]
+            for user in self.users
+        }
+        self.assertEqual(
+            feeds,
+            {
+                "cook0": [self.recipes[2]],
+                "cook1": [],
+                "cook2": [],
+                "cook3": [],
+            },
+        )
+
+    def test_home_shows_feed(self):
+        build_recommendations()
+        self.client.force_login(self.users[0])
+        response = self.client.get(reverse("home"))
+        self.assertEqual(
+            [r.id for r in response.context["recommended_recipes"]],
+            [self.recipes[2].id],
+        )
+
+
+class ImportRecipesTests(TestCase):
+    ROWS = [
+        {
+            "title": "Imported soup",
+            "ingredients": "2 carrots\n1 onion",
+            "instructions": "1. Chop.\n2. Simmer.",
+            "prep_time": 10,
+            "cook_time": 30,
+            "meal_type": "lunch",
+            "recipe_tags": ["soup", "vegan"],
+            "author": "cook",
+        },
+        # Too short a title, unknown tag, too long overall, unknown author
+        {"title": "No", "author": "cook"},
+        {
+            "title": "Odd tags",
+            "ingredients": "x",
+            "instructions": "y",
+            "prep_time": 1,
+            "cook_time": 1,
+            "meal_type": "dinner",
+            "recipe_tags": "soup,made_up",
+            "author": "cook",
+        },
+        {
+            "title": "Very slow stew",
+            "ingredients": "beef",
+            "instructions": "Wait.",
+            "prep_time": 300,
+            "cook_time": 400,
+            "meal_type": "dinner",
+            "author": "cook",
+        },
+        {
+            "title": "Nobody's bread",
+            "ingredients": "flour",
+            "instructions": "Bake.",
+            "prep_time": 10,
+            "cook_time": 40,
+            "meal_type": "breakfast",
+            "author": "ghost",
+        },
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cook", password="password")
+
+    def import_file(self, name, content, *args):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, name)
+        with open(path, "w", encoding="utf-8", newline="") as stream:
+            stream.write(content)
+        out, err = io.StringIO(), io.StringIO()
+        call_command("import_recipes", path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_ndjson(self):
+        content = "\n".join(json.dumps(row) for row in self.ROWS)
+        out, err = self.import_file(
+            "recipes.ndjson", content, "--batch-size=2"
+        )
+        self.assertIn("Imported 1 recipes, skipped 4", out)
+        for number in [2, 3, 4, 5]:
+            self.assertIn(f"Row {number}:", err)
+
+        recipe = Recipe.objects.get()
+        self.assertEqual(recipe.author, self.user)
+        self.assertEqual(recipe.recipe_tags, "soup,vegan")
+        self.assertEqual(recipe.instruction_steps, ["Chop.", "Simmer."])
+        self.assertEqual(
+            list(recipe.parsed_ingredients.values_list("name", flat=True)),
+            ["carrot", "onion"],
+        )
+        self.assertEqual(
+            list(search_recipes(Recipe.objects.all(), "simmer")), [recipe]
+        )
+        self.assertEqual(SiteCounter.objects.get(name="tag:soup").value, 1)
+
+    def test_import_json_and_csv(self):
+        row = dict(self.ROWS[0], recipe_tags="soup,vegan")
+        fixture = json.dumps([{"model": "recipes.recipe", "fields": row}])
+        out, err = self.import_file("recipes.json", fixture)
+        self.assertIn("Imported 1 recipes", out)
+
+        header = list(row)
+        content = ",".join(header) + "\n" + ",".join(
+            json.dumps(str(row[name])) for name in header
+        )
+        out, err = self.import_file("recipes.csv", content, "--dry-run")
+        self.assertIn("Validated 1 recipes", out)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_author_cache_reset_keeps_batch_authors(self):
+        User.objects.create_user("baker", password="password")
+        rows = [
+            dict(self.ROWS[0], title=f"Soup number {i}", author=author)
+            for i, author in enumerate(["cook", "cook", "cook", "baker"])
+        ]
+        content = "\n".join(json.dumps(row) for row in rows)
+        # The second batch crosses the limit with "cook" already cached
+        with mock.patch("recipes.importer.MAX_CACHED_AUTHORS", 2):
+            out, err = self.import_file(
+                "recipes.ndjson", content, "--batch-size=2"
+            )
+        self.assertIn("Imported 4 recipes, skipped 0", out)
+        self.assertEqual(err, "")
+
+    def test_read_json_streams_elements(self):
+        rows = [{"title": "x" * 50, "n": n} for n in range(20)]
+        stream = io.StringIO(json.dumps(rows, indent=2))
+        self.assertEqual(list(read_json(stream, read_size=16)), rows)
+
+
+class ExportRecipesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            "staff", password="password", is_staff=True
+        )
+        cls.cook = User.objects.create_user("cook", password="password")
+        cls.recipes = [
+            Recipe.objects.create(
+                title=f"Export {meal_type}",
+                ingredients="water",
+                instructions="Boil.",
+                prep_time=5,
+                cook_time=5,
+                meal_type=meal_type,
+                recipe_tags="soup,quick",
+                author=cls.cook,
+            )
+            for meal_type in ["lunch", "dinner", "lunch"]
+        ]
+        for recipe, body, approved in [
+            (0, "First", True),
+            (0, "Hidden", False),
+            (2, "Second", True),
+            (2, "Third", True),
+        ]:
+            Comment.objects.create(
+                recipe=cls.recipes[recipe],
+                author=cls.staff,
+                body=body,
+                approved=approved,
+            )
+
+    def export(self, **params):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("export_recipes"), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_staff_only(self):
+        self.client.force_login(self.cook)
+        response = self.client.get(reverse("export_recipes"))
+        self.assertEqual(response.status_code, 302)
+
+    def test_ndjson_export_filters_and_merges_comments(self):
+        rows = [
+            json.loads(line)
+            for line in self.export(category="lunch").splitlines()
+        ]
+        self.assertEqual(
+            [row["id"] for row in rows],
+            [self.recipes[0].id, self.recipes[2].id],
+        )
+        self.assertEqual(
+            [[c["body"] for c in row["comments"]] for row in rows],
+            [["First"], ["Second", "Third"]],
+        )
+        self.assertEqual(rows[0]["author"], "cook")
+        self.assertEqual(rows[0]["recipe_tags"], ["soup", "quick"])
+
+        # Search filters work too
+        rows = self.export(q="dinner", sort="relevance").splitlines()
+        self.assertEqual(
+            [json.loads(line)["id"] for line in rows], [self.recipes[1].id]
+        )
+
+    @mock.patch.object(exporter, "DEFAULT_CHUNK_SIZE", 1)
+    async def test_streams_chunks_under_asgi(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse("export_recipes"))
+        self.assertTrue(response.is_async)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            parts = [part async for part in response]
+        self.assertEqual(caught, [])
+        # One part per chunk of one recipe, rather than one buffered body
+        self.assertEqual(len(parts), 3)
+        self.assertEqual(
+            [json.loads(part)["id"] for part in parts],
+            [recipe.id for recipe in self.recipes],
+        )
+
+    def test_csv_export(self):
+        rows = list(csv.DictReader(io.StringIO(self.export(format="csv"))))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["recipe_tags"], "soup,quick")
+        self.assertEqual(json.loads(rows[0]["comments"])[0]["body"], "First")
+
+    def test_command_output_can_be_imported(self):
+        out, err = io.StringIO(), io.StringIO()
+        call_command(
+            "export_recipes", filter="category=dinner", stdout=out, stderr=err
+        )
+        self.assertIn("Exported 1 recipes.", err.getvalue())
+        Recipe.objects.all().delete()
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "recipes.ndjson")
+        with open(path, "w", encoding="utf-8") as stream:
+            stream.write(out.getvalue())
+        call_command("import_recipes", path, stdout=io.StringIO())
+        self.assertEqual(
+            list(Recipe.objects.values_list("title", "recipe_tags")),
+            [("Export dinner", "soup,quick")],
+        )
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cook", password="password")
+        cls.recipes = [
+            Recipe.objects.create(
+                title=f"Api recipe {i}",
+                ingredients="water",
+                instructions="Boil.",
+                prep_time=i,
+                cook_time=5,
+                meal_type="lunch" if i % 2 else "dinner",
+                recipe_tags="soup",
+                author=cls.user,
+            )
+            for i in range(5)
+        ]
+
+    def get(self, name, *args, headers=None, **params):
+        return self.client.get(
+            reverse(name, args=args), params, headers=headers or {}
+        )
+
+    def test_list_sparse_fields_and_cursor(self):
+        response = self.get(
+            "api_recipe_list",
+            fields="title,prep_time",
+            sort="prep_time",
+            limit=2,
+        )
+        data = response.json()
+        self.assertEqual(
+            data["results"],
+            [
+                {"title": "Api recipe 0", "prep_time": 0},
+                {"title": "Api recipe 1", "prep_time": 1},
+            ],
+        )
+        self.assertIsNone(data["previous"])
+        data = self.client.get(data["next"]).json()
+        self.assertEqual(
+            [row["prep_time"] for row in data["results"]], [2, 3]
+        )
+
+    def test_list_filters_and_errors(self):
+        data = self.get("api_recipe_list", category="lunch").json()
+        self.assertEqual(
+            {row["id"] for row in data["results"]},
+            {self.recipes[1].id, self.recipes[3].id},
+        )
+        self.assertEqual(data["results"][0]["tags"], ["soup"])
+        response = self.get("api_recipe_list", fields="title,secret")
+        self.assertEqual(response.status_code, 400)
+        response = self.get("api_recipe_list", cursor="nonsense")
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_not_modified(self):
+        response = self.get("api_recipe_list")
+        etag = response.headers["ETag"]
+        with self.assertNumQueries(1):
+            response = self.get(
+                "api_recipe_list", headers={"if-none-match": etag}
+            )
+        self.assertEqual(response.status_code, 304)
+
+        self.recipes[0].save()
+        response = self.get("api_recipe_list", headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_conditional_requests(self):
+        recipe = self.recipes[0]
+        response = self.get(
+            "api_recipe_detail", recipe.id, fields="title,comments"
+        )
+        self.assertEqual(
+            response.json(), {"title": "Api recipe 0", "comments": []}
+        )
+        etag = response.headers["ETag"]
+        last_modified = response.headers["Last-Modified"]
+
+        with self.assertNumQueries(1):
+            response = self.get(
+                "api_recipe_detail",
+                recipe.id,
+                fields="title,comments",
+                headers={"if-none-match": etag},
+            )
+        self.assertEqual(response.status_code, 304)
+        response = self.get(
+            "api_recipe_detail",
+            recipe.id,
+            headers={"if-modified-since": last_modified},
+        )
+        self.assertEqual(response.status_code, 304)
+
+        # An approved comment changes the representation
+        Comment.objects.create(
+            recipe=recipe, author=self.user, body="Lovely", approved=True
+        )
+        response = self.get(
+            "api_recipe_detail",
+            recipe.id,
+            fields="title,comments",
+            headers={"if-none-match": etag},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["comments"][0]["body"], "Lovely")
+
+        # So does editing its body
+        etag = response.headers["ETag"]
+        comment = Comment.objects.get(recipe=recipe)
+        comment.body = "Lovely, crisp"
+        comment.save()
+        response = self.get(
+            "api_recipe_detail",
+            recipe.id,
+            fields="title,comments",
+            headers={"if-none-match": etag},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["comments"][0]["body"], "Lovely, crisp"
+        )
+
+    def test_detail_not_found(self):
+        response = self.get("api_recipe_detail", 0)
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cook", password="password")
+        cls.recipes = [cls.create_recipe(i) for i in range(3)]
+
+    @classmethod
+    def create_recipe(cls, i):
+        return Recipe.objects.create(
+            title=f"Sync recipe {i}",
+            ingredients="water",
+            instructions="Boil.",
+            prep_time=5,
+            cook_time=5,
+            author=cls.user,
+        )
+
+    def sync(self, **params):
+        params.setdefault("fields", "id")
+        response = self.client.get(reverse("api_recipe_sync"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def sync_all(self, cursor=None):
+        """Follow has_more to the end; return (updated, deleted, cursor)"""
+        updated, deleted = [], []
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            data = self.sync(**params)
+            updated += [row["id"] for row in data["updated"]]
+            deleted += data["deleted"]
+            cursor = data["cursor"]
+            if not data["has_more"]:
+                return updated, deleted, cursor
+
+    def test_initial_and_incremental_sync(self):
+        # Deletions before a client's first sync are not sent to it
+        self.create_recipe(9).delete()
+        updated, deleted, cursor = self.sync_all()
+        self.assertEqual(updated, [recipe.id for recipe in self.recipes])
+        self.assertEqual(deleted, [])
+
+        # Nothing changed
+        self.assertEqual(self.sync_all(cursor)[:2], ([], []))
+
+        new = self.create_recipe(3)
+        self.recipes[0].title = "Renamed"
+        self.recipes[0].save()
+        deleted_id = self.recipes[1].id
+        self.recipes[1].delete()
+        updated, deleted, cursor = self.sync_all(cursor)
+        self.assertEqual(updated, [new.id, self.recipes[0].id])
+        self.assertEqual(deleted, [deleted_id])
+        self.assertTrue(
+            RecipeTombstone.objects.filter(recipe_id=deleted_id).exists()
+        )
+
+    def test_since_and_fields(self):
+        data = self.sync(
+            since=self.recipes[1].updated_at.isoformat(), fields="title"
+        )
+        self.assertEqual(
+            data["updated"],
+            [{"title": "Sync recipe 1"}, {"title": "Sync recipe 2"}],
+        )
+
+    def test_invalid_parameters(self):
+        for params in [{"cursor": "nonsense"}, {"since": "yesterday"}]:
+            response = self.client.get(reverse("api_recipe_sync"), params)
+            self.assertEqual(response.status_code, 400)
+
+    @override_settings(SYNC_SETTLE_SECONDS=60)
+    def test_recent_changes_wait_to_settle(self):
+        self.assertEqual(self.sync()["updated"], [])
+
+
+class BatchApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cook", password="password")
+        cls.recipes = [
+            Recipe.objects.create(
+                title=f"Batch recipe {i}",
+                ingredients="water",
+                instructions="Boil.",
+                prep_time=5,
+                cook_time=5,
+                author=cls.user,
+            )
+            for i in range(3)
+        ]
+        Comment.objects.create(
+            recipe=cls.recipes[2], author=cls.user, body="Nice", approved=True
+        )
+
+    def test_batch_in_requested_order(self):
+        ids = [self.recipes[2].id, 0, self.recipes[0].id]
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse("api_recipe_batch"),
+                {
+                    "ids": ",".join(map(str, ids)),
+                    "fields": "id,author,comment_count",
+                },
+            )
+        self.assertEqual(
+            response.json(),
+            {
+                "results": [
+                    {"id": ids[0], "author": "cook", "comment_count": 1},
+                    {"id": ids[2], "author": "cook", "comment_count": 0},
+                ],
+                "missing": [0],
+            },
+        )
+
+    def test_invalid_ids(self):
+        for ids in ["", "1,x", ",".join(map(str, range(101)))]:
+            response = self.client.get(
+                reverse("api_recipe_batch"), {"ids": ids}
+            )
+            self.assertEqual(response.status_code, 400)
+
+
+class SingleFlightTests(TestCase):
+    def test_concurrent_calls_share_one_fetch(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return "rows"
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(flight.do("key", fetch))
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        # Let the other four queue up behind the first before it finishes
+        while "key" not in flight.calls or flight.calls["key"].waiters < 4:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["rows"] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.calls, {})
+
+        # Nothing is cached once the call is over
+        flight.do("key", fetch)
+        self.assertEqual(len(calls), 2)
+
+
+class NotificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("author", password="password")
+        cls.reader = User.objects.create_user("reader", password="password")
+        cls.recipes = [
+            Recipe.objects.create(
+                title=f"Stew {i}",
+                ingredients="beef",
+                instructions="Simmer.",
+                prep_time=10,
+                cook_time=60,
+                author=cls.author,
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def comment(self, recipe, author, approved=False):
+        return Comment.objects.create(
+            recipe=recipe, author=author, body="Tasty", approved=approved
+        )
+
+    def test_approving_a_comment_notifies_the_recipe_author(self):
+        comment = self.comment(self.recipes[0], self.reader)
+        self.assertFalse(Notification.objects.exists())
+        comment.approved = True
+        comment.save()
+        comment.save()
+        notification = Notification.objects.get()
+        self.assertEqual(notification.recipient, self.author)
+        self.assertEqual(notification.message, 'reader commented on "Stew 0"')
+        self.assertEqual(
+            notification.link,
+            reverse("recipe_detail", args=[self.recipes[0].id]),
+        )
+        # Nobody is told about their own comments
+        self.comment(self.recipes[0], self.author, approved=True)
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_bulk_approval_notifies_in_batches(self):
+        Comment.objects.bulk_create(
+            Comment(recipe=recipe, author=self.reader, body="Tasty")
+            for recipe in self.recipes
+            for i in range(400)
+        )
+        self.comment(self.recipes[0], self.author)
+        comment_admin = site._registry[Comment]
+        with CaptureQueriesContext(connection) as queries:
+            comment_admin.approve_comments(None, Comment.objects.all())
+        inserts = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith('INSERT INTO "recipes_notification"')
+        ]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(
+            self.author.notifications.filter(read=False).count(), 1200
+        )
+
+    def test_unread_count_is_cached(self):
+        self.client.force_login(self.author)
+        comment = self.comment(self.recipes[0], self.reader)
+        self.assertEqual(notifications.unread_count(self.author.pk), 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(notifications.unread_count(self.author.pk), 0)
+
+        # New notifications drop the cached count once they commit
+        comment.approved = True
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.save()
+        response = self.client.get(reverse("home"))
+        self.assertContains(response, "1 unread")
+        with self.assertNumQueries(0):
+            self.assertEqual(notifications.unread_count(self.author.pk), 1)
+
+    def test_inbox_pages_and_mark_read(self):
+        Notification.objects.bulk_create(
+            Notification(recipient=self.author, message=f"Note {i}")
+            for i in range(25)
+        )
+        Notification.objects.create(recipient=self.reader, message="Other")
+        self.client.force_login(self.author)
+        url = reverse("notification_inbox")
+        response = self.client.get(url)
+        page = response.context["notifications"]
+        self.assertEqual(
+            [n.message for n in page][:2], ["Note 24", "Note 23"]
+        )
+        response = self.client.get(url, {"cursor": page.next_cursor})
+        self.assertEqual(len(response.context["notifications"]), 5)
+
+        read_url = reverse("notifications_read")
+        ids = [n.id for n in page][:3]
+        self.client.post(read_url, {"ids": ids})
+        self.assertEqual(notifications.unread_count(self.author.pk), 22)
+        with self.assertNumQueries(1):
+            notifications.mark_read(self.author.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(notifications.unread_count(self.author.pk), 0)
+        self.assertEqual(notifications.unread_count(self.reader.pk), 1)
+
+
+async def receive_all(layer, channel):
+    """Messages waiting on a channel layer channel"""
+    messages = []
+    while True:
+        try:
+            messages.append(
+                await asyncio.wait_for(layer.receive(channel), 0.1)
+            )
+        except asyncio.TimeoutError:
+            return messages
+
+
+class LiveCommentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("author", password="password")
+        cls.reader = User.objects.create_user("reader", password="password")
+        cls.recipes = [
+            Recipe.objects.create(
+                title=f"Curry {i}",
+                ingredients="rice",
+                instructions="Stir.",
+                prep_time=10,
+                cook_time=30,
+                author=cls.author,
+            )
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        self.layer = get_channel_layer()
+        async_to_sync(self.layer.flush)()
+
+    def listen(self, recipe):
+        channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(
+            live.comments_group(recipe.id), channel
+        )
+        return channel
+
+    def test_bulk_approval_sends_one_message_per_recipe(self):
+        channels = [self.listen(recipe) for recipe in self.recipes]
+        Comment.objects.bulk_create(
+            Comment(recipe=recipe, author=self.reader, body=f"Yum {i}")
+            for recipe, total in zip(self.recipes, [30, 2])
+            for i in range(total)
+        )
+        comment_admin = site._registry[Comment]
+        with self.captureOnCommitCallbacks(execute=True):
+            comment_admin.approve_comments(None, Comment.objects.all())
+
+        messages = async_to_sync(receive_all)(self.layer, channels[0])
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0]["count"], 30)
+        self.assertEqual(
+            len(messages[0]["comments"]), live.MAX_PUSHED_COMMENTS
+        )
+        messages = async_to_sync(receive_all)(self.layer, channels[1])
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0]["count"], 2)
+        self.assertIn("Yum 1", messages[0]["comments"][0]["html"])
+
+    def test_edits_and_removals_are_pushed(self):
+        channel = self.listen(self.recipes[0])
+        comment = Comment.objects.create(
+            recipe=self.recipes[0], author=self.reader, body="Pending"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.body = "Still pending"
+            comment.save()
+        self.assertEqual(async_to_sync(receive_all)(self.layer, channel), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.approved = True
+            comment.body = "Edited"
+            comment.save()
+        comment_id = comment.id
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.delete()
+        edited, deleted = async_to_sync(receive_all)(self.layer, channel)
+        self.assertEqual(edited["count"], 1)
+        self.assertIn("Edited", edited["comments"][0]["html"])
+        self.assertEqual(deleted["removed"], [comment_id])
+        self.assertEqual(deleted["count"], 0)
+
+    async def test_consumer(self):
+        application = URLRouter(websocket_urlpatterns)
+        recipe = self.recipes[0]
+        comment = await Comment.objects.acreate(
+            recipe=recipe, author=self.reader, body="Lovely", approved=True
+        )
+
+        def connect(recipe_id):
+            path = f"/ws/recipes/{recipe_id}/comments/"
+            return ApplicationCommunicator(
+                application,
+                {"type": "websocket", "path": path, "headers": []},
+            )
+
+        page = connect(recipe.id)
+        await page.send_input({"type": "websocket.connect"})
+        accept = await page.receive_output()
+        self.assertEqual(accept["type"], "websocket.accept")
+        await sync_to_async(live.send_comments)([comment.id])
+        message = json.loads((await page.receive_output(5))["text"])
+        self.assertEqual(message["count"], 1)
+        self.assertIn("Lovely", message["comments"][0]["html"])
+        await page.send_input({"type": "websocket.disconnect", "code": 1000})
+        await page.wait()
+
+        missing = connect(recipe.id + 100)
+        await missing.send_input({"type": "websocket.connect"})
+        await missing.receive_output()
+        self.assertEqual(
+            await missing.receive_output(),
+            {"type": "websocket.close", "code": 4404},
+        )
+
+
+class CommentPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cook", password="password")
+        cls.recipe = Recipe.objects.create(
+            title="Bread",
+            ingredients="flour",
+            instructions="Bake.",
+            prep_time=20,
+            cook_time=40,
+            author=cls.user,
+        )
+        Comment.objects.bulk_create(
+            Comment(
+                recipe=cls.recipe,
+                author=cls.user,
+                body=f"Crumb {i}",
+                approved=i != 5,
+            )
+            for i in range(25)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_detail_renders_first_page(self):
+        url = reverse("recipe_detail", args=[self.recipe.id])
+        response = self.client.get(url)
+        comments = response.context["comments"]
+        self.assertEqual(len(comments), views.COMMENTS_PER_PAGE)
+        self.assertTrue(comments.has_next)
+        self.assertContains(response, 'id="loadMoreComments"')
+
+    def test_load_more_until_the_end(self):
+        url = reverse("recipe_comments", args=[self.recipe.id])
+        bodies, cursor = [], None
+        for i in range(3):
+            data = self.client.get(url, {"cursor": cursor} if cursor else {})
+            data = data.json()
+            bodies += re.findall(r"Crumb \d+", data["html"])
+            cursor = data["next_cursor"]
+        self.assertIsNone(cursor)
+        self.assertEqual(len(bodies), 24)
+        self.assertEqual(len(set(bodies)), 24)
+        self.assertNotIn("Crumb 5", bodies)
+
+        response = self.client.get(url, {"cursor": "nonsense"})
+        self.assertEqual(response.status_code, 400)
+
+
+class CommentJsonTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cook", password="password")
+        cls.other = User.objects.create_user("other", password="password")
+        cls.recipe = Recipe.objects.create(
+            title="Pie",
+            ingredients="apples",
+            instructions="Bake.",
+            prep_time=30,
+            cook_time=45,
+            author=cls.other,
+        )
+        cls.comment = Comment.objects.create(
+            recipe=cls.recipe, author=cls.user, body="Nice", approved=True
+        )
+
+    def url(self, name, *args):
+        return reverse(name, args=[self.recipe.id, *args])
+
+    def test_create(self):
+        url = self.url("comment_create_json")
+        response = self.client.post(url, {"body": "Hi"})
+        self.assertEqual(response.status_code, 401)
+        self.client.force_login(self.user)
+        response = self.client.post(url, {"body": "Lovely crust"})
+        self.assertEqual(response.status_code, 201)
+        comment = response.json()["comment"]
+        self.assertFalse(comment["approved"])
+        self.assertIn("Lovely crust", comment["html"])
+        self.assertIn("Awaiting approval", comment["html"])
+
+        response = self.client.post(url, {"body": ""})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("body", response.json()["errors"])
+
+    def test_edit_own_comment_only(self):
+        url = self.url("comment_edit_json", self.comment.id)
+        self.client.force_login(self.other)
+        response = self.client.post(url, {"body": "Hijacked"})
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_login(self.user)
+        response = self.client.post(url, {"body": "Even nicer"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Even nicer", response.json()["comment"]["html"])
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.body, "Even nicer")
+        self.assertTrue(self.comment.approved)
+
+        missing = self.url("comment_edit_json", self.comment.id + 100)
+        self.assertEqual(self.client.post(missing, {}).status_code, 404)
+
+    def test_delete(self):
+        url = self.url("comment_delete_json", self.comment.id)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        response = self.client.post(url)
+        self.assertEqual(response.json()["deleted"], self.comment.id)
+        self.assertEqual(response.json()["count"], 0)
+        self.assertFalse(Comment.objects.exists())
+
+
+class ThreadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cook", password="password")
+        cls.recipe = Recipe.objects.create(
+            title="Stew",
+            ingredients="beans",
+            instructions="Simmer.",
+            prep_time=15,
+            cook_time=90,
+            author=cls.user,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def reply(self, parent, body="A reply", approved=True):
+        form = ReplyForm(
+            {"body": f"{body} to the comment", "parent": parent.id},
+            recipe_id=self.recipe.id,
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        comment = form.save(commit=False)
+        comment.author = self.user
+        comment.recipe = self.recipe
+        comment.approved = approved
+        comment.save()
+        return comment
+
+    def root(self, body="Top"):
+        return Comment.objects.create(
+            recipe=self.recipe, author=self.user, body=body, approved=True
+        )
+
+    def test_paths_and_depth(self):
+        root = self.root()
+        child = self.reply(root)
+        grandchild = self.reply(child)
+        self.assertEqual(root.path, Comment.make_path("", root.id))
+        self.assertEqual(child.path, Comment.make_path(root.path, child.id))
+        self.assertEqual(
+            grandchild.path, Comment.make_path(child.path, grandchild.id)
+        )
+        self.assertEqual((child.depth, grandchild.depth), (1, 2))
+        self.assertEqual(grandchild.thread_id, root.id)
+        self.assertEqual(
+            Comment.objects.get(id=grandchild.id).path, grandchild.path
+        )
+
+    def test_replies_stop_at_max_depth(self):
+        comment = self.root()
+        for i in range(Comment.MAX_DEPTH + 2):
+            comment = self.reply(comment)
+        self.assertEqual(comment.depth, Comment.MAX_DEPTH)
+        self.assertEqual(
+            Comment.objects.aggregate(Max("depth"))["depth__max"],
+            Comment.MAX_DEPTH,
+        )
+
+    def test_reply_count(self):
+        root = self.root()
+        child = self.reply(root)
+        pending = self.reply(child, approved=False)
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 1)
+
+        pending.approved = True
+        pending.save()
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 2)
+
+        child.delete()
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 0)
+
+    def test_bulk_approval_recounts_threads(self):
+        root = self.root()
+        for i in range(3):
+            self.reply(root, approved=False)
+        comment_admin = site._registry[Comment]
+        comment_admin.approve_comments(None, Comment.objects.all())
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 3)
+
+    def test_api_comments_in_tree_order(self):
+        first = self.root("First")
+        second = self.root("Second")
+        reply = self.reply(first)
+        nested = self.reply(reply)
+        self.reply(first, approved=False)
+        response = self.client.get(
+            reverse("api_recipe_detail", args=[self.recipe.id]),
+            {"fields": "comments"},
+        )
+        comments = response.json()["comments"]
+        self.assertEqual(
+            [
+                (c["id"], c["parent_id"], c["depth"], c["thread_id"])
+                for c in comments
+            ],
+            [
+                (first.id, None, 0, None),
+                (reply.id, first.id, 1, first.id),
+                (nested.id, reply.id, 2, first.id),
+                (second.id, None, 0, None),
+            ],
+        )
+        self.assertEqual(
+            [c["reply_count"] for c in comments], [2, 0, 0, 0]
+        )
+
+    def test_detail_page_queries_do_not_grow_with_replies(self):
+        url = reverse("recipe_detail", args=[self.recipe.id])
+        root = self.root("First thread")
+        self.reply(self.reply(root, "Nested"), "Deeper")
+        self.client.logout()
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get(url)
+        self.assertEqual(len(response.context["comments"]), 1)
+        html = response.content.decode()
+        self.assertLess(html.index("First thread"), html.index("Nested"))
+        self.assertLess(html.index("Nested"), html.index("Deeper"))
+
+        for i in range(5):
+            self.reply(self.reply(self.root(f"Thread {i}")))
+        cache.clear()
+        self.client.logout()
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+        self.assertEqual(len(many), len(few))
+
+    def test_replies_per_thread_are_capped(self):
+        root = self.root("Busy thread")
+        for i in range(views.REPLIES_PER_THREAD + 3):
+            self.reply(root, f"Reply {i:02d}")
+        url = reverse("recipe_detail", args=[self.recipe.id])
+        comment = self.client.get(url).context["comments"].object_list[0]
+        self.assertEqual(
+            len(comment.thread_replies), views.REPLIES_PER_THREAD
+        )
+        self.assertIsNotNone(comment.replies_cursor)
+
+        url = reverse("comment_replies", args=[self.recipe.id, root.id])
+        data = self.client.get(url, {"cursor": comment.replies_cursor})
+        data = data.json()
+        self.assertEqual(
+            sorted(set(re.findall(r"Reply \d+", data["html"]))),
+            ["Reply 10", "Reply 11", "Reply 12"],
+        )
+        self.assertIsNone(data["next_cursor"])
+        response = self.client.get(url, {"cursor": "nonsense"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_reply_buttons_follow_the_page(self):
+        root = self.root()
+        # Pushed fragments carry the button; the page decides to show it
+        self.assertIn("btn-reply", live.render_comment(root))
+        url = reverse("recipe_detail", args=[self.recipe.id])
+        self.assertContains(self.client.get(url), 'data-can-reply="false"')
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(url), 'data-can-reply="true"')
+
+    def test_admin_cannot_move_a_reply(self):
+        root, other = self.root(), self.root("Other")
+        child = self.reply(root)
+        admin_user = User.objects.create_superuser("admin", password="x")
+        self.client.force_login(admin_user)
+        url = reverse("admin:recipes_comment_change", args=[child.id])
+        self.client.post(
+            url,
+            {
+                "recipe": self.recipe.id,
+                "author": self.user.id,
+                "body": "Moved elsewhere",
+                "approved": "on",
+                "parent": other.id,
+            },
+        )
+        child.refresh_from_db()
+        self.assertEqual(child.body, "Moved elsewhere")
+        self.assertEqual(child.parent_id, root.id)
+        self.assertEqual(child.thread_id, root.id)
+
+
+class TagBitsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user("cook", password="password")
+        cls.recipes = {}
+        for title, tags in [
+            ("Pasta", ["italian", "pasta", "quick"]),
+            ("Salad", ["vegan", "healthy", "quick"]),
+            ("Curry", ["chicken", "spicy"]),
+        ]:
+            recipe = Recipe(
+                title=title,
+                ingredients="x",
+                instructions="y",
+                prep_time=5,
+                cook_time=5,
+                author=user,
+            )
+            recipe.set_recipe_tags(tags)
+            recipe.save()
+            cls.recipes[title] = recipe
+
+    def titles(self, queryset):
+        return sorted(queryset.values_list("title", flat=True))
+
+    def test_bits_follow_tags(self):
+        recipe = self.recipes["Curry"]
+        self.assertEqual(
+            recipe.tag_bits, Recipe.tags_to_bits(["chicken", "spicy"])
+        )
+        recipe.set_recipe_tags(["vegan"])
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.tag_bits, Recipe.TAG_BITS["vegan"])
+        self.assertEqual(Recipe.bits_to_tags(recipe.tag_bits), ["vegan"])
+
+    def test_all_any_exclude(self):
+        recipes = Recipe.objects.all()
+        self.assertEqual(
+            self.titles(recipes.with_all_tags(["quick", "vegan"])), ["Salad"]
+        )
+        self.assertEqual(
+            self.titles(recipes.with_any_tags(["pasta", "spicy"])),
+            ["Curry", "Pasta"],
+        )
+        self.assertEqual(
+            self.titles(recipes.without_tags(["quick"])), ["Curry"]
+        )
+        self.assertEqual(recipes.with_all_tags([]).count(), 3)
+
+    def test_unknown_tags(self):
+        recipes = Recipe.objects.all()
+        self.assertFalse(recipes.with_all_tags(["bogus"]).exists())
+        self.assertFalse(recipes.with_all_tags(["quick", "bogus"]).exists())
+        self.assertFalse(recipes.with_any_tags(["bogus"]).exists())
+        self.assertEqual(
+            self.titles(recipes.with_any_tags(["bogus", "spicy"])), ["Curry"]
+        )
+        self.assertEqual(recipes.without_tags(["bogus"]).count(), 3)
+
+        url = reverse("recipes_list")
+        for params in [{"tags": "bogus"}, {"any_tags": "bogus"}]:
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(list(response.context["recipes"]), [])
+
+
+class DerivedFieldTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cook", password="password")
+        cls.recipe = Recipe.objects.create(
+            title="Soup",
+            description="A warming soup",
+            ingredients="2 carrots\n\n 1 onion ",
+            instructions="1. Chop.\n\n2. Simmer.",
+            recipe_tags="soup, made_up",
+            prep_time=10,
+            cook_time=30,
+            author=cls.user,
+        )
+        cls.comment = Comment.objects.create(
+            recipe=cls.recipe, author=cls.user, body="<b>Good</b>\n\nReally"
+        )
+
+    def assertDerived(self, recipe, comment):
+        self.assertEqual(recipe.ingredients_list, ["2 carrots", "1 onion"])
+        self.assertEqual(recipe.instruction_steps, ["Chop.", "Simmer."])
+        self.assertEqual(
+            recipe.tag_labels, [["soup", "Soup"], ["made_up", "Made Up"]]
+        )
+        self.assertEqual(
+            comment.body_html,
+            "<p>&lt;b&gt;Good&lt;/b&gt;</p>\n\n<p>Really</p>",
+        )
+
+    def test_saved_with_derived_fields(self):
+        self.assertDerived(Recipe.objects.get(), Comment.objects.get())
+
+        self.recipe.instructions = "Boil."
+        self.recipe.save()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.instruction_steps, ["Boil."])
+
+    def test_backfill(self):
+        migration = importlib.import_module(
+            "recipes.migrations.0011_derived_display_fields"
+        )
+        Recipe.objects.update(
+            ingredients_list=[], instruction_steps=[], tag_labels=[]
+        )
+        Comment.objects.update(body_html="")
+        migration.populate_display_fields(django_apps, None)
+        self.assertDerived(Recipe.objects.get(), Comment.objects.get())
+
+    def test_backfill_command_refreshes_what_signals_maintain(self):
+        cache.clear()
+        vegan = RecipeFilter(QueryDict("tags=vegan"))
+        # Queryset updates skip save() and the signal handlers
+        Recipe.objects.update(recipe_tags="vegan")
+        self.assertEqual(get_facets(vegan)["total"], 0)
+
+        call_command("backfill_derived_fields", stdout=io.StringIO())
+        names = [counters.tag_counter("vegan"), counters.tag_counter("soup")]
+        self.assertEqual(
+            list(counters.get_counts(*names).values()), [1, 0]
+        )
+        self.assertEqual(get_facets(vegan)["total"], 1)
+        self.assertEqual(
+            list(search_recipes(Recipe.objects.all(), "vegan")), [self.recipe]
+        )
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cook", password="password")
+
+    def create_recipe(self, meal_type="dinner", tags=("soup",)):
+        recipe = Recipe(
+            title="Counted",
+            ingredients="x",
+            instructions="y",
+            prep_time=5,
+            cook_time=5,
+            meal_type=meal_type,
+            author=self.user,
+        )
+        recipe.set_recipe_tags(list(tags))
+        recipe.save()
+        return recipe
+
+    def counts(self, recipe=None):
+        names = [
+            counters.TOTAL_RECIPES,
+            counters.meal_type_counter("dinner"),
+            counters.meal_type_counter("lunch"),
+            counters.tag_counter("soup"),
+            counters.tag_counter("vegan"),
+        ]
+        if recipe is not None:
+            names.append(counters.comments_counter(recipe.id))
+        return list(counters.get_counts(*names).values())
+
+    def test_recipe_create_edit_delete(self):
+        recipe = self.create_recipe()
+        self.assertEqual(self.counts(), [1, 1, 0, 1, 0])
+        recipe.meal_type = "lunch"
+        recipe.set_recipe_tags(["vegan"])
+        recipe.save()
+        self.assertEqual(self.counts(), [1, 0, 1, 0, 1])
+        recipe.delete()
+        self.assertEqual(self.counts(), [0, 0, 0, 0, 0])
+
+    def test_deferred_recipe_delete(self):
+        self.create_recipe()
+        Recipe.objects.only("id").get().delete()
+        self.assertEqual(self.counts(), [0, 0, 0, 0, 0])
+
+    def test_comment_approval_and_delete(self):
+        recipe = self.create_recipe()
+        comment = Comment.objects.create(
+            recipe=recipe, author=self.user, body="Tasty"
+        )
+        self.assertEqual(self.counts(recipe)[-1], 0)
+        comment.approved = True
+        comment.save()
+        self.assertEqual(self.counts(recipe)[-1], 1)
+        Comment.objects.create(
+            recipe=recipe, author=self.user, body="Again", approved=True
+        )
+        Comment.objects.only("id").get(pk=comment.pk).delete()
+        self.assertEqual(self.counts(recipe)[-1], 1)
+
+    def test_recount(self):
+        recipe = self.create_recipe()
+        Comment.objects.create(
+            recipe=recipe, author=self.user, body="Tasty", approved=True
+        )
+        SiteCounter.objects.update(value=99)
+        out = io.StringIO()
+        call_command("recount", stdout=out)
+        self.assertIn("Rebuilt", out.getvalue())
+        self.assertEqual(self.counts(recipe), [1, 1, 0, 1, 0, 1])
+        self.assertEqual(
+            counters.get_counts(counters.TOTAL_USERS)[counters.TOTAL_USERS], 1
+        )
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cook", password="password")
+        # Many recipes share a prep_time, so pages split ties
+        for i in range(11):
+            Recipe.objects.create(
+                title=f"Recipe {i}",
+                ingredients="x",
+                instructions="y",
+                prep_time=10 * (i % 3),
+                cook_time=5,
+                author=cls.user,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_forward_and_back(self):
+        paginator = CursorPaginator(
+            Recipe.objects.all(), ["-prep_time", "id"], 4
+        )
+        expected = list(
+            Recipe.objects.order_by("-prep_time", "id").values_list(
+                "id", flat=True
+            )
+        )
+        pages, cursor = [], None
+        while True:
+            page = paginator.page(cursor)
+            pages.append([recipe.id for recipe in page])
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual([len(ids) for ids in pages], [4, 4, 3])
+        self.assertEqual(sum(pages, []), expected)
+        self.assertFalse(paginator.page().has_previous)
+
+        back = paginator.page(page.previous_cursor)
+        self.assertEqual([recipe.id for recipe in back], pages[1])
+        self.assertTrue(back.has_next)
+        self.assertTrue(back.has_previous)
+
+    def test_invalid_cursors(self):
+        paginator = CursorPaginator(Recipe.objects.all(), ["title", "id"], 4)
+        for cursor in ["nonsense", encode_cursor("x", []), "W10"]:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    paginator.page(cursor)
+
+        response = self.client.get(
+            reverse("recipes_list"), {"cursor": "nonsense"}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("notification_inbox"), {"cursor": "nonsense"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_view_pages(self):
+        url = reverse("recipes_list")
+        response = self.client.get(
+            url, {"pagination": "cursor", "sort": "prep_time"}
+        )
+        titles = [card.title for card in response.context["recipes"]]
+        cursor = response.context["cursor_page"].next_cursor
+        response = self.client.get(
+            url, {"cursor": cursor, "sort": "prep_time"}
+        )
+        titles += [card.title for card in response.context["recipes"]]
+        self.assertEqual(len(titles), 11)
+        self.assertEqual(len(set(titles)), 11)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cook", password="password")
+        cls.recipes = {}
+        for title, tags, instructions in [
+            ("Lemon tart", "baked", "Bake the pastry."),
+            ("Fish supper", "gluten_free", "Squeeze lemon over the fish."),
+            ("Plain rice", "", "Boil the rice."),
+        ]:
+            cls.recipes[title] = Recipe.objects.create(
+                title=title,
+                recipe_tags=tags,
+                ingredients="x",
+                instructions=instructions,
+                prep_time=5,
+                cook_time=5,
+                author=cls.user,
+            )
+
+    def search(self, query):
+        results = search_recipes(Recipe.objects.all(), query)
+        return [r.title for r in results.order_by("-search_rank", "id")]
+
+    def test_title_outranks_instructions(self):
+        self.assertEqual(self.search("lemon"), ["Lemon tart", "Fish supper"])
+        self.assertEqual(self.search("gluten free"), ["Fish supper"])
+        self.assertEqual(self.search("!! ("), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        recipe = self.recipes["Plain rice"]
+        recipe.title = "Saffron rice"
+        recipe.save()
+        self.assertEqual(self.search("saffron"), ["Saffron rice"])
+        self.assertEqual(self.search("plain"), [])
+
+        recipe.delete()
+        self.assertEqual(self.search("saffron"), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {search.SEARCH_TABLE}")
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+
+class FacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cook", password="password")
+        for meal_type, tags in [
+            ("dinner", ["vegan", "quick"]),
+            ("dinner", ["quick"]),
+            ("lunch", ["vegan"]),
+        ]:
+            cls.create_recipe(meal_type, tags)
+
+    @classmethod
+    def create_recipe(cls, meal_type, tags):
+        recipe = Recipe(
+            title="Faceted",
+            ingredients="x",
+            instructions="y",
+            prep_time=5,
+            cook_time=5,
+            meal_type=meal_type,
+            author=cls.user,
+        )
+        recipe.set_recipe_tags(tags)
+        recipe.save()
+        return recipe
+
+    def setUp(self):
+        cache.clear()
+
+    def facets(self, **params):
+        return get_facets(RecipeFilter(QueryDict(urlencode(params))))
+
+    def test_counts(self):
+        facets = self.facets(tags="quick")
+        self.assertEqual(facets["total"], 2)
+        self.assertEqual(facets["meal_types"]["dinner"], 2)
+        self.assertEqual(facets["meal_types"]["lunch"], 0)
+        self.assertEqual(facets["tags"]["vegan"], 1)
+
+        # Unfiltered facets come from the site counters
+        with self.assertNumQueries(1):
+            facets = self.facets()
+        self.assertEqual(facets["total"], 3)
+        self.assertEqual(facets["tags"]["vegan"], 2)
+
+    def test_cached_until_a_recipe_changes(self):
+        self.facets(category="lunch")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.facets(category="lunch")["total"], 1)
+        recipe = self.create_recipe("lunch", [])
+        self.assertEqual(self.facets(category="lunch")["total"], 2)
+        recipe.delete()
+        self.assertEqual(self.facets(category="lunch")["total"], 1)
+
+    def assertListed(self, params, expected):
+        response = self.client.get(reverse("recipes_list"), params)
+        self.assertEqual(len(response.context["recipes"]), expected)
+        self.assertEqual(response.context["total_recipes"], expected)
+        self.assertEqual(response.context["paginator"].count, expected)
+
+    def test_unknown_tags_are_part_of_the_cache_key(self):
+        self.assertListed({"tags": "vegan"}, 2)
+        self.assertListed({"tags": "vegan,bogus"}, 0)
+        self.assertListed({"any_tags": "bogus"}, 0)
+        self.assertListed({"exclude_tags": "bogus"}, 3)
+
+
+class FeaturedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cook", password="password")
+        recipes = [
+            Recipe.objects.create(
+                title=f"Recipe {i}",
+                ingredients="x",
+                instructions="y",
+                prep_time=5,
+                cook_time=5,
+                author=cls.user,
+            )
+            for i in range(30)
+        ]
+        # Leave a wide gap in the ids, with a few recipes on either side
+        for recipe in recipes[3:27]:
+            recipe.delete()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_sampling_covers_id_gaps(self):
+        ids = set(Recipe.objects.values_list("id", flat=True))
+        for seed in range(10):
+            with self.subTest(seed=seed):
+                recipes = sample_recipes(4, random.Random(seed))
+                picked = [recipe.id for recipe in recipes]
+                self.assertEqual(len(picked), 4)
+                self.assertEqual(len(set(picked)), 4)
+                self.assertLessEqual(set(picked), ids)
+        self.assertEqual(len(sample_recipes(10)), 6)
+
+    @override_settings(FEATURED_RECIPES_ROTATION=60)
+    @mock.patch("recipes.featured.time.time", return_value=6000.0)
+    def test_rotation_is_shared(self, clock):
+        first = [recipe.id for recipe in get_featured_recipes()]
+        with self.assertNumQueries(1):
+            again = [recipe.id for recipe in get_featured_recipes()]
+        self.assertEqual(again, first)
+
+
+class CardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cook", password="password")
+        for i in range(5):
+            Recipe.objects.create(
+                title=f"Card {i}",
+                description=" ".join(["word"] * 30),
+                ingredients="x",
+                instructions="y",
+                prep_time=5,
+                cook_time=10,
+                author=cls.user,
+            )
+
+    def test_projection(self):
+        with CaptureQueriesContext(connection) as queries:
+            cards = to_cards(card_queryset(Recipe.objects.order_by("id")))
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]["sql"]
+        self.assertIn('"auth_user"."username"', sql)
+        self.assertNotIn('"recipes_recipe"."instructions"', sql)
+        self.assertNotIn('"recipes_recipe"."ingredients"', sql)
+
+        card = cards[0]
+        self.assertEqual(card.title, "Card 0")
+        self.assertEqual(card.author_username, "cook")
+        self.assertEqual(card.get_total_time(), 15)
+        self.assertEqual(card.pk, card.id)
+        self.assertTrue(card.summary.endswith("…"))
+        with self.assertRaises(AttributeError):
+            card.instructions = "y"
+
+    def test_list_page_uses_cards(self):
+        cache.clear()
+        response = self.client.get(reverse("recipes_list"))
+        recipes = list(response.context["recipes"])
+        self.assertEqual(len(recipes), 5)
+        self.assertTrue(all(isinstance(r, RecipeCard) for r in recipes))
+        self.assertContains(response, "Card 4")
@@ -1,11 +1,57 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("", views.RecipeListView.as_view(), name="recipes_home"),
     path("list/", views.RecipeListView.as_view(), name="recipes_list"),
     path("add/", views.add_recipe, name="add_recipe"),
+    path("categories/", views.categories_list, name="categories_list"),
+    path("stats/cache/", views.cache_stats, name="cache_stats"),
+    path("export/", views.export_recipes, name="export_recipes"),
+    path(
+        "notifications/",
+        views.notification_inbox,
+        name="notification_inbox",
+    ),
+    path(
+        "notifications/read/",
+        views.notifications_read,
+        name="notifications_read",
+    ),
+    path("api/recipes/", api.recipe_list, name="api_recipe_list"),
+    path("api/recipes/sync/", api.recipe_sync, name="api_recipe_sync"),
+    path("api/recipes/batch/", api.recipe_batch, name="api_recipe_batch"),
+    path(
+        "api/recipes/<int:recipe_id>/",
+        api.recipe_detail,
+        name="api_recipe_detail",
+    ),
     path("recipe/<int:recipe_id>/", views.recipe_detail, name="recipe_detail"),
+    path(
+        "recipe/<int:recipe_id>/comments/",
+        views.recipe_comments,
+        name="recipe_comments",
+    ),
+    path(
+        "recipe/<int:recipe_id>/comments/<int:comment_id>/replies/",
+        views.comment_replies,
+        name="comment_replies",
+    ),
+    path(
+        "recipe/<int:recipe_id>/comments/new/",
+        views.comment_create_json,
+        name="comment_create_json",
+    ),
+    path(
+        "recipe/<int:recipe_id>/comments/<int:comment_id>/edit/",
+        views.comment_edit_json,
+        name="comment_edit_json",
+    ),
+    path(
+        "recipe/<int:recipe_id>/comments/<int:comment_id>/delete/",
+        views.comment_delete_json,
+        name="comment_delete_json",
+    ),
     path(
         "recipe/<int:recipe_id>/edit_comment/<int:comment_id>/",
         views.comment_edit,
@@ -1,28 +1,82 @@
+import functools
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse, Http404
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    Http404,
+    JsonResponse,
+    QueryDict,
+    StreamingHttpResponse,
+)
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import BadRequest
+from django.core.handlers.asgi import ASGIRequest
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.contrib.auth.models import User
+from django.utils.decorators import method_decorator
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_POST, require_safe
 from django.views.generic import ListView
-from django.db.models import Q
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
 from django.core.paginator import Paginator
-from .models import Recipe, Comment
-from .forms import RecipeForm, CommentForm
+from .models import Recipe, RecipeNeighbour, Comment
+from .forms import RecipeForm, CommentForm, ReplyForm
+from . import counters, exporter, fragments, notifications
+from .cards import CARD_FIELDS, RecipeCard, card_queryset, to_cards
+from .facets import get_facets, facet_choices
+from .featured import get_featured_recipes
+from .filters import RecipeFilter
+from .pagecache import cache_anonymous_page
+from .pagination import AFTER, CursorPaginator, InvalidCursor, encode_cursor
+
+COMMENTS_PER_PAGE = 10
+# Replies shown per thread; the rest load on demand from comment_replies
+REPLIES_PER_THREAD = 10
+NOTIFICATIONS_PER_PAGE = 20
+
+
+async def recommended_cards(request):
+    """Cards precomputed for the user by build_recommendations"""
+    # request.user rather than request.auser(), which caches the user
+    # separately from the one the templates see (and would load it twice)
+    is_authenticated = await sync_to_async(
+        lambda: request.user.is_authenticated
+    )()
+    if not is_authenticated:
+        return []
+    rows = card_queryset(
+        Recipe.objects.filter(recommended_to__user=request.user).order_by(
+            "recommended_to__rank"
+        )
+    )
+    return [RecipeCard(row) async for row in rows]
 
 
-def home(request):
+@cache_anonymous_page()
+async def home(request):
     """Home page showing featured recipes and site overview"""
-    # Get 4 random recipes for featured section
-    featured_recipes = Recipe.objects.order_by("?")[:4]  # Random order
+    # Random recipes for the featured section (sampled by id, not sorted)
+    featured_recipes = await sync_to_async(get_featured_recipes)()
+    totals = await counters.aget_counts(
+        counters.TOTAL_USERS, counters.TOTAL_RECIPES
+    )
+    recommended_recipes = await recommended_cards(request)
 
     context = {
-        "total_users": User.objects.count(),
+        "total_users": totals[counters.TOTAL_USERS],
         "featured_recipes": featured_recipes,
-        "total_recipes": Recipe.objects.count(),
+        "recommended_recipes": recommended_recipes,
+        "total_recipes": totals[counters.TOTAL_RECIPES],
     }
-    return render(request, "recipes/home.html", context)
+    return await sync_to_async(render)(
+        request, "recipes/home.html", context
+    )
 
 
+@method_decorator(cache_anonymous_page(), name="get")
 class RecipeListView(ListView):
     """
     Enhanced recipe list view with integrated search and filtering
@@ -33,62 +87,66 @@ class RecipeListView(ListView):
     context_object_name = "recipes"
     paginate_by = 9  # Show 9 recipes per page
 
+    async def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        totals = await counters.aget_counts(counters.TOTAL_RECIPES)
+        # Cursor pages only count the results when asked to
+        if not self.use_cursor_pagination() or request.GET.get("count"):
+            await sync_to_async(self.get_facets)()
+        self.total_all_recipes = totals[counters.TOTAL_RECIPES]
+        context = await sync_to_async(self.get_context_data)()
+        return self.render_to_response(context)
+
     def get_queryset(self):
         """Apply search and filtering to the queryset"""
-        queryset = Recipe.objects.all()
-
-        # Get search parameters from URL
-        query = self.request.GET.get("q", "").strip()
-        category = self.request.GET.get("category", "").strip()
-        max_prep_time = self.request.GET.get("max_prep_time", "").strip()
-        max_cook_time = self.request.GET.get("max_cook_time", "").strip()
-        sort_by = self.request.GET.get("sort", "newest").strip()
-
-        # Apply text search filter
-        if query:
-            queryset = queryset.filter(
-                Q(title__icontains=query)
-                | Q(description__icontains=query)
-                | Q(ingredients__icontains=query)
-                | Q(instructions__icontains=query)
+        self.recipe_filter = RecipeFilter(self.request.GET)
+        return self.recipe_filter.get_queryset()
+
+    def get_facets(self):
+        """Facet counts for the current filters (one cached query)"""
+        if not hasattr(self, "facets"):
+            self.facets = get_facets(self.recipe_filter)
+        return self.facets
+
+    def use_cursor_pagination(self):
+        """
+        Cursor pagination is opt-in (?pagination=cursor, or any request
+        carrying a cursor) and needs a sort with a stored key
+        """
+        requested = (
+            self.request.GET.get("pagination") == "cursor"
+            or "cursor" in self.request.GET
+        )
+        return requested and self.recipe_filter.get_keyset_ordering()
+
+    def paginate_queryset(self, queryset, page_size):
+        # Cards only need a few columns plus the author's username
+        queryset = card_queryset(queryset)
+
+        if not self.use_cursor_pagination():
+            paginator, page, object_list, is_paginated = (
+                super().paginate_queryset(queryset, page_size)
             )
+            page.object_list = to_cards(object_list)
+            return (paginator, page, page.object_list, is_paginated)
 
-        # Apply meal type filter
-        if category and category != "all":
-            queryset = queryset.filter(meal_type=category)
-
-        # Apply tags filter (single selection)
-        tag = self.request.GET.get("tags", "").strip()
-        if tag:
-            queryset = queryset.filter(recipe_tags__icontains=tag)
-
-        # Apply prep time filter
-        if max_prep_time:
-            try:
-                prep_time_int = int(max_prep_time)
-                queryset = queryset.filter(prep_time__lte=prep_time_int)
-            except ValueError:
-                pass
-
-        # Apply cook time filter
-        if max_cook_time:
-            try:
-                cook_time_int = int(max_cook_time)
-                queryset = queryset.filter(cook_time__lte=cook_time_int)
-            except ValueError:
-                pass
-
-        # Apply sorting
-        if sort_by == "alphabetical":
-            queryset = queryset.order_by("title")
-        elif sort_by == "prep_time":
-            queryset = queryset.order_by("prep_time")
-        elif sort_by == "cook_time":
-            queryset = queryset.order_by("cook_time")
-        else:  # newest (default)
-            queryset = queryset.order_by("-created_at")
-
-        return queryset
+        paginator = CursorPaginator(
+            queryset, self.recipe_filter.get_keyset_ordering(), page_size
+        )
+        try:
+            page = paginator.page(self.request.GET.get("cursor"))
+        except InvalidCursor:
+            # Rendered as a 400 by Django's bad request handler
+            raise BadRequest("Invalid cursor")
+        page.object_list = to_cards(page.object_list)
+        self.cursor_page = page
+        return (paginator, page, page.object_list, False)
+
+    def get_paginator(self, queryset, *args, **kwargs):
+        paginator = super().get_paginator(queryset, *args, **kwargs)
+        # The facet query already counted the results
+        paginator.count = self.get_facets()["total"]
+        return paginator
 
     def get_context_data(self, **kwargs):
         """Add extra context data for search form and results"""
@@ -98,22 +156,46 @@ class RecipeListView(ListView):
         context["current_query"] = self.request.GET.get("q", "")
         context["current_category"] = self.request.GET.get("category", "")
         context["current_tag"] = self.request.GET.get("tags", "")
+        context["current_any_tags"] = self.request.GET.get("any_tags", "")
+        context["current_exclude_tags"] = self.request.GET.get(
+            "exclude_tags", ""
+        )
         context["current_max_prep_time"] = self.request.GET.get(
             "max_prep_time", ""
         )
         context["current_max_cook_time"] = self.request.GET.get(
             "max_cook_time", ""
         )
-        context["current_sort"] = self.request.GET.get("sort", "newest")
+        context["current_pantry"] = self.request.GET.get("pantry", "")
+        context["current_sort"] = self.recipe_filter.sort
 
-        # Add choices for the filter dropdowns
-        context["category_choices"] = Recipe.MEAL_TYPE_CHOICES
-        context["recipe_tag_choices"] = Recipe.RECIPE_TAG_CHOICES
+        # Cursor pages skip counting unless it is asked for (?count=1)
+        cursor_page = getattr(self, "cursor_page", None)
+        if cursor_page is None or self.request.GET.get("count"):
+            facets = self.get_facets()
+        else:
+            facets = {"total": None, "meal_types": None, "tags": None}
+        context["cursor_page"] = cursor_page
+        if cursor_page is not None:
+            params = self.request.GET.copy()
+            params.pop("cursor", None)
+            params.pop("page", None)
+            params["pagination"] = "cursor"
+            context["cursor_querystring"] = params.urlencode()
+
+        # Add choices (with facet counts) for the filter dropdowns
+        context["facets"] = facets
+        context["category_choices"] = facet_choices(
+            Recipe.MEAL_TYPE_CHOICES, facets["meal_types"]
+        )
+        context["recipe_tag_choices"] = facet_choices(
+            Recipe.RECIPE_TAG_CHOICES, facets["tags"]
+        )
         context["tags_by_type"] = Recipe.get_tags_by_type()
 
         # Calculate total results
-        context["total_recipes"] = self.get_queryset().count()
-        context["total_all_recipes"] = Recipe.objects.count()
+        context["total_recipes"] = facets["total"]
+        context["total_all_recipes"] = self.total_all_recipes
 
         # Check if any filters are active
         context["has_filters"] = any(
@@ -121,8 +203,11 @@ class RecipeListView(ListView):
                 context["current_query"],
                 context["current_category"],
                 context["current_tag"],
+                context["current_any_tags"],
+                context["current_exclude_tags"],
                 context["current_max_prep_time"],
                 context["current_max_cook_time"],
+                context["current_pantry"],
             ]
         )
 
@@ -159,48 +244,186 @@ def add_recipe(request):
     return render(request, "recipes/add_recipe.html", {"form": form})
 
 
-def recipe_detail(request, recipe_id):
-    """Display recipe details with comments"""
-    recipe = get_object_or_404(Recipe, id=recipe_id)
+def post_comment(request, recipe):
+    """
+    Handle a comment submission; returns the bound form and, when the
+    comment was saved, the redirect to send back
+    """
+    comment_form = ReplyForm(data=request.POST, recipe_id=recipe.id)
+    if not comment_form.is_valid():
+        return comment_form, None
+    comment = comment_form.save(commit=False)
+    comment.author = request.user
+    comment.recipe = recipe
+    comment.save()
+    messages.success(
+        request,
+        "Your comment has been submitted for approval!"
+    )
+    # Redirect to prevent double submission
+    return comment_form, redirect("recipe_detail", recipe_id=recipe.id)
 
-    # Get approved comments (newest first by default)
-    comments = recipe.comments.filter(approved=True).order_by("-created_on")
-    comments_count = comments.count()
+
+async def recipe_neighbours(recipe):
+    """
+    Similar and also-commented recipe cards, precomputed by
+    build_similarity and build_recommendations; both kinds of neighbour
+    come from one indexed query
+    """
+    neighbours = (
+        Recipe.objects.filter(neighbour_of__recipe=recipe)
+        .order_by("neighbour_of__kind", "neighbour_of__rank")
+        .values(*CARD_FIELDS, kind=F("neighbour_of__kind"))
+    )
+    similar_recipes, also_commented = [], []
+    async for row in neighbours:
+        if row["kind"] == RecipeNeighbour.CONTENT:
+            similar_recipes.append(RecipeCard(row))
+        else:
+            also_commented.append(RecipeCard(row))
+    return similar_recipes, also_commented
+
+
+def comment_page(recipe_id, cursor=None):
+    """
+    A keyset page of a recipe's approved top-level comments, newest first,
+    with their authors; raises InvalidCursor
+
+    Each comment's first REPLIES_PER_THREAD approved replies, in tree
+    order, are set on it as ``thread_replies``, with the cursor of the
+    rest as ``replies_cursor`` (None when there are no more); the replies
+    of the whole page are one query.
+    """
+    paginator = CursorPaginator(
+        Comment.objects.filter(
+            recipe_id=recipe_id, approved=True, depth=0
+        ).select_related("author"),
+        ["-created_on", "-id"],
+        COMMENTS_PER_PAGE,
+    )
+    page = paginator.page(cursor)
+    threads = {comment.id: comment for comment in page}
+    for comment in threads.values():
+        comment.thread_replies = []
+        comment.replies_cursor = None
+    if threads:
+        # One row past the limit tells whether a thread has more
+        replies = (
+            Comment.objects.filter(thread_id__in=threads, approved=True)
+            .select_related("author")
+            .annotate(
+                position=Window(
+                    RowNumber(), partition_by="thread_id", order_by="path"
+                )
+            )
+            .filter(position__lte=REPLIES_PER_THREAD + 1)
+            .order_by("thread_id", "path")
+        )
+        for reply in replies:
+            threads[reply.thread_id].thread_replies.append(reply)
+        for comment in threads.values():
+            if len(comment.thread_replies) > REPLIES_PER_THREAD:
+                del comment.thread_replies[REPLIES_PER_THREAD:]
+                last = comment.thread_replies[-1]
+                comment.replies_cursor = encode_cursor(AFTER, [last.path])
+    return page
+
+
+def reply_page(recipe_id, thread_id, cursor=None):
+    """
+    A keyset page of a thread's approved replies in tree order, following
+    the ones comment_page shows; raises InvalidCursor
+    """
+    paginator = CursorPaginator(
+        Comment.objects.filter(
+            recipe_id=recipe_id, thread_id=thread_id, approved=True
+        ).select_related("author"),
+        # Paths are unique: each ends in the comment's own id
+        ["path"],
+        REPLIES_PER_THREAD,
+    )
+    return paginator.page(cursor)
+
+
+@cache_anonymous_page(recipe_kwarg="recipe_id")
+async def recipe_detail(request, recipe_id):
+    """Display recipe details with comments"""
+    try:
+        recipe = await Recipe.objects.select_related("author").aget(
+            id=recipe_id
+        )
+    except Recipe.DoesNotExist:
+        raise Http404("No Recipe matches the given query.")
 
     # Handle comment submission
     comment_submitted = False
     if request.method == "POST":
-        comment_form = CommentForm(data=request.POST)
-        if comment_form.is_valid():
-            comment = comment_form.save(commit=False)
-            comment.author = request.user
-            comment.recipe = recipe
-            comment.save()
-            messages.success(
-                request,
-                "Your comment has been submitted for approval!"
-            )
-            comment_submitted = True
-            # Redirect to prevent double submission
-            return redirect("recipe_detail", recipe_id=recipe_id)
+        comment_form, response = await sync_to_async(post_comment)(
+            request, recipe
+        )
+        if response is not None:
+            return response
     else:
-        comment_form = CommentForm()
+        comment_form = ReplyForm(recipe_id=recipe.id)
 
-    # Split ingredients into list
-    ingredients_list = (
-        recipe.ingredients.split("\n") if recipe.ingredients else []
-    )
+    # The first page of approved comments (newest first; the rest load on
+    # demand from recipe_comments)
+    comments = await sync_to_async(comment_page)(recipe.id)
+    counter = counters.comments_counter(recipe.id)
+    counts = await counters.aget_counts(counter)
+    similar_recipes, also_commented = await recipe_neighbours(recipe)
 
     context = {
         "recipe": recipe,
         "comments": comments,
-        "comments_count": comments_count,
+        "comments_count": counts[counter],
         "comment_form": comment_form,
         "comment_submitted": comment_submitted,
-        "ingredients_list": ingredients_list,
+        "similar_recipes": similar_recipes,
+        "also_commented": also_commented,
     }
 
-    return render(request, "recipes/recipe_detail.html", context)
+    return await sync_to_async(render)(
+        request, "recipes/recipe_detail.html", context
+    )
+
+
+@cache_anonymous_page(recipe_kwarg="recipe_id")
+@require_safe
+def recipe_comments(request, recipe_id):
+    """
+    Further pages of a recipe's comments for the detail page: the rendered
+    comments and the cursor of the next page, as JSON
+    """
+    try:
+        page = comment_page(recipe_id, request.GET.get("cursor"))
+    except InvalidCursor:
+        return JsonResponse({"error": "Invalid cursor."}, status=400)
+    html = render_to_string(
+        "recipes/includes/comment_page.html",
+        {"comments": page},
+        request=request,
+    )
+    return JsonResponse({"html": html, "next_cursor": page.next_cursor})
+
+
+@cache_anonymous_page(recipe_kwarg="recipe_id")
+@require_safe
+def comment_replies(request, recipe_id, comment_id):
+    """
+    Further replies of a thread for the detail page: the rendered replies
+    and the cursor of the next batch, as JSON
+    """
+    try:
+        page = reply_page(recipe_id, comment_id, request.GET.get("cursor"))
+    except InvalidCursor:
+        return JsonResponse({"error": "Invalid cursor."}, status=400)
+    html = render_to_string(
+        "recipes/includes/comment_page.html",
+        {"comments": page},
+        request=request,
+    )
+    return JsonResponse({"html": html, "next_cursor": page.next_cursor})
 
 
 @login_required
@@ -254,6 +477,117 @@ def comment_delete(request, recipe_id, comment_id):
     return redirect("recipe_detail", recipe_id=recipe_id)
 
 
+def json_login_required(view_func):
+    """login_required for fetch() endpoints: a JSON 401, not a redirect"""
+
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({"error": "Please log in."}, status=401)
+        return view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+def comment_fragment(request, comment):
+    """A comment rendered the way the detail page lists it"""
+    return {
+        "id": comment.id,
+        "approved": comment.approved,
+        "html": render_to_string(
+            "recipes/includes/comment.html",
+            {"comment": comment},
+            request=request,
+        ),
+    }
+
+
+def own_comment(request, recipe_id, comment_id):
+    """
+    The user's comment on a recipe, or the JSON error response to send
+    back instead
+    """
+    comment = (
+        Comment.objects.select_related("author")
+        .filter(pk=comment_id, recipe_id=recipe_id)
+        .first()
+    )
+    if comment is None:
+        return None, JsonResponse({"error": "No such comment."}, status=404)
+    if comment.author_id != request.user.pk:
+        return None, JsonResponse(
+            {"error": "You can only change your own comments!"}, status=403
+        )
+    return comment, None
+
+
+@json_login_required
+@require_POST
+def comment_create_json(request, recipe_id):
+    """
+    Post a comment from the detail page's script; returns the rendered
+    (pending) comment rather than the whole page
+    """
+    if not Recipe.objects.filter(id=recipe_id).exists():
+        return JsonResponse({"error": "No such recipe."}, status=404)
+    form = ReplyForm(data=request.POST, recipe_id=recipe_id)
+    if not form.is_valid():
+        return JsonResponse(
+            {"errors": form.errors.get_json_data()}, status=400
+        )
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.recipe_id = recipe_id
+    comment.save()
+    return JsonResponse(
+        {
+            "comment": comment_fragment(request, comment),
+            "message": "Your comment has been submitted for approval!",
+        },
+        status=201,
+    )
+
+
+@json_login_required
+@require_POST
+def comment_edit_json(request, recipe_id, comment_id):
+    """Edit a comment in place; returns the re-rendered comment"""
+    comment, error = own_comment(request, recipe_id, comment_id)
+    if error:
+        return error
+    form = CommentForm(request.POST, instance=comment)
+    if not form.is_valid():
+        return JsonResponse(
+            {"errors": form.errors.get_json_data()}, status=400
+        )
+    # Edits keep the comment's approval state
+    comment = form.save()
+    return JsonResponse(
+        {
+            "comment": comment_fragment(request, comment),
+            "message": "Comment updated!",
+        }
+    )
+
+
+@json_login_required
+@require_POST
+def comment_delete_json(request, recipe_id, comment_id):
+    """Delete a comment; returns the recipe's new approved comment count"""
+    comment, error = own_comment(request, recipe_id, comment_id)
+    if error:
+        return error
+    comment.delete()
+    counter = counters.comments_counter(recipe_id)
+    return JsonResponse(
+        {
+            "deleted": comment_id,
+            "count": counters.get_counts(counter)[counter],
+            "message": "Comment deleted!",
+        }
+    )
+
+
 @login_required
 def recipe_edit(request, recipe_id):
     """
@@ -425,36 +759,27 @@ def recipes_by_category(request, category_slug):
 
 
 def categories_list(request):
-    """Display all available categories with recipe counts"""
-    categories_data = []
-
-    for category_key, category_name in Recipe.CATEGORY_CHOICES:
-        recipe_count = Recipe.objects.filter(category=category_key).count()
-        if recipe_count > 0:  # Only show categories that have recipes
-            categories_data.append(
-                {
-                    "key": category_key,
-                    "name": category_name,
-                    "count": recipe_count,
-                }
-            )
+    """Display meal types and tags with recipe counts"""
+    facets = get_facets(RecipeFilter(QueryDict()))
+
+    def with_counts(choices, counts, param):
+        # Only show categories that have recipes
+        return [
+            {"key": key, "name": name, "count": count, "param": param}
+            for key, name, count in facet_choices(choices, counts)
+            if count > 0
+        ]
+
+    categories_data = with_counts(
+        Recipe.MEAL_TYPE_CHOICES, facets["meal_types"], "category"
+    )
 
-    # Group categories by type for better display
-    categories_by_type = Recipe.get_categories_by_type()
-    organized_categories = {}
-
-    for type_name, type_categories in categories_by_type.items():
-        organized_categories[type_name] = []
-        for category_key, category_name in type_categories:
-            recipe_count = Recipe.objects.filter(category=category_key).count()
-            if recipe_count > 0:
-                organized_categories[type_name].append(
-                    {
-                        "key": category_key,
-                        "name": category_name,
-                        "count": recipe_count,
-                    }
-                )
+    # Group tags by type for better display
+    organized_categories = {"Meal Types": categories_data}
+    for type_name, type_tags in Recipe.get_tags_by_type().items():
+        organized_categories[type_name] = with_counts(
+            type_tags, facets["tags"], "tags"
+        )
 
     context = {
         "categories_data": categories_data,
@@ -463,3 +788,69 @@ def categories_list(request):
     }
 
     return render(request, "recipes/categories_list.html", context)
+
+
+@staff_member_required
+def cache_stats(request):
+    """Fragment cache hit/miss totals for monitoring"""
+    return JsonResponse({"fragments": fragments.get_stats()})
+
+
+@staff_member_required
+def export_recipes(request):
+    """
+    Stream the recipes matching the list page's filters, with authors,
+    tags and approved comments, as NDJSON (default) or ?format=csv
+    """
+    format = request.GET.get("format", "ndjson")
+    if format not in exporter.FORMATS:
+        return HttpResponse(
+            f"Unknown format; use one of {', '.join(exporter.FORMATS)}.",
+            status=400,
+        )
+    recipes = RecipeFilter(request.GET).filter()
+    if isinstance(request, ASGIRequest):
+        lines = exporter.aexport_lines(recipes, format)
+    else:
+        lines = exporter.export_lines(recipes, format)
+    response = StreamingHttpResponse(
+        lines,
+        content_type=exporter.CONTENT_TYPES[format],
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="recipes.{format}"'
+    )
+    return response
+
+
+@login_required
+def notification_inbox(request):
+    """The user's notifications, newest first, by keyset pages"""
+    paginator = CursorPaginator(
+        request.user.notifications.all(), ["-id"], NOTIFICATIONS_PER_PAGE
+    )
+    try:
+        page = paginator.page(request.GET.get("cursor"))
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+    return render(
+        request,
+        "recipes/notifications.html",
+        {"notifications": page, "cursor_page": page},
+    )
+
+
+@login_required
+@require_POST
+def notifications_read(request):
+    """Mark the checked notifications (or all of them) as read"""
+    ids = request.POST.getlist("ids")
+    if "all" in request.POST:
+        notifications.mark_read(request.user.pk)
+    elif ids:
+        try:
+            ids = [int(pk) for pk in ids]
+        except ValueError:
+            return HttpResponse("Invalid notification id.", status=400)
+        notifications.mark_read(request.user.pk, ids)
+    return redirect("notification_inbox")
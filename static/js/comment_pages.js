@@ -0,0 +1,120 @@
+// Comments on the recipe detail page are threaded: each element carries
+// its materialized path (data-path), so a thread's comments are in tree
+// order when sorted by it. placeComment puts a rendered comment where it
+// belongs: in place of its older version, after its parent's replies, or
+// at the top for a new thread. Shared with comments.js and live_comments.js.
+window.placeComment = function (element) {
+  const commentList = document.getElementById("commentList");
+  if (!commentList) return;
+  const existing = document.getElementById(element.id);
+  if (existing) {
+    // Pushed comments are rendered for nobody in particular: keep the
+    // author's edit and delete buttons
+    const buttons = existing.querySelector(".btn-group");
+    const slot = element.querySelector(".d-flex.align-items-center");
+    if (buttons && slot && !element.querySelector(".btn-group")) {
+      slot.appendChild(buttons);
+    }
+    existing.replaceWith(element);
+    return;
+  }
+
+  const parentId = element.dataset.parent;
+  if (!parentId) {
+    commentList.prepend(element);
+    return;
+  }
+  // Replies to comments not on the page arrive with the page of their thread
+  const parent = document.getElementById(`comment-item-${parentId}`);
+  if (!parent) return;
+  const path = parent.dataset.path;
+  let last = parent;
+  while (
+    path &&
+    last.nextElementSibling?.dataset.path?.startsWith(path)
+  ) {
+    last = last.nextElementSibling;
+  }
+  last.after(element);
+};
+
+// Remove a comment and its replies
+window.removeComment = function (commentId) {
+  const element = document.getElementById(`comment-item-${commentId}`);
+  if (!element) return;
+  const path = element.dataset.path;
+  while (path && element.nextElementSibling?.dataset.path?.startsWith(path)) {
+    element.nextElementSibling.remove();
+  }
+  element.remove();
+};
+
+// "Show more replies" of a thread: fetches its next replies and puts them
+// before the button, which follows the replies shown so far
+document.addEventListener("click", async (e) => {
+  const button = e.target.closest(".btn-more-replies");
+  if (!button) return;
+  const wrapper = button.closest(".more-replies");
+  button.disabled = true;
+  const url = `${button.dataset.url}?cursor=${encodeURIComponent(button.dataset.cursor)}`;
+  try {
+    const response = await fetch(url, { headers: { Accept: "application/json" } });
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    const data = await response.json();
+
+    const template = document.createElement("template");
+    template.innerHTML = data.html;
+    for (const comment of template.content.querySelectorAll(".comment")) {
+      // Skip replies already added live (see live_comments.js)
+      if (!document.getElementById(comment.id)) wrapper.before(comment);
+    }
+
+    if (data.next_cursor) {
+      button.dataset.cursor = data.next_cursor;
+      button.disabled = false;
+    } else {
+      wrapper.remove();
+    }
+  } catch (error) {
+    button.disabled = false;
+    window.showNotification("Could not load more replies.", "error");
+  }
+});
+
+// "Load more comments" on the recipe detail page: fetches the next keyset
+// page of rendered comments and appends it to the list
+(function () {
+  const button = document.getElementById("loadMoreComments");
+  const commentList = document.getElementById("commentList");
+  if (!button || !commentList) return;
+
+  button.addEventListener("click", async () => {
+    button.disabled = true;
+    const url = `${button.dataset.url}?cursor=${encodeURIComponent(button.dataset.cursor)}`;
+    try {
+      const response = await fetch(url, { headers: { Accept: "application/json" } });
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
+      const data = await response.json();
+
+      // The previous page's last comment had no separator
+      const last = commentList.lastElementChild;
+      if (last) last.classList.add("border-bottom");
+      const template = document.createElement("template");
+      template.innerHTML = data.html;
+      for (const comment of template.content.querySelectorAll(".comment")) {
+        // Skip comments already added live (see live_comments.js)
+        if (!document.getElementById(comment.id)) commentList.appendChild(comment);
+      }
+
+      if (data.next_cursor) {
+        button.dataset.cursor = data.next_cursor;
+        button.disabled = false;
+      } else {
+        document.getElementById("moreComments").remove();
+      }
+    } catch (error) {
+      button.disabled = false;
+      window.showNotification("Could not load more comments.", "error");
+    }
+  });
+})();
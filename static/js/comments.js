@@ -1,108 +1,175 @@
-const editButtons = document.getElementsByClassName("btn-edit");
 const commentText = document.getElementById("id_body");
 const commentForm = document.getElementById("commentForm");
 const submitButton = document.getElementById("submitButton");
 const cancelButton = document.getElementById("cancelButton");
+const commentParent = document.getElementById("id_parent");
 
 const deleteModal = new bootstrap.Modal(document.getElementById("deleteModal"));
-const deleteButtons = document.getElementsByClassName("btn-delete");
 const deleteConfirm = document.getElementById("deleteConfirm");
 
-for (let button of editButtons) {
-    button.addEventListener("click", (e) => {
-        // Use currentTarget to get the button element, not the clicked icon
-        let commentId = e.currentTarget.getAttribute("comment_id");
-        console.log("Comment ID:", commentId); // Debug log
-        
-        if (!commentId) {
-            console.error("Comment ID is null or undefined");
-            return;
-        }
-        
-        let commentElement = document.getElementById(`comment${commentId}`);
-        console.log("Comment element:", commentElement); // Debug log
-        
-        if (commentElement) {
-            // Use data attribute for original text, fallback to text extraction
-            let commentContent = commentElement.getAttribute('data-original-text') || 
-                                commentElement.textContent.trim();
-            
-            console.log("Comment content:", commentContent); // Debug log
-            
-            commentText.value = commentContent;
-            submitButton.innerHTML = '<i class="fas fa-save me-1"></i>Update';
-            submitButton.setAttribute("data-editing-comment-id", commentId);
-            
-            // Show cancel button
-            cancelButton.classList.remove("d-none");
-            
-            // Set form action to edit endpoint
-            const currentUrl = window.location.pathname;
-            commentForm.setAttribute("action", `${currentUrl}edit_comment/${commentId}/`);
-            
-            // Scroll to form for better UX
-            commentForm.scrollIntoView({ behavior: 'smooth' });
-        } else {
-            console.error(`Comment element with ID 'comment${commentId}' not found`);
-        }
+// Comments are created, edited and deleted through the JSON endpoints, and
+// the page is updated in place with the comment fragment they return
+function commentUrl(commentId, action) {
+    return `${commentForm.dataset.commentsUrl}${commentId}/${action}/`;
+}
+
+function toElement(html) {
+    const template = document.createElement("template");
+    template.innerHTML = html.trim();
+    return template.content.firstElementChild;
+}
+
+async function postComment(url, formData) {
+    const response = await fetch(url, {
+        method: "POST",
+        body: formData,
+        headers: { Accept: "application/json" },
     });
+    const data = await response.json().catch(() => ({}));
+    if (!response.ok) {
+        let message = data.error || "Something went wrong, please try again.";
+        if (data.errors) {
+            message = Object.values(data.errors)
+                .flat()
+                .map((error) => error.message)
+                .join(" ");
+        }
+        throw new Error(message);
+    }
+    return data;
 }
 
-// Handle form submission for comment updates
-commentForm.addEventListener("submit", (e) => {
-    const editingCommentId = submitButton.getAttribute("data-editing-comment-id");
+function updateCount(count) {
+    const countElement = document.getElementById("commentsCount");
+    if (countElement) countElement.textContent = count;
+    const noComments = document.getElementById("noComments");
+    if (noComments) noComments.classList.toggle("d-none", count > 0);
+}
+
+// Delegated, so comments loaded later (more pages, live updates) work too
+document.addEventListener("click", (e) => {
+    const button = e.target.closest(".btn-edit");
+    if (!button) return;
+    // Use the button element, not the clicked icon
+    let commentId = button.getAttribute("comment_id");
+    if (!commentId) {
+        console.error("Comment ID is null or undefined");
+        return;
+    }
     
-    if (editingCommentId) {
-        // Allow form to submit to server for persistence
-        const newCommentText = commentText.value.trim();
+    let commentElement = document.getElementById(`comment${commentId}`);
+    if (commentElement) {
+        // Use data attribute for original text, fallback to text extraction
+        let commentContent = commentElement.getAttribute('data-original-text') || 
+                            commentElement.textContent.trim();
         
-        if (!newCommentText) {
-            e.preventDefault();
-            window.showNotification("Comment cannot be empty!", "error");
-            return;
-        }
+        commentText.value = commentContent;
+        submitButton.innerHTML = '<i class="fas fa-save me-1"></i>Update';
+        submitButton.setAttribute("data-editing-comment-id", commentId);
         
-        // Show loading state
-        submitButton.disabled = true;
-        submitButton.innerHTML = '<i class="fas fa-spinner fa-spin me-1"></i>Updating...';
+        // Show cancel button
+        cancelButton.classList.remove("d-none");
         
-        // Form will submit to the edit endpoint set in the action attribute
-        // The server will handle the update and redirect back
+        // Scroll to form for better UX
+        commentForm.scrollIntoView({ behavior: 'smooth' });
+    } else {
+        console.error(`Comment element with ID 'comment${commentId}' not found`);
     }
 });
 
+// Create or update a comment without reloading the page
+commentForm.addEventListener("submit", async (e) => {
+    e.preventDefault();
+    const editingCommentId = submitButton.getAttribute("data-editing-comment-id");
+    
+    if (!commentText.value.trim()) {
+        window.showNotification("Comment cannot be empty!", "error");
+        return;
+    }
+    
+    // Show loading state
+    const label = submitButton.innerHTML;
+    submitButton.disabled = true;
+    submitButton.innerHTML = editingCommentId
+        ? '<i class="fas fa-spinner fa-spin me-1"></i>Updating...'
+        : '<i class="fas fa-spinner fa-spin me-1"></i>Posting...';
+    
+    try {
+        const url = editingCommentId
+            ? commentUrl(editingCommentId, "edit")
+            : commentForm.dataset.createUrl;
+        const data = await postComment(url, new FormData(commentForm));
+        window.placeComment(toElement(data.comment.html));
+        document.getElementById("noComments")?.classList.add("d-none");
+        resetCommentForm();
+        window.showNotification(data.message, "success");
+    } catch (error) {
+        submitButton.disabled = false;
+        submitButton.innerHTML = label;
+        window.showNotification(error.message, "error");
+    }
+});
+
+// Reply to a comment: the form posts it with the comment as its parent
+document.addEventListener("click", (e) => {
+    const button = e.target.closest(".btn-reply");
+    if (!button || !commentParent) return;
+    resetCommentForm();
+    commentParent.value = button.getAttribute("comment_id");
+    submitButton.innerHTML = '<i class="fas fa-reply me-1"></i>Post Reply';
+    cancelButton.classList.remove("d-none");
+    commentForm.scrollIntoView({ behavior: 'smooth' });
+    commentText.focus();
+});
+
 // Function to reset comment form
 function resetCommentForm() {
     commentText.value = "";
+    if (commentParent) commentParent.value = "";
     submitButton.innerHTML = '<i class="fas fa-comment me-1"></i>Post Comment';
     submitButton.removeAttribute("data-editing-comment-id");
     submitButton.disabled = false;
     cancelButton.classList.add("d-none");
-    commentForm.removeAttribute("action");
 }
 
 // Handle cancel button click
 cancelButton.addEventListener("click", () => {
     resetCommentForm();
-    window.showNotification("Edit cancelled", "info");
+    window.showNotification("Cancelled", "info");
 });
 
-for (let button of deleteButtons) {
-    button.addEventListener("click", (e) => {
-        // Use currentTarget to get the button element, not the clicked icon
-        let commentId = e.currentTarget.getAttribute("comment_id");
-        console.log("Delete Comment ID:", commentId); // Debug log
-        
-        if (!commentId) {
-            console.error("Delete: Comment ID is null or undefined");
-            return;
-        }
-        
-        const currentUrl = window.location.pathname;
-        deleteConfirm.href = `${currentUrl}delete_comment/${commentId}/`;
-        deleteModal.show();
-    });
-}
+document.addEventListener("click", (e) => {
+    const button = e.target.closest(".btn-delete");
+    if (!button) return;
+    // Use the button element, not the clicked icon
+    let commentId = button.getAttribute("comment_id");
+    if (!commentId) {
+        console.error("Delete: Comment ID is null or undefined");
+        return;
+    }
+    
+    deleteConfirm.dataset.commentId = commentId;
+    deleteModal.show();
+});
+
+deleteConfirm.addEventListener("click", async (e) => {
+    e.preventDefault();
+    const commentId = deleteConfirm.dataset.commentId;
+    const formData = new FormData();
+    formData.append(
+        "csrfmiddlewaretoken",
+        commentForm.querySelector("[name=csrfmiddlewaretoken]").value
+    );
+    try {
+        const data = await postComment(commentUrl(commentId, "delete"), formData);
+        window.removeComment(data.deleted);
+        updateCount(data.count);
+        window.showNotification(data.message, "success");
+    } catch (error) {
+        window.showNotification(error.message, "error");
+    }
+    deleteModal.hide();
+});
 
 // Comment sorting functionality
 document.addEventListener('DOMContentLoaded', function() {
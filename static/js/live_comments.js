@@ -0,0 +1,49 @@
+// Live comment updates for the recipe detail page (see recipes/live.py)
+(function () {
+  const commentList = document.getElementById("commentList");
+  if (!commentList || !("WebSocket" in window)) return;
+
+  const recipeId = commentList.dataset.recipeId;
+  const scheme = window.location.protocol === "https:" ? "wss" : "ws";
+  const url = `${scheme}://${window.location.host}/ws/recipes/${recipeId}/comments/`;
+  let retryDelay = 1000;
+
+  function toElement(html) {
+    const template = document.createElement("template");
+    template.innerHTML = html.trim();
+    return template.content.firstElementChild;
+  }
+
+  function applyChanges(data) {
+    // Comments arrive newest first; place the oldest first, so new
+    // threads end up newest first and replies follow their parents
+    data.comments
+      .slice()
+      .reverse()
+      .forEach((comment) => window.placeComment(toElement(comment.html)));
+    data.removed.forEach((id) => window.removeComment(id));
+
+    const count = document.getElementById("commentsCount");
+    if (count) count.textContent = data.count;
+    const noComments = document.getElementById("noComments");
+    if (noComments) noComments.classList.toggle("d-none", data.count > 0);
+  }
+
+  function connect() {
+    const socket = new WebSocket(url);
+    socket.addEventListener("open", () => {
+      retryDelay = 1000;
+    });
+    socket.addEventListener("message", (event) => {
+      applyChanges(JSON.parse(event.data));
+    });
+    socket.addEventListener("close", (event) => {
+      // 4404: the recipe no longer exists
+      if (event.code === 1000 || event.code === 4404) return;
+      setTimeout(connect, retryDelay);
+      retryDelay = Math.min(retryDelay * 2, 30000);
+    });
+  }
+
+  connect();
+})();